@@ -16,3 +16,7 @@ application = ProtocolTypeRouter(
         ),
     }
 )
+
+# Load the recommendation models in the background once the server takes its first request
+from stocks.service import inference_service  # noqa: E402
+inference_service.warm_on_first_request()
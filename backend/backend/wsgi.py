@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load the recommendation models in the background once the server takes its first request
+from stocks.service import inference_service  # noqa: E402
+inference_service.warm_on_first_request()
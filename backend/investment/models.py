@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .suggestions import PENDING, STATUS_CHOICES
+
 
 # Create your models here.
 class Investment(models.Model):
@@ -28,6 +30,8 @@ class Recommendation(models.Model):
     weight = models.DecimalField(max_digits=5, decimal_places=2)
     notes = models.TextField(blank=True, null=True)
     suggestion = models.TextField(blank=True, null=True)
+    # Suggestions are generated in the background; clients poll until it leaves 'pending'
+    suggestion_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -0,0 +1,335 @@
+import re
+import json
+import time
+import queue
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Stocks explained by one LLM prompt
+SUGGESTION_BATCH_SIZE = 5
+
+# Seconds the worker waits for more stocks before sending a partial batch
+SUGGESTION_BATCH_WAIT = 0.05
+
+# Background threads calling the LLM
+SUGGESTION_WORKERS = 2
+
+# Seconds a generated suggestion is reused for the same stock data
+SUGGESTION_CACHE_TTL = 24 * 60 * 60
+SUGGESTION_CACHE_PREFIX = 'suggestion:'
+
+# Seconds after which a pending suggestion is given up on; queued jobs do not survive a restart
+SUGGESTION_STALE_AFTER = 15 * 60
+
+GEMINI_MODEL = "gemini-1.5-flash"
+
+# Values of Recommendation.suggestion_status
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+STATUS_CHOICES = [(PENDING, 'Pending'), (READY, 'Ready'), (FAILED, 'Failed')]
+
+# Heading of every stock in a batched prompt
+STOCK_HEADING = "### Stock {}"
+
+
+# 🔧 Format stock data into readable text for the LLM
+def format_stock_data(rec):
+    try:
+        return (
+            f"Symbol: {rec.get('symbol')}\n"
+            f"Current Price: ₹{rec.get('current_price', 0):.2f}\n"
+            f"Expected Return: {rec.get('expected_return', 0) * 100:.2f}%\n"
+            f"Projected Value: ₹{rec.get('projected_value', 0):.2f}\n"
+            f"Risk-Adjusted Score: {rec.get('risk_adjusted_score', 0):.4f}\n"
+            f"Market Cap Category: {rec.get('market_cap_category')}\n"
+            f"Risk Metrics: {rec.get('risk_metrics')}\n"
+            f"Technical Indicators: {rec.get('technical_indicators')}\n"
+        )
+    except Exception as e:
+        logger.error(f"Failed to format stock data: {e}")
+        return "N/A"
+
+
+def cache_key(stock_text: str) -> str:
+    """Cache key of a suggestion: a hash of the formatted stock data it explains."""
+    return SUGGESTION_CACHE_PREFIX + hashlib.sha256(stock_text.encode('utf-8')).hexdigest()
+
+
+def batch_prompt(stock_texts: Sequence[str]) -> str:
+    """One prompt asking for a suggestion for every stock, answered as a JSON array in the same order."""
+    sections = "\n\n".join(f"{STOCK_HEADING.format(i + 1)}\n{text}" for i, text in enumerate(stock_texts))
+    return (
+        f"For each of the following {len(stock_texts)} stocks, explain in 3–5 lines why it is a good investment.\n"
+        f"Respond with only a JSON array of {len(stock_texts)} strings, one per stock, in the order given.\n\n"
+        f"{sections}\n\n"
+        "Response:"
+    )
+
+
+def parse_batch_response(text: str, count: int) -> Optional[List[str]]:
+    """Suggestions of a `batch_prompt` response, or None unless it is a JSON array of `count` strings."""
+    # Models often wrap JSON in a Markdown code fence
+    text = re.sub(r'^\s*```(?:json)?\s*|\s*```\s*$', '', text.strip())
+    try:
+        suggestions = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(suggestions, list) or len(suggestions) != count:
+        return None
+    if not all(isinstance(suggestion, str) and suggestion.strip() for suggestion in suggestions):
+        return None
+    return [suggestion.strip() for suggestion in suggestions]
+
+
+class LLMClient(ABC):
+    """Text generation backend used for suggestions."""
+
+    name = 'llm'
+
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """Completion of `prompt`. Blocking; may raise on network or quota errors."""
+
+
+class GeminiClient(LLMClient):
+    """Google Gemini; `google-generativeai` is imported on first use."""
+
+    name = 'gemini'
+
+    def __init__(self, model_name: str = GEMINI_MODEL, api_key: Optional[str] = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+
+    def generate(self, prompt: str) -> str:
+        if self._model is None:
+            import os
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key or os.getenv("GEMINI_API_KEY"))
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model.generate_content(prompt).text.strip()
+
+
+def save_suggestions(recommendation_ids: List[int], suggestion: Optional[str], status: str):
+    """Store a suggestion on its Recommendation rows."""
+    from django.db import close_old_connections
+    from .models import Recommendation
+
+    try:
+        Recommendation.objects.filter(id__in=recommendation_ids).update(suggestion=suggestion,
+                                                                        suggestion_status=status)
+    finally:
+        # Worker threads outlive requests; do not keep their connections open
+        close_old_connections()
+
+
+def fail_stale_suggestions(queryset=None, max_age: float = SUGGESTION_STALE_AFTER) -> int:
+    """Mark suggestions pending for more than `max_age` seconds FAILED.
+
+    Jobs only live in a worker's in-memory queue, so those of a process that
+    stopped are never completed; this keeps their rows from polling as pending
+    forever.
+
+    Args:
+        queryset: Recommendation rows to check, defaults to all of them
+
+    Returns:
+        Number of rows marked FAILED
+    """
+    from django.utils import timezone
+    from .models import Recommendation
+
+    if queryset is None:
+        queryset = Recommendation.objects.all()
+    stale = queryset.filter(suggestion_status=PENDING, created_at__lt=timezone.now() - timedelta(seconds=max_age))
+    failed = stale.update(suggestion_status=FAILED)
+    if failed:
+        logger.warning(f"Marked {failed} stale pending suggestions failed")
+    return failed
+
+
+class SuggestionWorker:
+    """Generates recommendation suggestions on background threads, several stocks per LLM call.
+
+    `submit` queues (recommendation id, formatted stock data) jobs and returns at
+    once. Worker threads take up to `batch_size` jobs, waiting at most
+    `batch_wait` seconds for a batch to fill, answer identical stock data once
+    from the cache or from a single batched prompt, and hand every result to
+    `on_complete` (which by default stores it on the Recommendation rows). When a
+    batched response cannot be parsed its stocks are retried one prompt each.
+
+    The queue is in memory: when the worker first starts in a process it runs
+    `on_start` (by default `fail_stale_suggestions`), so rows whose jobs were
+    lost with a previous process end up FAILED rather than pending.
+
+    Args:
+        client: LLM backend, defaults to Gemini
+        cache: Django cache API object, defaults to the default cache
+        on_complete: Called with (recommendation ids, suggestion, status) for each distinct stock text
+        batch_size: Stocks per prompt
+        batch_wait: Seconds to wait for a batch to fill
+        workers: Number of worker threads
+        cache_ttl: Seconds suggestions are cached for
+        on_start: Called once, before the first worker thread starts
+    """
+
+    def __init__(self, client: Optional[LLMClient] = None, cache=None,
+                 on_complete: Callable[[List[int], Optional[str], str], None] = save_suggestions,
+                 batch_size: int = SUGGESTION_BATCH_SIZE, batch_wait: float = SUGGESTION_BATCH_WAIT,
+                 workers: int = SUGGESTION_WORKERS, cache_ttl: int = SUGGESTION_CACHE_TTL,
+                 on_start: Optional[Callable[[], object]] = fail_stale_suggestions):
+        self.client = client if client is not None else GeminiClient()
+        self._cache = cache
+        self.on_complete = on_complete
+        self.on_start = on_start
+        self._started = False
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.workers = workers
+        self.cache_ttl = cache_ttl
+        self._queue: 'queue.Queue[Tuple[int, str]]' = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'llm_calls': 0, 'cache_hits': 0, 'completed': 0, 'failed': 0,
+                       'retried': 0}
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from django.core.cache import cache
+            self._cache = cache
+        return self._cache
+
+    def lookup(self, stock_texts: Sequence[str]) -> List[Optional[str]]:
+        """Cached suggestion of each stock text, None where there is none yet."""
+        keys = [cache_key(text) for text in stock_texts]
+        found = self.cache.get_many(list(set(keys)))
+        hits = [found.get(key) for key in keys]
+        self._count('cache_hits', sum(hit is not None for hit in hits))
+        return hits
+
+    def submit(self, jobs: Sequence[Tuple[int, str]]):
+        """Queue (recommendation id, formatted stock data) jobs for generation."""
+        if not jobs:
+            return
+        self._start()
+        for job in jobs:
+            self._queue.put(job)
+        self._count('submitted', len(jobs))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _start(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                if self.on_start is not None:
+                    try:
+                        self.on_start()
+                    except Exception as e:
+                        logger.error(f"Could not expire stale suggestions: {str(e)}")
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'suggestions-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self) -> Dict[str, List[int]]:
+        """Block for one job, then gather more until the batch holds `batch_size` distinct texts or time is up."""
+        recommendation_id, text = self._queue.get()
+        batch = {text: [recommendation_id]}
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                recommendation_id, text = self._queue.get(timeout=remaining) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.setdefault(text, []).append(recommendation_id)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Suggestion batch failed: {str(e)}")
+                for ids in batch.values():
+                    self._complete(ids, None, FAILED)
+
+    def _process(self, batch: Dict[str, List[int]]):
+        texts = list(batch)
+        cached = self.lookup(texts)
+        missing = []
+        for text, suggestion in zip(texts, cached):
+            if suggestion is not None:
+                self._complete(batch[text], suggestion, READY)
+            else:
+                missing.append(text)
+        if not missing:
+            return
+
+        try:
+            suggestions = self._generate_batch(missing)
+        except Exception as e:
+            # The API itself failed (network, quota); a prompt per stock would only repeat the error
+            logger.error(f"LLM error ({self.client.name}): {e}")
+            suggestions = [None] * len(missing)
+        if suggestions is None:
+            # Answered, but not in the batched format: one prompt per stock
+            self._count('retried', len(missing))
+            suggestions = [self._generate_one(text) for text in missing]
+
+        generated = {cache_key(text): suggestion for text, suggestion in zip(missing, suggestions)
+                     if suggestion is not None}
+        if generated:
+            self.cache.set_many(generated, timeout=self.cache_ttl)
+        for text, suggestion in zip(missing, suggestions):
+            self._complete(batch[text], suggestion, READY if suggestion is not None else FAILED)
+
+    def _generate_batch(self, texts: List[str]) -> Optional[List[str]]:
+        """Suggestions of every text from one prompt; None if the answer cannot be parsed. Raises if the call fails."""
+        self._count('llm_calls')
+        return parse_batch_response(self.client.generate(batch_prompt(texts)), len(texts))
+
+    def _generate_one(self, text: str) -> Optional[str]:
+        self._count('llm_calls')
+        prompt = (
+            "Given the following stock data, explain in 3–5 lines why this stock is a good investment:\n\n"
+            f"{text}\n\n"
+            "Response:"
+        )
+        try:
+            return self.client.generate(prompt).strip() or None
+        except Exception as e:
+            logger.error(f"LLM error ({self.client.name}): {e}")
+            return None
+
+    def _complete(self, recommendation_ids: List[int], suggestion: Optional[str], status: str):
+        self._count('completed' if status == READY else 'failed', len(recommendation_ids))
+        try:
+            self.on_complete(recommendation_ids, suggestion, status)
+        except Exception as e:
+            logger.error(f"Could not store suggestions for {recommendation_ids}: {str(e)}")
+
+
+suggestion_worker = SuggestionWorker()
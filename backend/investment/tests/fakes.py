@@ -0,0 +1,70 @@
+"""In-process stand-ins for the LLM and cache the suggestion worker talks to.
+
+Used by the tests in this package and by `stocks.benchmarks`.
+"""
+import re
+import json
+import time
+import random
+import threading
+from typing import Dict, Iterable, List
+
+from ..suggestions import STOCK_HEADING, LLMClient
+
+
+class FakeLLMClient(LLMClient):
+    """In-process LLM with configurable latency and failures, for tests and benchmarks.
+
+    Answers batched prompts with a JSON array holding one suggestion per stock
+    heading, and other prompts with a single line.
+
+    Args:
+        latency: Seconds each call sleeps
+        failure_rate: Probability that a call raises ConnectionError
+        seed: Seed for the failure draws
+        malformed_batches: Answer batched prompts with prose instead of a JSON array
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0,
+                 malformed_batches: bool = False):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.malformed_batches = malformed_batches
+        self.prompts: List[str] = []
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+            fail = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("Simulated LLM failure")
+        symbols = re.findall(r'^Symbol: (.*)$', prompt, flags=re.MULTILINE)
+        if STOCK_HEADING.format(1) not in prompt:
+            return f"{symbols[0] if symbols else 'This stock'} fits the investment goal."
+        if self.malformed_batches:
+            return "Here are my thoughts on these stocks: all of them look promising."
+        return json.dumps([f"{symbol} fits the investment goal." for symbol in symbols])
+
+
+class FakeCache:
+    """The `get_many`/`set_many` part of Django's cache API, in a dict; timeouts are recorded, not enforced."""
+
+    def __init__(self):
+        self.data: Dict[str, str] = {}
+        self.timeouts: Dict[str, int] = {}
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def set_many(self, mapping: Dict[str, str], timeout=None):
+        self.data.update(mapping)
+        self.timeouts.update(dict.fromkeys(mapping, timeout))
+        return []
@@ -0,0 +1,165 @@
+import threading
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Investment, Recommendation
+from ..suggestions import (FAILED, PENDING, READY, SUGGESTION_STALE_AFTER, LLMClient, SuggestionWorker,
+                           fail_stale_suggestions, parse_batch_response)
+from .fakes import FakeCache, FakeLLMClient
+
+
+class Completions:
+    """`on_complete` callback recording the (suggestion, status) of every id until `expected` have arrived."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.results = {}
+        self.calls = 0
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, ids, suggestion, status):
+        with self._lock:
+            self.calls += 1
+            for recommendation_id in ids:
+                self.results[recommendation_id] = (suggestion, status)
+            if len(self.results) >= self.expected:
+                self.done.set()
+
+    def wait(self):
+        if not self.done.wait(5):
+            raise AssertionError(f"Only {len(self.results)} of {self.expected} suggestions completed")
+        return self.results
+
+
+def stock_text(symbol):
+    return f"Symbol: {symbol}\nCurrent Price: ₹100.00\n"
+
+
+class SuggestionWorkerTests(unittest.TestCase):
+    def worker(self, client, expected, **kwargs):
+        completions = Completions(expected)
+        worker = SuggestionWorker(client=client, cache=kwargs.pop('cache', FakeCache()), on_complete=completions,
+                                  batch_wait=0.5, on_start=None, **kwargs)
+        return worker, completions
+
+    def test_llm_client_is_abstract(self):
+        with self.assertRaises(TypeError):
+            LLMClient()
+
+    def test_stocks_are_explained_in_one_batched_prompt(self):
+        client = FakeLLMClient()
+        worker, completions = self.worker(client, expected=5, workers=1)
+
+        worker.submit([(i, stock_text(f'S{i}')) for i in range(5)])
+        results = completions.wait()
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(results, {i: (f'S{i} fits the investment goal.', READY) for i in range(5)})
+
+    def test_identical_stock_data_is_generated_once(self):
+        client = FakeLLMClient()
+        worker, completions = self.worker(client, expected=4, workers=1)
+
+        worker.submit([(1, stock_text('A')), (2, stock_text('B')), (3, stock_text('A')), (4, stock_text('A'))])
+        results = completions.wait()
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(client.prompts[0].count('Symbol: A'), 1)
+        self.assertEqual({results[i] for i in (1, 3, 4)}, {('A fits the investment goal.', READY)})
+
+    def test_cached_suggestions_skip_the_llm(self):
+        client, cache = FakeLLMClient(), FakeCache()
+        worker, completions = self.worker(client, expected=2, cache=cache)
+        worker.submit([(1, stock_text('A')), (2, stock_text('B'))])
+        completions.wait()
+
+        self.assertEqual(worker.lookup([stock_text('A'), stock_text('C')]),
+                         ['A fits the investment goal.', None])
+        again, completions = self.worker(client, expected=2, cache=cache)
+        again.submit([(3, stock_text('A')), (4, stock_text('B'))])
+        results = completions.wait()
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(results[3], ('A fits the investment goal.', READY))
+        self.assertEqual(again.stats()['cache_hits'], 2)
+
+    def test_unparseable_batch_falls_back_to_one_prompt_per_stock(self):
+        client = FakeLLMClient(malformed_batches=True)
+        worker, completions = self.worker(client, expected=3, workers=1)
+
+        worker.submit([(i, stock_text(f'S{i}')) for i in range(3)])
+        results = completions.wait()
+
+        self.assertEqual(client.calls, 4)
+        self.assertEqual(worker.stats()['retried'], 3)
+        self.assertTrue(all(status == READY for _, status in results.values()))
+
+    def test_llm_failures_mark_suggestions_failed_and_are_not_cached(self):
+        client, cache = FakeLLMClient(failure_rate=1.0), FakeCache()
+        worker, completions = self.worker(client, expected=2, cache=cache, workers=1)
+
+        worker.submit([(1, stock_text('A')), (2, stock_text('B'))])
+        results = completions.wait()
+
+        self.assertEqual(results, {1: (None, FAILED), 2: (None, FAILED)})
+        self.assertEqual(cache.data, {})
+        self.assertEqual(worker.stats()['failed'], 2)
+
+    def test_a_failed_batch_call_is_not_retried_per_stock(self):
+        client = FakeLLMClient(failure_rate=1.0)
+        worker, completions = self.worker(client, expected=5, workers=1)
+
+        worker.submit([(i, stock_text(f'S{i}')) for i in range(5)])
+        results = completions.wait()
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(worker.stats()['retried'], 0)
+        self.assertEqual({status for _, status in results.values()}, {FAILED})
+
+    def test_batch_responses_must_hold_one_string_per_stock(self):
+        self.assertEqual(parse_batch_response('```json\n["a", "b"]\n```', 2), ['a', 'b'])
+        self.assertIsNone(parse_batch_response('["a"]', 2))
+        self.assertIsNone(parse_batch_response('["a", ""]', 2))
+        self.assertIsNone(parse_batch_response('a, b', 2))
+
+
+class StaleSuggestionTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='investor')
+        self.investment = Investment.objects.create(user=user)
+
+    def recommendation(self, status, age):
+        rec = Recommendation.objects.create(investment=self.investment, stock_name='TCS', weight=Decimal('10'),
+                                            suggestion_status=status)
+        Recommendation.objects.filter(id=rec.id).update(created_at=timezone.now() - timedelta(seconds=age))
+        return rec.id
+
+    def test_pending_suggestions_left_by_a_stopped_worker_fail(self):
+        stale = self.recommendation(PENDING, SUGGESTION_STALE_AFTER + 60)
+        recent = self.recommendation(PENDING, 5)
+        ready = self.recommendation(READY, SUGGESTION_STALE_AFTER + 60)
+
+        self.assertEqual(fail_stale_suggestions(), 1)
+
+        status = dict(Recommendation.objects.values_list('id', 'suggestion_status'))
+        self.assertEqual(status, {stale: FAILED, recent: PENDING, ready: READY})
+
+    def test_worker_expires_stale_suggestions_once_on_start(self):
+        stale = self.recommendation(PENDING, SUGGESTION_STALE_AFTER + 60)
+        completions = Completions(expected=2)
+        worker = SuggestionWorker(client=FakeLLMClient(), cache=FakeCache(), on_complete=completions)
+
+        worker.submit([(100, stock_text('A'))])
+        later = self.recommendation(PENDING, SUGGESTION_STALE_AFTER + 60)
+        worker.submit([(101, stock_text('B'))])
+        completions.wait()
+
+        status = dict(Recommendation.objects.values_list('id', 'suggestion_status'))
+        self.assertEqual(status[stale], FAILED)
+        self.assertEqual(status[later], PENDING)
@@ -16,11 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
-from .views import CreateInvestment , RecommendationsByInvestment
+from .views import CreateInvestment , RecommendationsByInvestment, SuggestionsByInvestment
 
 
 urlpatterns = [
     path('create/',CreateInvestment.as_view(),name="handle-investment"),
     path("recommendations/<int:investment_id>/", RecommendationsByInvestment.as_view(), name="recommendations-by-investment"),
+    path("suggestions/<int:investment_id>/", SuggestionsByInvestment.as_view(), name="suggestions-by-investment"),
     # path("/<int:id>/",GetInvestment.as_view(),name = "get-investment"),
 ]
@@ -6,11 +6,13 @@ from rest_framework.generics import ListAPIView
 from rest_framework import status
 from .serializers import InvestmentSerializer, RecommendationSerializer
 from stocks.ml_model import StockRecommender
-from stocks.train_model import train_models
+from stocks.registry import registry
+from stocks.pool import get_pool
+from stocks.train_model import training_job
 from .models import Recommendation
+from .suggestions import PENDING, READY, fail_stale_suggestions, format_stock_data, suggestion_worker
 import os
 import logging
-import google.generativeai as genai
 from django.shortcuts import get_object_or_404
 from .models import Investment
 from dotenv import load_dotenv
@@ -19,48 +21,24 @@ from dotenv import load_dotenv
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# ✅ Configure Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)  # Set your API key as an environment variable
-
-# 🔧 Format stock data into readable text for Gemini
-def format_stock_data(rec):
-    try:
-        return (
-            f"Symbol: {rec.get('symbol')}\n"
-            f"Current Price: ₹{rec.get('current_price', 0):.2f}\n"
-            f"Expected Return: {rec.get('expected_return', 0) * 100:.2f}%\n"
-            f"Projected Value: ₹{rec.get('projected_value', 0):.2f}\n"
-            f"Risk-Adjusted Score: {rec.get('risk_adjusted_score', 0):.4f}\n"
-            f"Market Cap Category: {rec.get('market_cap_category')}\n"
-            f"Risk Metrics: {rec.get('risk_metrics')}\n"
-            f"Technical Indicators: {rec.get('technical_indicators')}\n"
-        )
-    except Exception as e:
-        logger.error(f"Failed to format stock data: {e}")
-        return "N/A"
-
-# 📤 Generate suggestion using Gemini
-def generate_suggestion(stock_data):
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    prompt = (
-        "Given the following stock data, explain in 3–5 lines why this stock is a good investment:\n\n"
-        f"{stock_data}\n\n"
-        "Response:"
-    )
-
-    try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        logger.error(f"Gemini API error: {e}")
-        return "Suggestion could not be generated."
+# Seconds a client should wait before retrying while models are being trained
+MODELS_NOT_READY_RETRY_AFTER = 60
 
 # 🚀 Main API view
 class CreateInvestment(APIView):
     def post(self, request):
         serializer = InvestmentSerializer(data=request.data)
         if serializer.is_valid():
+            # Models are trained in the background; never train on the request path
+            if not registry.is_ready():
+                training_job.start()
+                return Response({
+                    "error": "Recommendation models are still being trained",
+                    "training": training_job.status(),
+                    "retry_after": MODELS_NOT_READY_RETRY_AFTER
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(MODELS_NOT_READY_RETRY_AFTER)})
+
             investment = serializer.save()
 
             data = serializer.validated_data
@@ -70,9 +48,6 @@ class CreateInvestment(APIView):
             investment_duration = int(data.get("investment_duration", 60))
 
             try:
-                logger.info("Training models for all categories...")
-                train_models()
-
                 test_params = {
                     'rts_score': rts_score,
                     'target_amount': target_amount,
@@ -82,23 +57,33 @@ class CreateInvestment(APIView):
 
                 all_recommendations = StockRecommender.get_all_recommendations(**test_params)
 
-                for rec in all_recommendations:
-                    stock_info = format_stock_data(rec)
-                    suggestion = generate_suggestion(stock_info)
-                    # suggestion = "suggestion"
-
-                    Recommendation.objects.create(
+                # Suggestions come from the cache or are generated in the background; clients poll their status
+                stock_texts = [format_stock_data(rec) for rec in all_recommendations]
+                cached = suggestion_worker.lookup(stock_texts)
+                pending = []
+                for rec, stock_info, suggestion in zip(all_recommendations, stock_texts, cached):
+                    recommendation = Recommendation.objects.create(
                         investment=investment,
                         stock_name=rec['symbol'],
                         weight=float(rec.get('weight', 0)),
                         notes=rec.get('market_cap_category', ''),
-                        suggestion=suggestion
+                        suggestion=suggestion,
+                        suggestion_status=READY if suggestion is not None else PENDING
                     )
+                    if suggestion is None:
+                        pending.append((recommendation.id, stock_info))
+                suggestion_worker.submit(pending)
+
+                # Seeded by the investment so its projection is reproducible
+                projection = get_pool().project(all_recommendations, monthly_investment, investment_duration,
+                                                target_amount, seed=investment.id)
 
                 return Response({
                     "investment_id":investment.id,
                     "investment": serializer.data,
-                    "recommendations": all_recommendations
+                    "recommendations": all_recommendations,
+                    "suggestions_pending": len(pending),
+                    "projection": projection.to_dict() if projection is not None else None
                 }, status=status.HTTP_201_CREATED)
 
             except Exception as e:
@@ -118,6 +103,19 @@ class RecommendationsByInvestment(ListAPIView):
         investment_id = self.kwargs['investment_id']
         return Recommendation.objects.filter(investment__id=investment_id)
     
+class SuggestionsByInvestment(APIView):
+    """Suggestion status of every recommendation of an investment, for clients to poll."""
+
+    def get(self, request, investment_id):
+        recommendations = Recommendation.objects.filter(investment__id=investment_id)
+        # Jobs queued by a worker process that has since stopped will never finish
+        fail_stale_suggestions(recommendations)
+        suggestions = list(recommendations.values('id', 'stock_name', 'suggestion_status', 'suggestion'))
+        return Response({
+            "pending": sum(s['suggestion_status'] == PENDING for s in suggestions),
+            "suggestions": suggestions
+        }, status=status.HTTP_200_OK)
+
 class GetInvestment(APIView):
     def get(self, request, investment_id):
         # Make sure the investment exists
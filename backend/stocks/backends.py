@@ -0,0 +1,141 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Union
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from threadpoolctl import threadpool_limits
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+# Most training rows a single tree of the forest is fitted on
+MAX_TREE_SAMPLES = 20000
+
+RANDOM_FOREST = 'random_forest'
+HIST_GRADIENT_BOOSTING = 'hist_gradient_boosting'
+LINEAR = 'linear'
+DEFAULT_BACKEND = RANDOM_FOREST
+
+# Environment variable selecting a category's backend, e.g. MODEL_BACKEND_SMALL_CAP=linear
+BACKEND_ENV = 'MODEL_BACKEND_{}'
+
+
+class ModelBackend(ABC):
+    """Regression model behind a `StockRecommender`: builds, fits and names its estimator and scaler.
+
+    Fitted estimators and scalers are saved and memory-mapped as they are, so
+    every backend predicts through the plain sklearn `predict`/`transform` API.
+    """
+
+    name = 'backend'
+
+    @abstractmethod
+    def create_model(self) -> BaseEstimator:
+        """A new, unfitted estimator."""
+
+    def create_scaler(self) -> BaseEstimator:
+        return StandardScaler()
+
+    def fit(self, model: BaseEstimator, X: np.ndarray, y: np.ndarray, n_jobs: Optional[int] = None):
+        """Fit `model` on at most `n_jobs` threads; it keeps predicting single-threaded.
+
+        `n_jobs` is passed to estimators that take it, and also caps the OpenMP and
+        BLAS thread pools, which would otherwise start one thread per core.
+        """
+        threaded = n_jobs is not None and 'n_jobs' in model.get_params()
+        if threaded:
+            model.set_params(n_jobs=n_jobs)
+        try:
+            with threadpool_limits(limits=n_jobs):
+                model.fit(X, y)
+        finally:
+            if threaded:
+                model.set_params(n_jobs=None)
+
+
+class RandomForestBackend(ModelBackend):
+    """The original random forest.
+
+    Each tree fits a bootstrap sample of at most `max_tree_samples` rows, so
+    training time stays flat as the universe grows while all rows are still used
+    across the forest.
+    """
+
+    name = RANDOM_FOREST
+
+    def __init__(self, n_estimators: int = 100, max_tree_samples: int = MAX_TREE_SAMPLES, random_state: int = 42):
+        self.n_estimators = n_estimators
+        self.max_tree_samples = max_tree_samples
+        self.random_state = random_state
+
+    def create_model(self) -> BaseEstimator:
+        return RandomForestRegressor(n_estimators=self.n_estimators, random_state=self.random_state)
+
+    def fit(self, model: BaseEstimator, X: np.ndarray, y: np.ndarray, n_jobs: Optional[int] = None):
+        if getattr(model, 'bootstrap', False):
+            model.set_params(max_samples=min(self.max_tree_samples, len(X)))
+        super().fit(model, X, y, n_jobs)
+
+
+class HistGradientBoostingBackend(ModelBackend):
+    """Histogram gradient boosting: binned features, so fit time grows slowly with rows and the artifact is small.
+
+    Stops early on a held-out tenth of the rows. It threads through OpenMP, not
+    `n_jobs`; `fit` caps the OpenMP pool instead.
+    """
+
+    name = HIST_GRADIENT_BOOSTING
+
+    def __init__(self, max_iter: int = 200, learning_rate: float = 0.05, max_leaf_nodes: int = 31,
+                 random_state: int = 42):
+        self.max_iter = max_iter
+        self.learning_rate = learning_rate
+        self.max_leaf_nodes = max_leaf_nodes
+        self.random_state = random_state
+
+    def create_model(self) -> BaseEstimator:
+        return HistGradientBoostingRegressor(max_iter=self.max_iter, learning_rate=self.learning_rate,
+                                             max_leaf_nodes=self.max_leaf_nodes, early_stopping=True,
+                                             random_state=self.random_state)
+
+
+class LinearBackend(ModelBackend):
+    """Ridge regression on the scaled features, the baseline the other backends have to beat."""
+
+    name = LINEAR
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+
+    def create_model(self) -> BaseEstimator:
+        return Ridge(alpha=self.alpha)
+
+
+BACKENDS: Dict[str, type] = {
+    RANDOM_FOREST: RandomForestBackend,
+    HIST_GRADIENT_BOOSTING: HistGradientBoostingBackend,
+    LINEAR: LinearBackend,
+}
+
+
+def get_backend(backend: Union[str, ModelBackend, None] = None) -> ModelBackend:
+    """Backend instance of a name in `BACKENDS` (default `DEFAULT_BACKEND`), or the instance given."""
+    if isinstance(backend, ModelBackend):
+        return backend
+    name = backend or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def backend_for(category: str) -> str:
+    """Backend name configured for a market cap category through MODEL_BACKEND_<CATEGORY>."""
+    name = os.getenv(BACKEND_ENV.format(category.upper()), DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        logger.warning(f"Unknown model backend {name!r} for {category}, using {DEFAULT_BACKEND}")
+        return DEFAULT_BACKEND
+    return name
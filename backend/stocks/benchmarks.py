@@ -0,0 +1,1655 @@
+"""Performance benchmarks for the stock recommender.
+
+Run from the backend directory, e.g.::
+
+    python -m stocks.benchmarks features --sizes 50 500 2000
+    python -m stocks.benchmarks inference --symbols 2000
+    python -m stocks.benchmarks fetch --symbols 200 --latency 0.05
+    python -m stocks.benchmarks load --symbols 500
+    python -m stocks.benchmarks pool --symbols 1000
+    python -m stocks.benchmarks service --symbols 500 --clients 16
+    python -m stocks.benchmarks feed --clients 200
+    python -m stocks.benchmarks stream --clients 50
+    python -m stocks.benchmarks backpressure --fast 50 --slow 10
+    python -m stocks.benchmarks cluster --workers 4 --clients 100
+    python -m stocks.benchmarks bulk --symbols 10 --latency 0.2
+    python -m stocks.benchmarks parse --sizes 10000 100000 500000
+    python -m stocks.benchmarks risk --symbols 20 --latency 0.05
+    python -m stocks.benchmarks matrix --sizes 500 2000
+    python -m stocks.benchmarks portfolio --sizes 50 500 1000
+    python -m stocks.benchmarks projection --paths 10000 --months 120 --assets 20
+    python -m stocks.benchmarks suggestions --investments 20 --latency 0.3
+    python -m stocks.benchmarks quotes --clients 50 --latency 0.2
+    python -m stocks.benchmarks symbols --symbols 2000
+    python -m stocks.benchmarks universe --symbols 2000
+    python -m stocks.benchmarks training --symbols 600
+    python -m stocks.benchmarks models --symbols 300 --backends linear hist_gradient_boosting
+"""
+import io
+import os
+import time
+import contextlib
+import tempfile
+import threading
+import logging
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from typing import Dict
+from urllib.parse import parse_qs, urlsplit
+from joblib import dump, load as joblib_load
+
+from . import ml_model
+from .ml_model import StockRecommender
+from .backends import RANDOM_FOREST, get_backend
+from .features import FEATURE_COLUMNS, PricePanel, compute_features, training_matrix
+from .indicators import build_indicator_states
+from .fetcher import HistoryFetcher
+from .tests.fakes import FakeProvider, FakeQuoteSource
+from .store import PriceStore
+from .registry import CATEGORIES, ModelRegistry
+from .pool import RecommenderPool
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_stock_data(n_symbols: int, n_days: int = 250, seed: int = 42) -> Dict[str, pd.DataFrame]:
+    """Generate yfinance-shaped daily OHLCV histories following a geometric random walk."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-04-04', periods=n_days, tz='Asia/Kolkata', name='Date')
+    returns = rng.normal(0.0005, 0.02, size=(n_days, n_symbols))
+    close = 100 * rng.uniform(0.5, 20, size=n_symbols) * np.exp(np.cumsum(returns, axis=0))
+    volume = rng.lognormal(13, 0.5, size=(n_days, n_symbols)).round()
+
+    stock_data = {}
+    for j in range(n_symbols):
+        c = close[:, j]
+        stock_data[f'SYN{j:04d}.NS'] = pd.DataFrame({
+            'Open': c * (1 + rng.normal(0, 0.005, n_days)),
+            'High': c * (1 + np.abs(rng.normal(0, 0.01, n_days))),
+            'Low': c * (1 - np.abs(rng.normal(0, 0.01, n_days))),
+            'Close': c,
+            'Volume': volume[:, j],
+        }, index=dates)
+    return stock_data
+
+
+def _per_frame_training_data(recommender: StockRecommender, stock_data: Dict[str, pd.DataFrame]):
+    """The original per-DataFrame feature path, kept as the benchmark baseline."""
+    all_X, all_y = [], []
+    for df in stock_data.values():
+        df = recommender.calculate_features(df.copy())
+        X = df[FEATURE_COLUMNS].values[:-1]
+        y = df['Returns_Shifted'].values[:-1]
+        valid = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+        all_X.append(X[valid])
+        all_y.append(y[valid])
+    return np.vstack(all_X), np.concatenate(all_y)
+
+
+def bench_features(sizes=(50, 500, 2000), n_days: int = 250):
+    """Compare feature throughput of the per-DataFrame path and the panel engine."""
+    recommender = StockRecommender.__new__(StockRecommender)
+    print(f"{'symbols':>8} {'per-frame s':>12} {'panel s':>10} {'speedup':>8} {'symbols/s':>12} {'max abs diff':>13}")
+    for n_symbols in sizes:
+        stock_data = synthetic_stock_data(n_symbols, n_days)
+
+        start = time.perf_counter()
+        X_ref, y_ref = _per_frame_training_data(recommender, stock_data)
+        per_frame = time.perf_counter() - start
+
+        start = time.perf_counter()
+        panel = PricePanel.from_frames(stock_data)
+        X, y, _ = training_matrix(panel, compute_features(panel))
+        batched = time.perf_counter() - start
+
+        diff = max(np.max(np.abs(X - X_ref)), np.max(np.abs(y - y_ref)))
+        print(f"{n_symbols:>8} {per_frame:>12.3f} {batched:>10.3f} {per_frame / batched:>7.1f}x "
+              f"{n_symbols / batched:>12.0f} {diff:>13.2e}")
+
+
+def _per_symbol_recommendations(recommender: StockRecommender, rts_score=50, monthly_investment=50000,
+                                investment_duration=60):
+    """The original get_recommendations loop: one transform and predict per symbol."""
+    recommendations = []
+    for symbol, data in recommender.stock_data.items():
+        metrics = recommender.get_stock_metrics(symbol, data.copy())
+        if metrics is None:
+            continue
+        metrics['risk_adjusted_score'] = recommender.calculate_risk_adjusted_score(metrics, rts_score)
+        metrics.update(recommender.calculate_investment_metrics(
+            metrics['current_price'], metrics['expected_return'], monthly_investment, investment_duration))
+        recommendations.append(metrics)
+    recommendations.sort(key=lambda x: x['risk_adjusted_score'], reverse=True)
+    return recommendations[:5]
+
+
+def trained_recommender(n_symbols: int, n_days: int = 250, n_train_symbols: int = 40,
+                        seed: int = 42) -> StockRecommender:
+    """An in-memory recommender over a synthetic universe, fitted on its first symbols."""
+    recommender = StockRecommender.__new__(StockRecommender)
+    recommender.backend = get_backend(RANDOM_FOREST)
+    recommender.model = recommender.backend.create_model()
+    recommender.scaler = recommender.backend.create_scaler()
+    recommender.stock_data = synthetic_stock_data(n_symbols, n_days, seed)
+    recommender.indicator_states = {}
+    train_data = dict(list(recommender.stock_data.items())[:n_train_symbols])
+    X, y = recommender.prepare_training_data(train_data)
+    recommender.backend.fit(recommender.model, recommender.scaler.fit_transform(X), y, n_jobs=os.cpu_count())
+    recommender.is_trained = True
+    return recommender
+
+
+def bench_inference(n_symbols: int = 2000, repeat: int = 3):
+    """Compare per-symbol scoring with batched get_recommendations on a synthetic universe."""
+    recommender = trained_recommender(n_symbols)
+
+    def best_of(fn):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    per_symbol, reference = best_of(lambda: _per_symbol_recommendations(recommender))
+    panel, batched = best_of(lambda: recommender.get_recommendations())
+    recommender.indicator_states = build_indicator_states(recommender.stock_data)
+    incremental, from_states = best_of(lambda: recommender.get_recommendations())
+
+    same = [r['symbol'] for r in reference] == [r['symbol'] for r in batched] == [r['symbol'] for r in from_states]
+    print(f"universe: {n_symbols} symbols, top-5 identical: {same}")
+    print(f"{'path':<36} {'seconds':>9} {'symbols/s':>11} {'speedup':>8}")
+    for name, seconds in [('per-symbol transform/predict', per_symbol),
+                          ('batched, panel features', panel),
+                          ('batched, incremental indicators', incremental)]:
+        print(f"{name:<36} {seconds:>9.3f} {n_symbols / seconds:>11.0f} {per_symbol / seconds:>7.1f}x")
+
+
+def bench_fetch(n_symbols: int = 200, latency: float = 0.05, failure_rate: float = 0.05,
+                rate_limit: float = 100.0, max_workers: int = 16):
+    """Compare the serial verify-then-fetch download with the concurrent single-pass fetcher."""
+    symbols = [f'SYN{j:04d}.NS' for j in range(n_symbols)]
+
+    provider = FakeProvider(latency=latency, failure_rate=failure_rate, rate_limit=rate_limit, name='serial')
+    serial = HistoryFetcher(provider, max_workers=1, max_retries=0)
+    start = time.perf_counter()
+    verified = list(serial.fetch_many(symbols, period='1mo', min_rows=21))
+    serial_data = serial.fetch_many(verified, period='1y')
+    serial_time, serial_calls = time.perf_counter() - start, provider.calls
+
+    provider = FakeProvider(latency=latency, failure_rate=failure_rate, rate_limit=rate_limit, name='concurrent')
+    concurrent = HistoryFetcher(provider, max_workers=max_workers, max_retries=3, backoff=latency)
+    start = time.perf_counter()
+    concurrent_data = concurrent.fetch_many(symbols, period='1y', min_rows=21)
+    concurrent_time, concurrent_calls = time.perf_counter() - start, provider.calls
+
+    print(f"{n_symbols} symbols, {latency * 1000:.0f} ms latency, {failure_rate:.0%} failures, "
+          f"{rate_limit:.0f} req/s limit")
+    print(f"{'path':<32} {'seconds':>9} {'requests':>9} {'symbols ok':>11}")
+    print(f"{'serial verify + fetch':<32} {serial_time:>9.2f} {serial_calls:>9} {len(serial_data):>11}")
+    print(f"{f'concurrent x{max_workers} + retries':<32} {concurrent_time:>9.2f} {concurrent_calls:>9} "
+          f"{len(concurrent_data):>11}")
+
+
+def save_recommender(recommender: StockRecommender, model_dir: str):
+    """Save an in-memory recommender's artifacts into `model_dir`."""
+    os.makedirs(model_dir, exist_ok=True)
+    recommender.model_dir = model_dir
+    recommender.model_path = os.path.join(model_dir, 'stock_recommender.joblib')
+    recommender.scaler_path = os.path.join(model_dir, 'scaler.joblib')
+    recommender.symbols_path = os.path.join(model_dir, 'symbols.json')
+    recommender.indicator_state_path = os.path.join(model_dir, 'indicator_state.joblib')
+    recommender.backend_path = os.path.join(model_dir, ml_model.BACKEND_FILE)
+    recommender.save_model()
+
+
+def bench_load(n_symbols: int = 500, repeat: int = 20):
+    """Compare per-request joblib unpickling with the mmapped, process-cached artifacts."""
+    recommender = trained_recommender(n_symbols)
+    recommender.indicator_states = build_indicator_states(recommender.stock_data)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceStore(os.path.join(tmp, 'prices'))
+        for symbol, df in recommender.stock_data.items():
+            store.append(symbol, df)
+
+        # The original layout: everything pickled, including the price history
+        legacy_dir = os.path.join(tmp, 'legacy')
+        os.makedirs(legacy_dir)
+        dump(recommender.model, os.path.join(legacy_dir, 'stock_recommender.joblib'))
+        dump(recommender.scaler, os.path.join(legacy_dir, 'scaler.joblib'))
+        dump(recommender.stock_data, os.path.join(legacy_dir, 'stock_data.joblib'))
+
+        model_dir = os.path.join(tmp, 'model')
+        save_recommender(recommender, model_dir)
+
+        def legacy_request():
+            model = joblib_load(os.path.join(legacy_dir, 'stock_recommender.joblib'))
+            scaler = joblib_load(os.path.join(legacy_dir, 'scaler.joblib'))
+            stock_data = joblib_load(os.path.join(legacy_dir, 'stock_data.joblib'))
+            return model, scaler, stock_data
+
+        def cached_request():
+            return StockRecommender(model_dir, store=store).get_recommendations()
+
+        def timed(fn, n):
+            timings = []
+            for _ in range(n):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            return np.median(timings) * 1000
+
+        legacy = timed(legacy_request, max(1, repeat // 4))
+        ml_model._artifact_cache.clear()
+        cold = timed(cached_request, 1)
+        warm = timed(cached_request, repeat)
+        warm_load = timed(lambda: StockRecommender(model_dir, store=store), repeat)
+
+    print(f"universe: {n_symbols} symbols")
+    print(f"{'path':<40} {'ms':>9}")
+    print(f"{'joblib load per request (no scoring)':<40} {legacy:>9.1f}")
+    print(f"{'cold: mmap load + score':<40} {cold:>9.1f}")
+    print(f"{'warm: cached load + score':<40} {warm:>9.1f}")
+    print(f"{'warm: cached load only':<40} {warm_load:>9.2f}")
+
+
+def _serial_all_recommendations(registry: ModelRegistry, rts_score=50, target_amount=1000000,
+                                monthly_investment=50000, investment_duration=60):
+    """The original get_all_recommendations: score categories one by one, then sort everything."""
+    all_recommendations = []
+    for category in CATEGORIES:
+        recommender = registry.get_recommender(category)
+        recs = recommender.get_recommendations(rts_score, target_amount, monthly_investment, investment_duration)
+        for rec in recs:
+            rec['market_cap_category'] = category
+        all_recommendations.extend(recs)
+    all_recommendations.sort(key=lambda x: x['risk_adjusted_score'], reverse=True)
+    return all_recommendations[:5]
+
+
+def bench_pool(n_symbols: int = 1000, repeat: int = 20):
+    """Compare serial per-category scoring with the concurrent recommender pool."""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(root=tmp)
+        for seed, category in enumerate(CATEGORIES):
+            recommender = trained_recommender(n_symbols, seed=seed)
+            recommender.indicator_states = build_indicator_states(recommender.stock_data)
+            version, staging_dir = registry.create_staging(category)
+            save_recommender(recommender, staging_dir)
+            registry.publish(category, version)
+
+        pool = RecommenderPool(registry)
+        pool.warm()
+
+        def timed(fn):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = fn()
+                timings.append(time.perf_counter() - start)
+            return np.median(timings) * 1000, result
+
+        serial, reference = timed(lambda: _serial_all_recommendations(registry))
+        pooled, (merged, _) = timed(lambda: pool.rank(50, 1000000, 50000, 60))
+        stats = {category: s for category, s in pool.stats().items() if s['calls']}
+
+    same = [(r['market_cap_category'], r['symbol']) for r in reference] == \
+        [(r['market_cap_category'], r['symbol']) for r in merged]
+    print(f"{len(CATEGORIES)} categories x {n_symbols} symbols on {os.cpu_count()} CPUs, top-5 identical: {same}")
+    print(f"{'path':<32} {'median ms':>10}")
+    print(f"{'serial + sort':<32} {serial:>10.1f}")
+    print(f"{'pool, concurrent + heap merge':<32} {pooled:>10.1f}")
+    print(f"{'category':<12} {'calls':>6} {'mean ms':>9} {'max ms':>9}")
+    for category, s in stats.items():
+        print(f"{category:<12} {s['calls']:>6} {s['total_seconds'] / s['calls'] * 1000:>9.1f} "
+              f"{s['max_seconds'] * 1000:>9.1f}")
+
+
+def bench_service(n_symbols: int = 500, clients: int = 16, requests_per_client: int = 25):
+    """Load test: p50/p99 latency of concurrent POSTs to StockRecommendationView.
+
+    Needs the Django settings (DJANGO_SETTINGS_MODULE, defaulting to backend.settings).
+    """
+    _setup_django()
+    from concurrent.futures import ThreadPoolExecutor
+    from rest_framework.test import APIRequestFactory
+    from .service import InferenceService
+    from .views import StockRecommendationView
+
+    factory = APIRequestFactory()
+    body = {'rts_score': 55, 'target_amount': 1000000, 'monthly_investment': 50000, 'investment_duration': 60}
+
+    def load_test(view):
+        def client(_):
+            results = []
+            for _ in range(requests_per_client):
+                request = factory.post('/stocks/api/recommendations/', body, format='json')
+                start = time.perf_counter()
+                response = view(request)
+                results.append((time.perf_counter() - start, response.status_code))
+            return results
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            results = [r for rs in executor.map(client, range(clients)) for r in rs]
+        wall = time.perf_counter() - start
+        latencies = np.array([r[0] for r in results]) * 1000
+        codes = sorted({r[1] for r in results})
+        return np.percentile(latencies, 50), np.percentile(latencies, 99), len(results) / wall, codes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        empty = InferenceService(RecommenderPool(ModelRegistry(root=os.path.join(tmp, 'empty'))), training_job=None)
+        empty.warm(background=False)
+
+        registry = ModelRegistry(root=os.path.join(tmp, 'models'))
+        for seed, category in enumerate(CATEGORIES):
+            recommender = trained_recommender(n_symbols, seed=seed)
+            recommender.indicator_states = build_indicator_states(recommender.stock_data)
+            version, staging_dir = registry.create_staging(category)
+            save_recommender(recommender, staging_dir)
+            registry.publish(category, version)
+        ready = InferenceService(RecommenderPool(registry), training_job=None)
+        ready.warm(background=False)
+
+        print(f"{clients} concurrent clients x {requests_per_client} POSTs, "
+              f"{len(CATEGORIES)} categories x {n_symbols} symbols, {os.cpu_count()} CPUs")
+        print(f"{'service state':<16} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'status':>8}")
+        for name, service in [('no model', empty), ('ready', ready)]:
+            p50, p99, throughput, codes = load_test(StockRecommendationView.as_view(service=service))
+            print(f"{name:<16} {p50:>9.1f} {p99:>9.1f} {throughput:>8.1f} {','.join(map(str, codes)):>8}")
+
+
+def _setup_django():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def bench_feed(clients: int = 200, seconds: float = 3.0, latency: float = 0.02, interval: float = 0.5):
+    """Per-socket polling loops vs the shared market-data producer.
+
+    Connects `clients` WebSockets through the channel layer and measures upstream
+    calls per poll interval and the worst event-loop stall. Needs the Django settings.
+    """
+    import asyncio
+    import json
+    _setup_django()
+    from channels.generic.websocket import AsyncWebsocketConsumer
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+    from .consumers import StockConsumer
+    from .feed import TOP_10_COMPANIES, MarketDataFeed
+
+    class PerSocketConsumer(AsyncWebsocketConsumer):
+        """The original consumer: one blocking polling loop per socket."""
+        source = None
+
+        async def connect(self):
+            await self.accept()
+            self.task = asyncio.create_task(self.send_stock_data())
+
+        async def disconnect(self, close_code):
+            self.task.cancel()
+
+        async def send_stock_data(self):
+            while True:
+                await self.send(text_data=json.dumps({"data": self.source(TOP_10_COMPANIES)}))
+                await asyncio.sleep(interval)
+
+    async def run(application, source):
+        stalls = []
+
+        async def heartbeat():
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                stalls.append(time.perf_counter() - start - 0.01)
+
+        monitor = asyncio.create_task(heartbeat())
+        communicators = [WebsocketCommunicator(application, '/ws/data/') for _ in range(clients)]
+        await asyncio.gather(*(communicator.connect(timeout=600) for communicator in communicators))
+        subscribe = json.dumps({"action": "subscribe", "symbols": TOP_10_COMPANIES})
+        await asyncio.gather(*(communicator.send_to(text_data=subscribe) for communicator in communicators))
+        calls_before = source.calls
+        await asyncio.sleep(seconds)
+        calls = source.calls - calls_before
+        await asyncio.gather(*(communicator.disconnect(timeout=600) for communicator in communicators))
+        received = sum(communicator.output_queue.qsize() for communicator in communicators)
+        monitor.cancel()
+        return calls / (seconds / interval), max(stalls), received
+
+    print(f"{clients} clients, {len(TOP_10_COMPANIES)} symbols, {latency * 1000:.0f} ms per upstream call, "
+          f"{interval}s poll interval, {seconds}s run")
+    print(f"{'path':<26} {'calls/interval':>15} {'max loop stall ms':>18} {'messages':>9}")
+
+    source = FakeQuoteSource(latency)
+    PerSocketConsumer.source = source
+    calls, stall, received = asyncio.run(run(PerSocketConsumer.as_asgi(), source))
+    print(f"{'per-socket loops':<26} {calls:>15.1f} {stall * 1000:>18.1f} {received:>9}")
+
+    source = FakeQuoteSource(latency)
+    feed = MarketDataFeed(fetch=source, interval=interval, channel_layer=get_channel_layer())
+    consumer = type('BenchStockConsumer', (StockConsumer,), {'feed': feed})
+    calls, stall, received = asyncio.run(run(consumer.as_asgi(), source))
+    print(f"{'shared producer':<26} {calls:>15.1f} {stall * 1000:>18.1f} {received:>9}")
+    print(f"producer running after last disconnect: {feed.running}")
+
+
+def bench_stream(clients: int = 50, ticks: int = 40, move_probability: float = 0.3, interval: float = 0.05):
+    """Bytes per client per minute: full snapshots every tick vs subscribe + deltas.
+
+    Runs the real consumer over the channel layer with a fast poll interval and
+    scales the traffic to the production 5 s interval. Needs the Django settings.
+    """
+    import asyncio
+    import json
+    _setup_django()
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+    from .consumers import StockConsumer
+    from .feed import POLL_INTERVAL, TOP_10_COMPANIES, MarketDataFeed
+
+    source = FakeQuoteSource(move_probability=move_probability)
+    legacy_bytes = []
+
+    def fetch(symbols):
+        snapshot = source(symbols)
+        # What the old consumer sent every tick: all ten quotes, default json.dumps
+        legacy_bytes.append(len(json.dumps({"data": snapshot}).encode()))
+        return snapshot
+
+    feed = MarketDataFeed(fetch=fetch, interval=interval, channel_layer=get_channel_layer())
+    consumer = type('BenchStockConsumer', (StockConsumer,), {'feed': feed})
+
+    async def run():
+        communicators = [WebsocketCommunicator(consumer.as_asgi(), '/ws/data/') for _ in range(clients)]
+        await asyncio.gather(*(communicator.connect() for communicator in communicators))
+        subscribe = json.dumps({"action": "subscribe", "symbols": TOP_10_COMPANIES})
+        await asyncio.gather(*(communicator.send_to(text_data=subscribe) for communicator in communicators))
+        while feed.ticks < ticks:
+            await asyncio.sleep(interval)
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+
+        received, gaps = [], 0
+        for communicator in communicators:
+            total, last_seq = 0, 0
+            while not communicator.output_queue.empty():
+                text = communicator.output_queue.get_nowait().get('text') or ''
+                total += len(text.encode())
+                seq = json.loads(text).get('seq', last_seq + 1)
+                gaps += seq != last_seq + 1
+                last_seq = seq
+            received.append(total)
+        return received, gaps
+
+    received, gaps = asyncio.run(run())
+    per_minute = 60 / POLL_INTERVAL
+    legacy = np.mean(legacy_bytes) * per_minute
+    delta = np.mean(received) / feed.ticks * per_minute
+    print(f"{clients} clients x {len(TOP_10_COMPANIES)} symbols, {feed.ticks} ticks, "
+          f"{move_probability:.0%} of quotes move per tick, sequence gaps: {gaps}")
+    print(f"{'protocol':<28} {'bytes/client/min':>17}")
+    print(f"{'full snapshot every tick':<28} {legacy:>17.0f}")
+    print(f"{'snapshot + deltas':<28} {delta:>17.0f}  ({legacy / delta:.1f}x less)")
+
+
+def bench_backpressure(fast_clients: int = 50, slow_clients: int = 10, ticks: int = 40, interval: float = 0.02,
+                       slow_send: float = 0.2):
+    """Fast and slow WebSocket clients sharing one feed: conflation, outbox size and task leaks.
+
+    Slow clients take `slow_send` seconds per message. Needs the Django settings.
+    """
+    import asyncio
+    import json
+    _setup_django()
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+    from .consumers import StockConsumer
+    from .feed import TOP_10_COMPANIES, MarketDataFeed
+    from .metrics import metrics
+
+    feed = MarketDataFeed(fetch=FakeQuoteSource(move_probability=0.5), interval=interval,
+                          channel_layer=get_channel_layer())
+    max_outbox = {'fast': 0, 'slow': 0}
+
+    def consumer_class(kind, delay):
+        class BenchStockConsumer(StockConsumer):
+            async def send(self, *args, **kwargs):
+                if delay:
+                    await asyncio.sleep(delay)
+                await super().send(*args, **kwargs)
+
+            def queue_delta(self, delta):
+                super().queue_delta(delta)
+                max_outbox[kind] = max(max_outbox[kind], len(self.pending_snapshot) + len(self.pending_delta))
+
+        BenchStockConsumer.feed = feed
+        return BenchStockConsumer
+
+    async def run():
+        fast = [WebsocketCommunicator(consumer_class('fast', 0).as_asgi(), '/ws/data/') for _ in range(fast_clients)]
+        slow = [WebsocketCommunicator(consumer_class('slow', slow_send).as_asgi(), '/ws/data/')
+                for _ in range(slow_clients)]
+        communicators = fast + slow
+        await asyncio.gather(*(communicator.connect() for communicator in communicators))
+        subscribe = json.dumps({"action": "subscribe", "symbols": TOP_10_COMPANIES})
+        await asyncio.gather(*(communicator.send_to(text_data=subscribe) for communicator in communicators))
+        while feed.ticks < ticks:
+            await asyncio.sleep(interval)
+        during = metrics.snapshot()['gauges']
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+        await asyncio.sleep(0.1)
+        return ([c.output_queue.qsize() for c in fast], [c.output_queue.qsize() for c in slow], during)
+
+    conflated_before = metrics.counter('ws_updates_conflated')
+    fast_received, slow_received, during = asyncio.run(run())
+    after = metrics.snapshot()['gauges']
+
+    print(f"{fast_clients} fast + {slow_clients} slow clients ({slow_send * 1000:.0f} ms per send), "
+          f"{feed.ticks} polls every {interval * 1000:.0f} ms")
+    print(f"{'clients':<8} {'messages/client':>16} {'max pending symbols':>20}")
+    print(f"{'fast':<8} {np.mean(fast_received):>16.1f} {max_outbox['fast']:>20}")
+    print(f"{'slow':<8} {np.mean(slow_received):>16.1f} {max_outbox['slow']:>20}")
+    print(f"updates conflated: {metrics.counter('ws_updates_conflated') - conflated_before}")
+    print(f"{'gauge':<22} {'connected':>10} {'after disconnect':>17}")
+    for name in ('ws_connections', 'ws_sender_tasks', 'feed_producer_tasks'):
+        print(f"{name:<22} {during.get(name, 0):>10} {after.get(name, 0):>17}")
+
+
+class _FakeSecurityArchive:
+    """NSE price/volume report as CSV text, quoted with thousands separators, after `latency` seconds."""
+
+    HEADER = ('Symbol  ,Series  ,Date  ,Prev Close  ,Open Price  ,High Price  ,Low Price  ,Last Price  ,'
+              'Close Price  ,Average Price  ,Total Traded Quantity  ,Turnover In Rs  ,No. of Trades  ,'
+              'Deliverable Qty  ,% Dly Qt to Traded Qty  ')
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, symbol: str, from_date: str, to_date: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        dates = pd.bdate_range(pd.to_datetime(from_date, format='%d-%m-%Y'), pd.to_datetime(to_date, format='%d-%m-%Y'))
+        rng = np.random.default_rng(abs(hash(symbol)) % 2 ** 32)
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        rows = [self.HEADER]
+        previous = close[0]
+        for date, price in zip(dates, close):
+            open_ = previous * (1 + rng.normal(0, 0.002))
+            volume = int(rng.integers(10 ** 5, 10 ** 7))
+            rows.append(f'"{symbol}","EQ","{date:%d-%b-%Y}","{previous:,.2f}","{open_:,.2f}",'
+                        f'"{max(open_, price) * 1.01:,.2f}","{min(open_, price) * 0.99:,.2f}","{price:,.2f}",'
+                        f'"{price:,.2f}","{(open_ + price) / 2:,.2f}","{volume:,}","{volume * price:,.2f}",'
+                        f'"{volume // 50:,}","{volume // 2:,}","50.00"')
+            previous = price
+        return '\n'.join(rows) + '\n'
+
+
+@contextlib.contextmanager
+def _serving_nse(archive):
+    """Answer every NSE request of stocks.data from `archive`.
+
+    Downloads then run the production path, fetch_price_volume_report included,
+    with only the network replaced.
+    """
+    from . import data
+
+    def nse_urlfetch(url, origin_url=None):
+        query = parse_qs(urlsplit(url).query)
+        text = archive(query['symbol'][0], query['from'][0], query['to'][0])
+        return SimpleNamespace(text=text, content=text.encode(), raise_for_status=lambda: None)
+
+    original = data.nse_urlfetch
+    data.nse_urlfetch = nse_urlfetch
+    try:
+        yield
+    finally:
+        data.nse_urlfetch = original
+
+
+def _year_ranges(from_date: str, to_date: str):
+    """The year-long (from, to) windows NSE accepts per request, as the old path split a range."""
+    start = pd.to_datetime(from_date, format='%d-%m-%Y')
+    end = pd.to_datetime(to_date, format='%d-%m-%Y')
+    ranges = []
+    while start <= end:
+        stop = min(start + pd.Timedelta(days=364), end)
+        ranges.append((start.strftime('%d-%m-%Y'), stop.strftime('%d-%m-%Y')))
+        start = stop + pd.Timedelta(days=1)
+    return ranges
+
+
+def _legacy_price_df(fetch_csv, symbol: str, from_date: str, to_date: str, path: str):
+    """The old per-symbol path: download, write the report to file.csv, read it back and clean every column."""
+    from .data import numeric_cols
+    frames = []
+    for start, stop in _year_ranges(from_date, to_date):
+        with open(path, 'w') as f:
+            f.write(fetch_csv(symbol, start, stop))
+        df = pd.read_csv(path, skipinitialspace=True)
+        df.columns = df.columns.str.strip()
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].str.replace(",", "")
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df["Return %"] = (df["Close Price"] / df["Open Price"] - 1) * 100
+    return df
+
+
+def bench_bulk(n_symbols: int = 10, latency: float = 0.2, days: int = 365, repeat: int = 3):
+    """Sequential file.csv downloads (the old get_top_10_stocks loop) vs get_bulk_price_df.
+
+    The bulk fetch runs through fetch_price_volume_report, locks included; only
+    the network is faked, so its time is what get_top_10_stocks sees.
+    """
+    from .data import get_bulk_price_df
+
+    symbols = [f'SYN{j:04d}' for j in range(n_symbols)]
+    to_date = pd.Timestamp('2025-03-28')
+    from_date = (to_date - pd.Timedelta(days=days)).strftime('%d-%m-%Y')
+    to_date = to_date.strftime('%d-%m-%Y')
+
+    # Parsing alone, on pre-generated responses
+    archive = _FakeSecurityArchive(latency=0)
+    texts = {dates: archive(symbols[0], *dates) for dates in _year_ranges(from_date, to_date)}
+    cached_response = lambda symbol, start, stop: texts[start, stop]
+    # The whole range in one report, as nselib returns it after its own yearly requests
+    chunks = list(texts.values())
+    full_text = chunks[0] + ''.join(text.split('\n', 1)[1] for text in chunks[1:])
+    cached_report = lambda symbol, start, stop: full_text
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'file.csv')
+        start = time.perf_counter()
+        for _ in range(repeat * 10):
+            legacy = _legacy_price_df(cached_response, symbols[0], from_date, to_date, path)
+        legacy_parse = (time.perf_counter() - start) / (repeat * 10)
+        start = time.perf_counter()
+        for _ in range(repeat * 10):
+            bulk = get_bulk_price_df(symbols[:1], from_date, to_date, fetch_report=cached_report, store=None)
+        bulk_parse = (time.perf_counter() - start) / (repeat * 10)
+        assert np.allclose(legacy['Return %'].to_numpy(), bulk['Return %'].to_numpy())
+
+        archive = _FakeSecurityArchive(latency)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for symbol in symbols:
+                _legacy_price_df(archive, symbol, from_date, to_date, path)
+        sequential = (time.perf_counter() - start) / repeat
+
+    # Through fetch_price_volume_report, as get_top_10_stocks downloads, with only the network faked
+    archive = _FakeSecurityArchive(latency)
+    with _serving_nse(archive):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            bulk = get_bulk_price_df(symbols, from_date, to_date, store=None)
+        concurrent = (time.perf_counter() - start) / repeat
+
+    print(f"{n_symbols} symbols x {days} days, {latency * 1000:.0f} ms per request, {len(bulk)} rows")
+    print(f"{'path':<36} {'parse ms/symbol':>16} {'request s':>10}")
+    print(f"{'sequential via file.csv':<36} {legacy_parse * 1000:>16.1f} {sequential:>10.2f}")
+    print(f"{'bulk via fetch_price_volume_report':<36} {bulk_parse * 1000:>16.1f} {concurrent:>10.2f}")
+    print(f"one request per symbol, one at a time: {n_symbols * latency:.2f}s")
+    print(f"speedup: {sequential / concurrent:.1f}x; within the top-10 cache TTL, repeat requests skip the fetch")
+
+
+def _legacy_parse(path: str) -> pd.DataFrame:
+    """The old parse: read file.csv back from disk, strip commas column by column, coerce the prices."""
+    from .data import numeric_cols
+    df = pd.read_csv(path, skipinitialspace=True)
+    df.columns = df.columns.str.strip()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].str.replace(",", "")
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
+    return df
+
+
+def bench_parse(sizes=(10000, 100000, 500000), repeat: int = 3):
+    """file.csv round trip with per-column string cleaning vs the in-memory bhavcopy parser."""
+    from . import bhavcopy
+
+    archive = _FakeSecurityArchive(latency=0)
+    n_days = 250
+    print(f"{'rows':>8} {'MB':>6} {'file.csv + str.replace s':>25} {'parse bytes s':>14} "
+          f"{'nselib frame s':>15} {'speedup':>8}")
+    for n_rows in sizes:
+        n_symbols = max(1, n_rows // n_days)
+        chunks = [archive(f'SYN{j:05d}', '01-01-2024', '31-12-2024').split('\n', 1)[1] for j in range(n_symbols)]
+        body = (archive.HEADER + '\n' + ''.join(chunks)).encode()
+        # What nselib hands back: space-stripped headers, numbers still strings
+        nselib_frame = pd.read_csv(io.BytesIO(body), dtype=str)
+        nselib_frame.columns = [name.replace(' ', '') for name in nselib_frame.columns]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'file.csv')
+            start = time.perf_counter()
+            for _ in range(repeat):
+                with open(path, 'wb') as f:
+                    f.write(body)
+                legacy = _legacy_parse(path)
+            legacy_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parsed = bhavcopy.parse(body)
+        parse_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            normalized = bhavcopy.parse(nselib_frame.copy())
+        frame_time = (time.perf_counter() - start) / repeat
+
+        assert np.allclose(legacy['Close Price'].to_numpy(), parsed['Close Price'].to_numpy())
+        assert np.allclose(parsed['Total Traded Quantity'].to_numpy(), normalized['Total Traded Quantity'].to_numpy())
+        print(f"{len(parsed):>8} {len(body) / 2 ** 20:>6.1f} {legacy_time:>25.3f} {parse_time:>14.3f} "
+              f"{frame_time:>15.3f} {legacy_time / parse_time:>7.1f}x")
+    print("file.csv path leaves volumes as strings and dates unparsed; the parser returns float64 and datetime64")
+
+
+class _FakeIndexData:
+    """Stand-in for nselib's capital_market.index_data; skips every `gap_every`-th trading day."""
+
+    def __init__(self, latency: float = 0.2, gap_every: int = 20):
+        self.latency = latency
+        self.gap_every = gap_every
+        self.calls = 0
+
+    def index_data(self, index: str, from_date: str, to_date: str) -> pd.DataFrame:
+        self.calls += 1
+        time.sleep(self.latency)
+        dates = pd.bdate_range(pd.to_datetime(from_date, format='%d-%m-%Y'), pd.to_datetime(to_date, format='%d-%m-%Y'))
+        if self.gap_every:
+            dates = dates[np.arange(len(dates)) % self.gap_every != self.gap_every - 1]
+        rng = np.random.default_rng(7)
+        close = 22000 * np.exp(np.cumsum(rng.normal(0, 0.008, len(dates))))
+        open_ = close * (1 + rng.normal(0, 0.004, len(dates)))
+        return pd.DataFrame({'TIMESTAMP': dates.strftime('%d-%b-%Y'), 'INDEX_NAME': index,
+                             'OPEN_INDEX_VAL': open_, 'CLOSE_INDEX_VAL': close})
+
+
+def _legacy_market_sensitivity(data, symbol: str, index: str, from_date: str, to_date: str) -> float:
+    """The old beta: stock and index returns truncated to the same length, whatever their dates."""
+    stock_return = data.get_stock_return_df(symbol, from_date, to_date)["Return %"]
+    market_return = data.get_market_return_df(index, from_date, to_date)["Market Return %"]
+    n = min(len(stock_return), len(market_return))
+    stock_return, market_return = stock_return[:n], market_return[:n]
+    covariance = pd.DataFrame({"Stock Return": stock_return, "Market Return": market_return}).cov().iloc[0, 1]
+    return covariance / market_return.var(ddof=1)
+
+
+def bench_risk(n_symbols: int = 20, latency: float = 0.05, days: int = 250):
+    """Per-metric loads in calculate_risk_tolerance vs one batched RiskProfile pass."""
+    from . import data
+
+    symbols = [f'SYN{j:04d}' for j in range(n_symbols)]
+    to_date = pd.Timestamp('2025-03-28')
+    from_date = (to_date - pd.Timedelta(days=days)).strftime('%d-%m-%Y')
+    to_date = to_date.strftime('%d-%m-%Y')
+    archive, index = _FakeSecurityArchive(latency), _FakeIndexData(latency)
+
+    original_load, original_market = data.load_price_df, data.capital_market
+    data.capital_market = index
+    try:
+        # The per-metric functions, as calculate_risk_tolerance used to combine them
+        data.load_price_df = lambda symbol, start, stop: data.download_price_df(symbol, start, stop, archive)
+        start = time.perf_counter()
+        legacy = {}
+        for symbol in symbols:
+            legacy[symbol] = (data.get_std_dev(symbol, from_date, to_date),
+                              _legacy_market_sensitivity(data, symbol, 'NIFTY 50', from_date, to_date),
+                              data.maximum_drawdown(symbol, from_date, to_date),
+                              data.value_at_risk(symbol, from_date, to_date),
+                              data.sharpe_ratio(symbol, from_date, to_date))
+        legacy_time, legacy_calls = time.perf_counter() - start, archive.calls + index.calls
+
+        archive.calls = index.calls = 0
+        start = time.perf_counter()
+        single = {symbol: data.get_risk_profile(symbol, 'NIFTY 50', from_date, to_date, fetch_report=archive, store=None)
+                  for symbol in symbols}
+        single_time, single_calls = time.perf_counter() - start, archive.calls + index.calls
+
+        archive.calls = index.calls = 0
+        start = time.perf_counter()
+        batch = data.get_risk_profiles(symbols, 'NIFTY 50', from_date, to_date, fetch_report=archive, store=None)
+        batch_time, batch_calls = time.perf_counter() - start, archive.calls + index.calls
+    finally:
+        data.load_price_df, data.capital_market = original_load, original_market
+
+    for symbol in symbols:
+        volatility, _, drawdown, var, sharpe = legacy[symbol]
+        profile = batch[symbol]
+        assert np.allclose([volatility, drawdown, var, sharpe],
+                           [profile.volatility, profile.max_drawdown, profile.value_at_risk, profile.sharpe_ratio])
+        assert np.isclose(profile.beta, single[symbol].beta)
+    beta_error = np.mean([abs(legacy[s][1] - batch[s].beta) / abs(batch[s].beta) for s in symbols])
+
+    print(f"{n_symbols} symbols x {days} days, {latency * 1000:.0f} ms per request, "
+          f"index missing every {index.gap_every}th day")
+    print(f"{'path':<34} {'seconds':>8} {'requests':>9}")
+    print(f"{'per-metric functions':<34} {legacy_time:>8.2f} {legacy_calls:>9}")
+    print(f"{'RiskProfile per symbol':<34} {single_time:>8.2f} {single_calls:>9}")
+    print(f"{'RiskProfile batch':<34} {batch_time:>8.2f} {batch_calls:>9}")
+    print(f"volatility, drawdown, VaR and Sharpe match; the length-truncated beta is off by "
+          f"{beta_error:.0%} on average from the date-aligned one")
+
+
+def bench_matrix(sizes=(500, 2000), n_days: int = 252, rolling_window: int = 60):
+    """Per-symbol two-column .cov() betas and pandas matrices vs the batch risk matrix engine."""
+    from .risk_matrix import RiskMatrixCache, compute_risk_matrix
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2024-01-01', periods=n_days)
+    market = pd.Series(rng.normal(0, 1, n_days), index=dates)
+    print(f"{n_days} days, rolling window {rolling_window}, {os.cpu_count()} CPUs")
+    print(f"{'symbols':>8} {'path':<34} {'ms':>9} {'max |error|':>12}")
+    for n_symbols in sizes:
+        returns = pd.DataFrame(rng.normal(0, 1, (n_days, n_symbols)) + np.outer(market, rng.uniform(0.3, 1.7, n_symbols)),
+                               index=dates, columns=[f'SYN{j:04d}' for j in range(n_symbols)])
+
+        start = time.perf_counter()
+        legacy_betas = np.array([pd.DataFrame({'Stock Return': returns[c], 'Market Return': market}).cov().iloc[0, 1]
+                                 / market.var(ddof=1) for c in returns])
+        legacy_cov = returns.cov()
+        legacy_corr = returns.corr()
+        legacy_rolling = returns.rolling(rolling_window).cov(market).div(market.rolling(rolling_window).var(), axis=0)
+        legacy_time = time.perf_counter() - start
+
+        rows = [('per-symbol .cov() + pandas', legacy_time, 0.0)]
+        for dtype in ('float64', 'float32'):
+            start = time.perf_counter()
+            matrix = compute_risk_matrix(returns, market, rolling_window=rolling_window, dtype=dtype)
+            elapsed = time.perf_counter() - start
+            error = max(np.abs(matrix.betas.to_numpy() - legacy_betas).max(),
+                        np.abs(matrix.covariance.to_numpy() - legacy_cov.to_numpy()).max(),
+                        np.abs(matrix.correlation.to_numpy() - legacy_corr.to_numpy()).max(),
+                        np.nanmax(np.abs(matrix.rolling_betas.to_numpy() - legacy_rolling.to_numpy())))
+            rows.append((f'batch engine, {dtype}', elapsed, error))
+
+        start = time.perf_counter()
+        shrunk = compute_risk_matrix(returns, market, shrinkage='ledoit-wolf')
+        rows.append((f'batch + Ledoit-Wolf ({shrunk.shrinkage:.2f})', time.perf_counter() - start, float('nan')))
+
+        cache = RiskMatrixCache()
+        key = (tuple(returns.columns), 'NIFTY 50', n_days, dates[-1])
+        cache.get(key, lambda: compute_risk_matrix(returns, market))
+        start = time.perf_counter()
+        for _ in range(1000):
+            cache.get(key, lambda: compute_risk_matrix(returns, market))
+        rows.append(('cached (universe, window, as-of)', (time.perf_counter() - start) / 1000, 0.0))
+
+        for name, elapsed, error in rows:
+            print(f"{n_symbols:>8} {name:<34} {elapsed * 1000:>9.3f} {error:>12.1e}")
+
+
+def bench_portfolio(sizes=(50, 500, 1000), n_days: int = 252, repeat: int = 20, reference_limit: int = 100):
+    """Mean-variance and risk-parity solve times, checked against SLSQP on the smaller sizes."""
+    from scipy.optimize import minimize
+    from . import portfolio
+
+    rng = np.random.default_rng(0)
+    print(f"{n_days} days of returns, {os.cpu_count()} CPUs, median of {repeat}")
+    print(f"{'candidates':>10} {'path':<30} {'median ms':>10} {'held':>5} {'objective gap':>14}")
+    for n in sizes:
+        # One-factor returns with a few late listings, as the panel hands them over
+        market = rng.normal(0, 0.01, n_days)
+        returns = rng.normal(0, 0.015, (n_days, n)) + np.outer(market, rng.uniform(0.5, 1.5, n))
+        for j in np.flatnonzero(rng.random(n) < 0.1):
+            returns[:rng.integers(20, n_days // 2), j] = np.nan
+        mu = rng.normal(0.01, 0.02, n)
+
+        def timed(fn):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = fn()
+                timings.append(time.perf_counter() - start)
+            return np.median(timings) * 1000, result
+
+        elapsed, covariance = timed(lambda: portfolio.return_covariance(returns))
+        print(f"{n:>10} {'Ledoit-Wolf covariance':<30} {elapsed:>10.2f} {'':>5} {'':>14}")
+        for rts_score in (10, 50, 90):
+            lam = portfolio.risk_aversion(rts_score)
+            elapsed, w = timed(lambda: portfolio.mean_variance_weights(mu, covariance, lam))
+
+            def objective(x):
+                return lam / 2 * x @ covariance @ x - mu @ x
+
+            gap = float('nan')
+            if n <= reference_limit:
+                cap = max(portfolio.MAX_WEIGHT, 1 / n)
+                reference = minimize(objective, np.full(n, 1 / n), jac=lambda x: lam * covariance @ x - mu,
+                                     bounds=[(0, cap)] * n, method='SLSQP', options={'ftol': 1e-15, 'maxiter': 1000},
+                                     constraints=[{'type': 'eq', 'fun': lambda x: x.sum() - 1}])
+                gap = objective(w) - reference.fun
+            print(f"{n:>10} {f'mean-variance, rts {rts_score}':<30} {elapsed:>10.2f} {(w > 1e-6).sum():>5} "
+                  f"{gap:>14.1e}")
+        elapsed, w = timed(lambda: portfolio.risk_parity_weights(covariance))
+        contributions = w * (covariance @ w)
+        spread = contributions.max() / contributions.min() - 1
+        print(f"{n:>10} {'risk parity':<30} {elapsed:>10.2f} {(w > 1e-6).sum():>5} {spread:>14.1e}")
+    print("objective gap: mean-variance objective minus SLSQP's (negative is better); "
+          "risk parity: relative spread of the risk contributions")
+
+    # End to end: rank every category, then allocate between the best candidates
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(root=tmp)
+        for seed, category in enumerate(CATEGORIES):
+            recommender = trained_recommender(200, seed=seed)
+            recommender.indicator_states = build_indicator_states(recommender.stock_data)
+            version, staging_dir = registry.create_staging(category)
+            save_recommender(recommender, staging_dir)
+            registry.publish(category, version)
+        pool = RecommenderPool(registry)
+        pool.warm()
+        for rts_score in (10, 90):
+            recommendations, _ = pool.recommend(rts_score, 1000000, 50000, 60)
+            holdings = ', '.join(f"{r['symbol']} {r['weight']:.2f}%" for r in recommendations)
+            print(f"rts {rts_score}: {holdings} (sum {sum(r['weight'] for r in recommendations):.2f})")
+        stats = pool.stats()['portfolio']
+        print(f"portfolio stage: {stats['calls']} calls, mean {stats['total_seconds'] / stats['calls'] * 1000:.1f} ms")
+
+
+def _per_path_sip(monthly: np.ndarray, weights: np.ndarray, index: np.ndarray, monthly_investment: float) -> np.ndarray:
+    """Final value of every path, one path and one asset at a time."""
+    finals = []
+    for path in index:
+        holdings = [0.0] * len(weights)
+        for month in path:
+            holdings = [(h + monthly_investment * w) * (1 + monthly[month, a])
+                        for a, (h, w) in enumerate(zip(holdings, weights))]
+        finals.append(sum(holdings))
+    return np.array(finals)
+
+
+def bench_projection(paths: int = 10000, months: int = 120, n_assets: int = 20, n_days: int = 756,
+                     loop_paths: int = 200):
+    """Per-path Python SIP simulation vs the vectorized Monte Carlo projection."""
+    from . import projection
+
+    rng = np.random.default_rng(0)
+    market = rng.normal(0.0004, 0.01, n_days)
+    daily = rng.normal(0.0002, 0.015, (n_days, n_assets)) + np.outer(market, rng.uniform(0.5, 1.5, n_assets))
+    weights = rng.dirichlet(np.ones(n_assets))
+    monthly_investment, target = 50000, 50000 * months * 1.6
+    monthly = projection.monthly_returns(daily)
+
+    index = projection.sample_months(len(monthly), loop_paths, months, np.random.default_rng(1))
+    start = time.perf_counter()
+    loop_finals = _per_path_sip(monthly, weights, index, monthly_investment)
+    loop_time = (time.perf_counter() - start) * paths / loop_paths
+
+    # Same draws through the vectorized buy-and-hold path, to check it matches the loop
+    def same_draws(*args, **kwargs):
+        return index
+    sample_months = projection.sample_months
+    projection.sample_months = same_draws
+    try:
+        check = projection.simulate_sip(daily, weights, monthly_investment, months, target, paths=loop_paths,
+                                        rebalance=False, percentiles=(100,))
+    finally:
+        projection.sample_months = sample_months
+    error = abs(check.percentiles[100] - loop_finals.max()) / loop_finals.max()
+
+    print(f"{paths} paths x {months} months x {n_assets} assets, {n_days} days of history, {os.cpu_count()} CPUs")
+    print(f"{'path':<36} {'seconds':>8} {'P(target)':>10} {'median':>14}")
+    print(f"{f'per-path loop (from {loop_paths} paths)':<36} {loop_time:>8.2f} {'':>10} {'':>14}")
+    for method in projection.METHODS:
+        for rebalance in (True, False):
+            start = time.perf_counter()
+            result = projection.simulate_sip(daily, weights, monthly_investment, months, target, paths=paths,
+                                             method=method, rebalance=rebalance, seed=42)
+            elapsed = time.perf_counter() - start
+            again = projection.simulate_sip(daily, weights, monthly_investment, months, target, paths=paths,
+                                            method=method, rebalance=rebalance, seed=42)
+            assert np.array_equal(result.bands, again.bands), "seeded projection is not reproducible"
+            name = f"{method}, {'rebalanced' if rebalance else 'buy-and-hold'}"
+            print(f"{name:<36} {elapsed:>8.3f} {result.probability:>10.3f} {result.percentiles[50]:>14,.0f}")
+    print(f"vectorized vs loop on the same draws: max relative error {error:.1e}; seeded runs reproducible")
+
+
+def bench_suggestions(investments: int = 20, latency: float = 0.3, universe: int = 30, picks: int = 5,
+                      clients: int = 8):
+    """Serial per-recommendation LLM calls in the request vs the batched, cached background worker."""
+    from concurrent.futures import ThreadPoolExecutor
+    from django.core.cache.backends.locmem import LocMemCache
+    from investment.suggestions import SuggestionWorker, format_stock_data, READY
+    from investment.tests.fakes import FakeLLMClient
+
+    rng = np.random.default_rng(0)
+    stocks = [{'symbol': f'SYN{j:04d}.NS', 'current_price': float(rng.uniform(50, 2000)),
+               'expected_return': float(rng.normal(0.01, 0.02)), 'projected_value': 0.0,
+               'risk_adjusted_score': float(rng.normal()), 'market_cap_category': 'large_cap'}
+              for j in range(universe)]
+    portfolios = [[stocks[j] for j in rng.choice(universe, picks, replace=False)] for _ in range(investments)]
+
+    # Before: one blocking call per recommendation inside every request
+    client = FakeLLMClient(latency)
+    def serial_request(recommendations):
+        start = time.perf_counter()
+        for rec in recommendations:
+            client.generate(f"Given the following stock data, explain why:\n\n{format_stock_data(rec)}")
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        serial_latencies = list(executor.map(serial_request, portfolios))
+    serial_total = time.perf_counter() - start
+    serial_calls = client.calls
+
+    # After: the request looks up the cache and queues the rest; workers batch and cache
+    client = FakeLLMClient(latency)
+    done = threading.Event()
+    completed = []
+    lock = threading.Lock()
+    def on_complete(ids, suggestion, status):
+        with lock:
+            completed.extend(ids)
+            if len(completed) == investments * picks:
+                done.set()
+    worker = SuggestionWorker(client=client, cache=LocMemCache('bench-suggestions', {}), on_complete=on_complete,
+                              on_start=None)
+    next_id = iter(range(investments * picks))
+    def queued_request(recommendations):
+        start = time.perf_counter()
+        texts = [format_stock_data(rec) for rec in recommendations]
+        jobs = []
+        for text, suggestion in zip(texts, worker.lookup(texts)):
+            with lock:
+                job_id = next(next_id)
+            if suggestion is None:
+                jobs.append((job_id, text))
+            else:
+                on_complete([job_id], suggestion, READY)
+        worker.submit(jobs)
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        queued_latencies = list(executor.map(queued_request, portfolios))
+    done.wait(60)
+    queued_total = time.perf_counter() - start
+    stats = worker.stats()
+
+    # Same investments again: every suggestion is cached
+    completed.clear()
+    done.clear()
+    next_id = iter(range(investments * picks))
+    calls_before = client.calls
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        list(executor.map(queued_request, portfolios))
+    done.wait(60)
+    cached_total = time.perf_counter() - start
+
+    print(f"{investments} investments x {picks} picks from {universe} stocks, LLM latency {latency * 1000:.0f} ms, "
+          f"{clients} concurrent clients")
+    print(f"{'path':<30} {'request p50 ms':>15} {'all ready s':>12} {'LLM calls':>10}")
+    print(f"{'serial, in request':<30} {np.median(serial_latencies) * 1000:>15.1f} {serial_total:>12.2f} "
+          f"{serial_calls:>10}")
+    print(f"{'batched background worker':<30} {np.median(queued_latencies) * 1000:>15.1f} {queued_total:>12.2f} "
+          f"{stats['llm_calls']:>10}")
+    print(f"{'same investments, cached':<30} {'':>15} {cached_total:>12.2f} {client.calls - calls_before:>10}")
+
+
+class _FakeCapitalMarket:
+    """Stand-in for nselib's capital_market with a live-ish index_data: the last week of sessions."""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def index_data(self, index: str, period: str = None, from_date: str = None, to_date: str = None) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        dates = pd.bdate_range(end='2025-04-04', periods=5)
+        rng = np.random.default_rng(abs(hash(index)) % 2 ** 32)
+        close = 22000 * np.exp(np.cumsum(rng.normal(0, 0.008, len(dates))))
+        return pd.DataFrame({'TIMESTAMP': dates.strftime('%d-%b-%Y'), 'INDEX_NAME': index,
+                             'OPEN_INDEX_VAL': close * 0.998, 'HIGH_INDEX_VAL': close * 1.006,
+                             'CLOSE_INDEX_VAL': close, 'LOW_INDEX_VAL': close * 0.994,
+                             'TRADED_QTY': rng.lognormal(19, 0.2, len(dates)).round(),
+                             'TURN_OVER': rng.lognormal(11, 0.2, len(dates))})
+
+
+def bench_quotes(clients: int = 50, waves: int = 6, wave_interval: float = 0.5, latency: float = 0.2,
+                 ttl: float = 1.0):
+    """Serial uncached index_data calls per dashboard vs the TTL / singleflight quote service.
+
+    Every wave, `clients` dashboards load at once: the market overview (NIFTY 50
+    and five sectors) plus the detail quote of one sector.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import partial
+    from .quotes import MARKET_INDEX, SECTOR_INDICES, QuoteService, index_quote
+
+    indices = [MARKET_INDEX] + SECTOR_INDICES
+
+    def run(load_dashboard, market):
+        latencies = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            for wave in range(waves):
+                wave_start = time.perf_counter()
+                def timed(client):
+                    begin = time.perf_counter()
+                    load_dashboard(SECTOR_INDICES[client % len(SECTOR_INDICES)])
+                    return time.perf_counter() - begin
+                latencies.extend(executor.map(timed, range(clients)))
+                time.sleep(max(0.0, wave_interval - (time.perf_counter() - wave_start)))
+        elapsed = time.perf_counter() - start
+        return np.array(latencies) * 1000, market.calls, elapsed
+
+    market = _FakeCapitalMarket(latency)
+    fetch = partial(index_quote, market=market)
+    def legacy_dashboard(sector):
+        overview = {index: fetch(index) for index in indices}
+        return overview, fetch(sector)
+    legacy = run(legacy_dashboard, market)
+
+    market = _FakeCapitalMarket(latency)
+    service = QuoteService(partial(index_quote, market=market), ttl=ttl, stale_ttl=60)
+    def service_dashboard(sector):
+        return service.get_many(indices), service.get(sector)
+    cached = run(service_dashboard, market)
+    stats = service.stats()
+
+    print(f"{waves} waves x {clients} dashboards, {wave_interval}s apart, upstream latency {latency * 1000:.0f} ms, "
+          f"TTL {ttl}s")
+    print(f"{'path':<26} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'upstream':>9} {'calls/s':>8}")
+    for name, (latencies, calls, elapsed) in (('serial, uncached', legacy), ('quote service', cached)):
+        print(f"{name:<26} {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f} "
+              f"{latencies.max():>8.1f} {calls:>9} {calls / elapsed:>8.1f}")
+    print(f"service: {stats['hits']} hits, {stats['stale_hits']} stale hits, {stats['misses']} misses, "
+          f"{stats['coalesced']} coalesced, {stats['upstream_calls']} upstream calls")
+
+
+def _legacy_market_cap_category(symbol: str, cache_file: str) -> str:
+    """get_market_cap_category before the symbol index: parse the file and scan every list."""
+    import json
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            stocks = json.load(f)['stocks']
+        for category, symbols in stocks.items():
+            if symbol in symbols:
+                return category
+    return 'unknown'
+
+
+def bench_symbols(n_symbols: int = 2000, lookups: int = 2000):
+    """Per-call json.load + list scan vs the in-memory symbol index, single and batch lookups."""
+    import json
+    from .symbols import SymbolIndex
+
+    rng = np.random.default_rng(0)
+    universe = [f'SYN{j:04d}.NS' for j in range(n_symbols)]
+    stocks = {category: universe[i::len(CATEGORIES)] for i, category in enumerate(CATEGORIES)}
+    queries = list(rng.choice(universe + ['MISSING.NS'], lookups))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'nse_stocks.json')
+        with open(path, 'w') as f:
+            json.dump({'timestamp': time.time(), 'stocks': stocks}, f)
+
+        start = time.perf_counter()
+        legacy = [_legacy_market_cap_category(symbol, path) for symbol in queries]
+        legacy_time = time.perf_counter() - start
+
+        index = SymbolIndex(path)
+        start = time.perf_counter()
+        index.category(queries[0])
+        load_time = time.perf_counter() - start
+        start = time.perf_counter()
+        single = [index.category(symbol) for symbol in queries]
+        single_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = index.categories(queries)
+        batch_time = time.perf_counter() - start
+
+        # A rewritten file is picked up on the next check
+        stocks['small_cap'].append('NEW.NS')
+        time.sleep(0.01)
+        with open(path, 'w') as f:
+            json.dump({'timestamp': time.time(), 'stocks': stocks}, f)
+        index.invalidate()
+        reloaded = index.category('NEW') == 'small_cap'
+
+    same = legacy == single == [batch[symbol] for symbol in queries]
+    print(f"{lookups} lookups in a {n_symbols}-symbol universe, same categories: {same}, reload on change: {reloaded}")
+    print(f"{'path':<30} {'total ms':>10} {'us/lookup':>10}")
+    for name, elapsed in (('json.load + scan per call', legacy_time), ('index, first load', load_time),
+                          ('index, single lookups', single_time), ('index, batch lookup', batch_time)):
+        per = elapsed / (1 if name == 'index, first load' else lookups) * 1e6
+        print(f"{name:<30} {elapsed * 1000:>10.2f} {per:>10.2f}")
+
+
+def bench_universe(n_symbols: int = 2000, repeat: int = 20, train: bool = True):
+    """Build, index, train and score the full market-cap universe against a fake provider."""
+    from . import train_model, universe
+    from .symbols import SymbolIndex
+
+    rng = np.random.default_rng(0)
+    tickers = [f'SYN{j:04d}' for j in range(n_symbols)]
+    market_caps = pd.DataFrame({'Symbol': tickers, 'Company Name': [f'Synthetic {t} Ltd.' for t in tickers],
+                                'Series': 'EQ', 'Market Cap (Rs Cr)': rng.lognormal(8, 1.5, n_symbols)})
+    # Thousands separators as in the published files
+    market_caps['Market Cap (Rs Cr)'] = market_caps['Market Cap (Rs Cr)'].map('{:,.2f}'.format)
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        os.makedirs(cache_dir)
+        market_cap_file = os.path.join(cache_dir, 'market_caps.csv')
+        universe_file = os.path.join(cache_dir, 'nse_stocks.json')
+        market_caps.to_csv(market_cap_file, index=False)
+
+        start = time.perf_counter()
+        stocks = universe.refresh_universe(universe_file, market_cap_file, listed=tickers)
+        rows.append(('build universe from market caps', time.perf_counter() - start))
+        start = time.perf_counter()
+        universe.refresh_universe(universe_file, market_cap_file, listed=tickers)
+        rows.append(('refresh, file unchanged', time.perf_counter() - start))
+
+        index = SymbolIndex(universe_file)
+        start = time.perf_counter()
+        categories = index.categories([t + '.NS' for t in tickers])
+        rows.append((f'index load + {n_symbols} lookups', time.perf_counter() - start))
+        start = time.perf_counter()
+        top = universe.top_symbols(10, index=index)
+        rows.append(('top-10 symbols', time.perf_counter() - start))
+
+        if train:
+            registry = ModelRegistry(root=os.path.join(tmp, 'models'))
+            manager = train_model.StockDataManager(cache_dir=cache_dir, fetcher=HistoryFetcher(FakeProvider()),
+                                                   store=PriceStore(root=os.path.join(tmp, 'prices')))
+            original_registry = train_model.registry
+            train_model.registry = registry
+            try:
+                start = time.perf_counter()
+                train_model.train_models(manager)
+                rows.append(('fetch + train all categories', time.perf_counter() - start))
+            finally:
+                train_model.registry = original_registry
+
+            pool = RecommenderPool(registry)
+            start = time.perf_counter()
+            pool.warm()
+            rows.append(('load + score universe (warm)', time.perf_counter() - start))
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pool.recommend(50, 1000000, 50000, 60)
+                timings.append(time.perf_counter() - start)
+            rows.append((f'recommend, p50 of {repeat}', float(np.median(timings))))
+            rows.append((f'recommend, max of {repeat}', float(np.max(timings))))
+
+    sizes = ', '.join(f'{category} {len(symbols)}' for category, symbols in stocks.items())
+    print(f"{n_symbols} listed equities -> {sizes}; {os.cpu_count()} CPUs")
+    print(f"all classified: {all(c != 'unknown' for c in categories.values())}, top 10: {', '.join(top[:3])}, ...")
+    print(f"{'stage':<34} {'ms':>10}")
+    for name, elapsed in rows:
+        print(f"{name:<34} {elapsed * 1000:>10.1f}")
+
+
+def bench_training(n_symbols: int = 600, fail_category: str = 'small_cap'):
+    """Sequential single-threaded training vs the per-category process pool, with one failing category."""
+    from . import train_model, universe
+
+    tickers = [f'SYN{j:04d}' for j in range(n_symbols)]
+    market_caps = pd.DataFrame({'Symbol': tickers, 'Market Cap': np.arange(n_symbols, 0, -1) * 100.0})
+    budget = train_model.TRAINING_CPU_BUDGET
+    results = {}
+
+    failing = set()
+
+    class FailingManager(train_model.StockDataManager):
+        """Hands one category history without prices, so its fit fails in the worker."""
+
+        def fetch_verified_history(self, symbols, period="1y"):
+            stock_data = super().fetch_verified_history(symbols, period)
+            if failing & set(stock_data):
+                stock_data = {symbol: df.drop(columns=['Close']) for symbol, df in stock_data.items()}
+            return stock_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        os.makedirs(cache_dir)
+        market_cap_file = os.path.join(cache_dir, 'market_caps.csv')
+        market_caps.to_csv(market_cap_file, index=False)
+        manager = FailingManager(cache_dir=cache_dir, fetcher=HistoryFetcher(FakeProvider()),
+                                 store=PriceStore(root=os.path.join(tmp, 'prices')))
+        stocks = universe.refresh_universe(manager.stocks_cache_file, market_cap_file, listed=tickers)
+        failing.update(stocks.get(fail_category, []))
+        # Fill the price store first, so both runs time training rather than the fake download
+        for symbols in manager.fetch_nse_stocks().values():
+            manager.fetch_verified_history(symbols)
+
+        original_registry = train_model.registry
+        try:
+            for name, cpu_budget in (('sequential, 1 core', 1), (f'pool, budget {budget}', budget)):
+                train_model.registry = ModelRegistry(root=os.path.join(tmp, 'models', str(cpu_budget)))
+                start = time.perf_counter()
+                report = train_model.train_models(manager, cpu_budget=cpu_budget)
+                results[name] = (time.perf_counter() - start, report, train_model.training_plan(len(report), cpu_budget))
+        finally:
+            train_model.registry = original_registry
+
+    print(f"{n_symbols} symbols, {os.cpu_count()} CPUs, {fail_category} made to fail")
+    print(f"{'run':<22} {'category':<10} {'status':<10} {'symbols':>8} {'train s':>8} {'cpu s':>8} {'peak MB':>8}")
+    for name, (elapsed, report, (processes, n_jobs)) in results.items():
+        for category, entry in report.items():
+            print(f"{name:<22} {category:<10} {entry['status']:<10} {entry['symbols']:>8} "
+                  f"{entry['train_seconds'] or 0:>8.1f} {entry['cpu_seconds'] or 0:>8.1f} {entry['peak_rss_mb'] or 0:>8.0f}")
+        print(f"{name:<22} total {elapsed:.1f}s wall, {processes} processes x {n_jobs} threads")
+
+
+def bench_models(n_symbols: int = 300, n_days: int = 500, backends=None, test_fraction: float = 0.2,
+                 repeat: int = 200, batch_size: int = 2000):
+    """Fit time, predict latency, artifact size and out-of-sample error of every model backend.
+
+    All backends fit the same `prepare_training_data` matrix; the error is measured
+    on symbols held out of training.
+    """
+    from scipy.stats import spearmanr
+    from .backends import BACKENDS
+
+    stock_data = synthetic_stock_data(n_symbols, n_days)
+    recommender = StockRecommender.__new__(StockRecommender)
+    n_test = max(1, int(n_symbols * test_fraction))
+    symbols = list(stock_data)
+    X_train, y_train = recommender.prepare_training_data({s: stock_data[s] for s in symbols[:-n_test]})
+    X_test, y_test = recommender.prepare_training_data({s: stock_data[s] for s in symbols[-n_test:]})
+    batch = np.resize(X_test, (batch_size, X_test.shape[1]))
+    baseline = float(np.sqrt(np.mean((y_test - y_train.mean()) ** 2)))
+
+    print(f"{len(X_train)} training rows from {n_symbols - n_test} symbols, {len(X_test)} test rows from "
+          f"{n_test} held-out symbols; {os.cpu_count()} CPUs")
+    print(f"{'backend':<24} {'fit s':>7} {'1 row us':>9} {f'{batch_size} rows ms':>13} {'size KB':>9} "
+          f"{'RMSE':>9} {'vs mean':>8} {'MAE':>9} {'rank corr':>10}")
+    for name in backends or BACKENDS:
+        backend = get_backend(name)
+        model, scaler = backend.create_model(), backend.create_scaler()
+        start = time.perf_counter()
+        backend.fit(model, scaler.fit_transform(X_train), y_train)
+        fit = time.perf_counter() - start
+
+        single = []
+        for row in X_test[:repeat]:
+            start = time.perf_counter()
+            model.predict(scaler.transform(row.reshape(1, -1)))
+            single.append(time.perf_counter() - start)
+        batched = []
+        for _ in range(5):
+            start = time.perf_counter()
+            model.predict(scaler.transform(batch))
+            batched.append(time.perf_counter() - start)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            dump(model, os.path.join(tmp, 'stock_recommender.joblib'))
+            dump(scaler, os.path.join(tmp, 'scaler.joblib'))
+            size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+
+        predicted = model.predict(scaler.transform(X_test))
+        rmse = float(np.sqrt(np.mean((predicted - y_test) ** 2)))
+        mae = float(np.mean(np.abs(predicted - y_test)))
+        rank_corr = spearmanr(predicted, y_test).correlation if np.ptp(predicted) > 0 else 0.0
+        print(f"{name:<24} {fit:>7.2f} {np.median(single) * 1e6:>9.0f} {min(batched) * 1000:>13.2f} "
+              f"{size / 1024:>9.0f} {rmse:>9.5f} {rmse / baseline:>8.3f} {mae:>9.5f} {rank_corr:>10.3f}")
+
+
+class _SimulatedClient:
+    """A socket as the feed sees it: a listener that counts the updates it is handed."""
+
+    def __init__(self):
+        self.updates = 0
+
+    def feed_changes(self, changes):
+        self.updates += 1
+
+
+def _cluster_worker(index: int, client, n_clients: int, seconds: float, interval: float, lease: float,
+                    crash_after: float):
+    """One worker process: its own event loop, feed and simulated sockets on the shared fake Redis."""
+    import asyncio
+    import json
+    from .cluster import RedisCoordinator
+    from .feed import TOP_10_COMPANIES, MarketDataFeed
+    from .tests.fakes import FakeRedisChannelLayer
+
+    source = FakeQuoteSource(move_probability=0.5, seed=index)
+    produced = []
+
+    def fetch(symbols):
+        produced.append(time.time())
+        return source(symbols)
+
+    feed = MarketDataFeed(fetch=fetch, interval=interval, channel_layer=FakeRedisChannelLayer(client),
+                          coordinator=RedisCoordinator(client, lease=lease))
+
+    async def run():
+        clients = [_SimulatedClient() for _ in range(n_clients)]
+        for c in clients:
+            feed.add_listener(c)
+            await feed.subscribe(TOP_10_COMPANIES)
+        start = time.monotonic()
+        crashed = False
+        while time.monotonic() - start < seconds:
+            await asyncio.sleep(interval)
+            if (crash_after and not crashed and feed.is_producer and time.monotonic() - start >= crash_after
+                    and client.set('bench:crashed', index, nx=True)):
+                # The first producer past the deadline dies without releasing its lease, like a killed process
+                for task in feed._tasks:
+                    task.cancel()
+                crashed = True
+        if not crashed:
+            await feed.stop()
+        return clients, crashed
+
+    clients, crashed = asyncio.run(run())
+    client.set(f'bench:result:{index}', json.dumps({
+        'upstream_calls': source.calls,
+        'produced': produced,
+        'relayed': feed.relayed,
+        'updates_per_client': sum(c.updates for c in clients) / len(clients),
+        'crashed': crashed,
+    }))
+
+
+def bench_cluster(workers: int = 4, clients_per_worker: int = 100, seconds: float = 6.0, interval: float = 0.1,
+                  lease: float = 0.5):
+    """Several worker processes sharing one fake Redis: one producer, relayed to every worker's sockets.
+
+    The producer is killed halfway through (without releasing its lease) to measure failover.
+    """
+    import json
+    import multiprocessing
+    from .tests.fakes import start_fake_redis
+
+    manager, client = start_fake_redis()
+    try:
+        processes = [multiprocessing.Process(target=_cluster_worker,
+                                             args=(i, client, clients_per_worker, seconds, interval, lease,
+                                                   seconds / 2))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        results = [json.loads(client.get(f'bench:result:{i}')) for i in range(workers)]
+    finally:
+        manager.shutdown()
+
+    ticks = sorted((t, i) for i, r in enumerate(results) for t in r['produced'])
+    gaps = [b[0] - a[0] for a, b in zip(ticks, ticks[1:])]
+    handovers = [(a, b) for a, b in zip(ticks, ticks[1:]) if a[1] != b[1]]
+    overlapping = sum(b[0] - a[0] < interval / 2 for a, b in handovers)
+    total_clients = workers * clients_per_worker
+
+    print(f"{workers} workers x {clients_per_worker} simulated clients, {interval * 1000:.0f} ms polls, "
+          f"{lease * 1000:.0f} ms lease, producer killed after {seconds / 2:.1f}s")
+    print(f"{'worker':>6} {'polls':>6} {'upstream calls':>15} {'relayed':>8} {'updates/client':>15} {'crashed':>8}")
+    for i, r in enumerate(results):
+        print(f"{i:>6} {len(r['produced']):>6} {r['upstream_calls']:>15} {r['relayed']:>8} "
+              f"{r['updates_per_client']:>15.1f} {str(r['crashed']):>8}")
+    print(f"producer handovers: {len(handovers)}, overlapping producers: {overlapping}, "
+          f"longest gap between polls: {max(gaps) * 1000:.0f} ms")
+    print(f"channel layer messages per update: {workers} (one per worker) vs {total_clients} with per-socket groups")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    features = subparsers.add_parser('features', help='per-DataFrame vs panel feature engine')
+    features.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 2000])
+    features.add_argument('--days', type=int, default=250)
+
+    inference = subparsers.add_parser('inference', help='per-symbol vs batched recommendation scoring')
+    inference.add_argument('--symbols', type=int, default=2000)
+
+    fetch = subparsers.add_parser('fetch', help='serial vs concurrent history download against a fake provider')
+    fetch.add_argument('--symbols', type=int, default=200)
+    fetch.add_argument('--latency', type=float, default=0.05)
+    fetch.add_argument('--failure-rate', type=float, default=0.05)
+    fetch.add_argument('--rate-limit', type=float, default=100.0)
+    fetch.add_argument('--workers', type=int, default=16)
+
+    load = subparsers.add_parser('load', help='per-request joblib loads vs mmapped, process-cached artifacts')
+    load.add_argument('--symbols', type=int, default=500)
+
+    pool = subparsers.add_parser('pool', help='serial per-category scoring vs the concurrent recommender pool')
+    pool.add_argument('--symbols', type=int, default=1000)
+
+    service = subparsers.add_parser('service', help='load test of concurrent recommendation POSTs (needs Django)')
+    service.add_argument('--symbols', type=int, default=500)
+    service.add_argument('--clients', type=int, default=16)
+    service.add_argument('--requests', type=int, default=25)
+
+    feed = subparsers.add_parser('feed', help='per-socket polling vs the shared market-data producer (needs Django)')
+    feed.add_argument('--clients', type=int, default=200)
+    feed.add_argument('--seconds', type=float, default=3.0)
+    feed.add_argument('--latency', type=float, default=0.02)
+    feed.add_argument('--interval', type=float, default=0.5)
+
+    stream = subparsers.add_parser('stream', help='WebSocket bytes per client: snapshots vs deltas (needs Django)')
+    stream.add_argument('--clients', type=int, default=50)
+    stream.add_argument('--ticks', type=int, default=40)
+    stream.add_argument('--move-probability', type=float, default=0.3)
+
+    backpressure = subparsers.add_parser('backpressure', help='slow WebSocket clients and conflation (needs Django)')
+    backpressure.add_argument('--fast', type=int, default=50)
+    backpressure.add_argument('--slow', type=int, default=10)
+    backpressure.add_argument('--ticks', type=int, default=40)
+
+    cluster = subparsers.add_parser('cluster', help='producer election and relay across worker processes')
+    cluster.add_argument('--workers', type=int, default=4)
+    cluster.add_argument('--clients', type=int, default=100)
+    cluster.add_argument('--seconds', type=float, default=6.0)
+
+    bulk = subparsers.add_parser('bulk', help='sequential file.csv downloads vs the bulk price fetch')
+    bulk.add_argument('--symbols', type=int, default=10)
+    bulk.add_argument('--latency', type=float, default=0.2)
+    bulk.add_argument('--days', type=int, default=365)
+
+    parse = subparsers.add_parser('parse', help='file.csv round trip vs the in-memory bhavcopy parser')
+    parse.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+
+    risk = subparsers.add_parser('risk', help='per-metric loads vs batched RiskProfile computation')
+    risk.add_argument('--symbols', type=int, default=20)
+    risk.add_argument('--latency', type=float, default=0.05)
+    risk.add_argument('--days', type=int, default=250)
+
+    matrix = subparsers.add_parser('matrix', help='per-symbol betas vs the batch beta/covariance engine')
+    matrix.add_argument('--sizes', type=int, nargs='+', default=[500, 2000])
+    matrix.add_argument('--days', type=int, default=252)
+
+    portfolio = subparsers.add_parser('portfolio', help='mean-variance and risk-parity solver speed and accuracy')
+    portfolio.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 1000])
+    portfolio.add_argument('--days', type=int, default=252)
+
+    projection = subparsers.add_parser('projection', help='per-path loop vs the vectorized Monte Carlo SIP projection')
+    projection.add_argument('--paths', type=int, default=10000)
+    projection.add_argument('--months', type=int, default=120)
+    projection.add_argument('--assets', type=int, default=20)
+
+    suggestions = subparsers.add_parser('suggestions', help='serial LLM calls per request vs the batched suggestion worker')
+    suggestions.add_argument('--investments', type=int, default=20)
+    suggestions.add_argument('--latency', type=float, default=0.3)
+
+    quotes = subparsers.add_parser('quotes', help='uncached index_data per dashboard vs the quote service')
+    quotes.add_argument('--clients', type=int, default=50)
+    quotes.add_argument('--waves', type=int, default=6)
+    quotes.add_argument('--latency', type=float, default=0.2)
+
+    symbols = subparsers.add_parser('symbols', help='per-call json.load category lookup vs the symbol index')
+    symbols.add_argument('--symbols', type=int, default=2000)
+    symbols.add_argument('--lookups', type=int, default=2000)
+
+    universe = subparsers.add_parser('universe', help='build, train and score the full market-cap universe')
+    universe.add_argument('--symbols', type=int, default=2000)
+    universe.add_argument('--no-train', action='store_true', help='only build and index the universe')
+    training = subparsers.add_parser('training', help='sequential vs per-category process pool training')
+    training.add_argument('--symbols', type=int, default=600)
+    training.add_argument('--fail-category', default='small_cap')
+    models = subparsers.add_parser('models', help='fit/predict speed, size and accuracy of the model backends')
+    models.add_argument('--symbols', type=int, default=300)
+    models.add_argument('--days', type=int, default=500)
+    models.add_argument('--backends', nargs='+', default=None)
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+    warnings.simplefilter('ignore', FutureWarning)
+
+    if args.benchmark == 'features':
+        bench_features(args.sizes, args.days)
+    elif args.benchmark == 'inference':
+        bench_inference(args.symbols)
+    elif args.benchmark == 'fetch':
+        bench_fetch(args.symbols, args.latency, args.failure_rate, args.rate_limit, args.workers)
+    elif args.benchmark == 'load':
+        bench_load(args.symbols)
+    elif args.benchmark == 'pool':
+        bench_pool(args.symbols)
+    elif args.benchmark == 'service':
+        bench_service(args.symbols, args.clients, args.requests)
+    elif args.benchmark == 'feed':
+        bench_feed(args.clients, args.seconds, args.latency, args.interval)
+    elif args.benchmark == 'stream':
+        bench_stream(args.clients, args.ticks, args.move_probability)
+    elif args.benchmark == 'backpressure':
+        bench_backpressure(args.fast, args.slow, args.ticks)
+    elif args.benchmark == 'cluster':
+        bench_cluster(args.workers, args.clients, args.seconds)
+    elif args.benchmark == 'bulk':
+        bench_bulk(args.symbols, args.latency, args.days)
+    elif args.benchmark == 'parse':
+        bench_parse(args.sizes)
+    elif args.benchmark == 'risk':
+        bench_risk(args.symbols, args.latency, args.days)
+    elif args.benchmark == 'matrix':
+        bench_matrix(args.sizes, args.days)
+    elif args.benchmark == 'portfolio':
+        bench_portfolio(args.sizes, args.days)
+    elif args.benchmark == 'projection':
+        bench_projection(args.paths, args.months, args.assets)
+    elif args.benchmark == 'suggestions':
+        bench_suggestions(args.investments, args.latency)
+    elif args.benchmark == 'quotes':
+        bench_quotes(args.clients, args.waves, latency=args.latency)
+    elif args.benchmark == 'symbols':
+        bench_symbols(args.symbols, args.lookups)
+    elif args.benchmark == 'universe':
+        bench_universe(args.symbols, train=not args.no_train)
+    elif args.benchmark == 'training':
+        bench_training(args.symbols, args.fail_category)
+    elif args.benchmark == 'models':
+        bench_models(args.symbols, args.days, args.backends)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import io
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import Dict, Union
+
+# Columns of the security-wise price/volume report, in the layout stocks.data uses
+PRICE_COLUMNS = ['Prev Close', 'Open Price', 'High Price', 'Low Price', 'Last Price', 'Close Price',
+                 'Average Price']
+VOLUME_COLUMNS = ['Total Traded Quantity', 'Turnover In Rs', 'Turnover Lacs', 'No. of Trades', 'Deliverable Qty',
+                  '% Dly Qt to Traded Qty']
+NUMERIC_COLUMNS = PRICE_COLUMNS + VOLUME_COLUMNS
+TEXT_COLUMNS = ['Symbol', 'Series']
+
+# Header of either report (security-wise CSV, nselib's space-stripped DataFrame or the
+# full bhavcopy), upper-cased with spaces and underscores removed, to its column name
+COLUMN_ALIASES: Dict[str, str] = {
+    'SYMBOL': 'Symbol',
+    'SERIES': 'Series',
+    'DATE': 'Date',
+    'DATE1': 'Date',
+    'PREVCLOSE': 'Prev Close',
+    'OPENPRICE': 'Open Price',
+    'HIGHPRICE': 'High Price',
+    'LOWPRICE': 'Low Price',
+    'LASTPRICE': 'Last Price',
+    'CLOSEPRICE': 'Close Price',
+    'AVERAGEPRICE': 'Average Price',
+    'AVGPRICE': 'Average Price',
+    'TOTALTRADEDQUANTITY': 'Total Traded Quantity',
+    'TTLTRDQNTY': 'Total Traded Quantity',
+    'TURNOVERINRS': 'Turnover In Rs',
+    'TURNOVERLACS': 'Turnover Lacs',
+    'NO.OFTRADES': 'No. of Trades',
+    'NOOFTRADES': 'No. of Trades',
+    'DELIVERABLEQTY': 'Deliverable Qty',
+    'DELIVQTY': 'Deliverable Qty',
+    '%DLYQTTOTRADEDQTY': '% Dly Qt to Traded Qty',
+    'DELIVPER': '% Dly Qt to Traded Qty',
+}
+
+# Placeholders NSE prints for missing values (e.g. delivery data of non-EQ series)
+NA_VALUES = ['-', '']
+
+DATE_FORMAT = '%d-%b-%Y'
+
+
+def column_name(header: str) -> str:
+    """Name of a report column in the stocks.data layout; unknown headers are only stripped."""
+    key = re.sub(r'[\s_]', '', header).upper()
+    if key.startswith('TURNOVER') and key != 'TURNOVERLACS':
+        # 'Turnover ₹' and the forms it gets mangled into
+        key = 'TURNOVERINRS'
+    return COLUMN_ALIASES.get(key, header.strip())
+
+
+def parse_csv(data: Union[bytes, str]) -> pd.DataFrame:
+    """Parse an NSE price/volume report or bhavcopy from the response body.
+
+    The header is read first so every known column gets an explicit dtype, and
+    the C parser strips thousands separators and '-' placeholders while reading;
+    no column is cleaned afterwards with string operations.
+
+    Args:
+        data: CSV body as returned by NSE, bytes or text
+
+    Returns:
+        DataFrame with `COLUMN_ALIASES` names, float64 numeric columns and a datetime 'Date'
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8', errors='replace')
+    header = data.split(b'\n', 1)[0].decode('utf-8', errors='replace')
+    if not header.strip():
+        return empty_frame()
+
+    raw_names = next(iter(pd.read_csv(io.StringIO(header), header=None, dtype=str).itertuples(index=False)))
+    names = [column_name(str(name)) for name in raw_names]
+    dtypes = {name: 'float64' for name in names if name in NUMERIC_COLUMNS}
+    dtypes.update({name: 'object' for name in names if name in TEXT_COLUMNS or name == 'Date'})
+
+    df = pd.read_csv(io.BytesIO(data), header=0, names=names, dtype=dtypes, thousands=',',
+                     skipinitialspace=True, na_values=NA_VALUES, keep_default_na=False, encoding_errors='replace')
+    return _finish(df)
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Bring a DataFrame already parsed by nselib into the `parse_csv` layout.
+
+    nselib strips spaces from the headers and leaves most numbers as strings with
+    thousands separators; those columns are converted with Arrow string kernels
+    rather than element by element.
+    """
+    df = df.rename(columns=lambda name: column_name(str(name)))
+    for name in df.columns.intersection(NUMERIC_COLUMNS):
+        column = df[name]
+        df[name] = _text_to_float(column) if column.dtype == object else column.astype('float64')
+    return _finish(df)
+
+
+def _text_to_float(column: pd.Series) -> pd.Series:
+    """Numbers written with thousands separators (and '-' for missing) as float64."""
+    try:
+        text = pa.array(column.to_numpy(), type=pa.string(), from_pandas=True)
+        text = pc.utf8_trim_whitespace(pc.replace_substring(text, ',', ''))
+        text = pc.if_else(pc.is_in(text, value_set=pa.array(NA_VALUES)), pa.scalar(None, pa.string()), text)
+        return pd.Series(pc.cast(text, pa.float64()).to_numpy(zero_copy_only=False), index=column.index)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed types or malformed numbers: slower path that coerces bad values to NaN
+        text = column.astype(str).str.replace(',', '', regex=False).str.strip()
+        return pd.to_numeric(text.where(~text.isin(NA_VALUES)), errors='coerce').astype('float64')
+
+
+def parse(data: Union[bytes, str, pd.DataFrame]) -> pd.DataFrame:
+    """Parse a report from the response body or from nselib's DataFrame."""
+    if isinstance(data, pd.DataFrame):
+        return normalize_frame(data)
+    return parse_csv(data)
+
+
+def empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({'Symbol': pd.Series(dtype=object), 'Date': pd.Series(dtype='datetime64[ns]'),
+                         **{name: pd.Series(dtype='float64') for name in NUMERIC_COLUMNS}})
+
+
+def _finish(df: pd.DataFrame) -> pd.DataFrame:
+    for name in df.columns.intersection(TEXT_COLUMNS):
+        if df[name].dtype == object:
+            df[name] = df[name].str.strip()
+    if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'].str.strip(), format=DATE_FORMAT, errors='coerce')
+    return df
@@ -0,0 +1,161 @@
+import os
+import json
+import uuid
+import logging
+import socket
+from typing import Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Redis keys shared by every worker of the market data feed
+LEADER_KEY = 'stocks:feed:leader'
+SUBSCRIPTIONS_KEY = 'stocks:feed:subscriptions:'
+SUBSCRIBERS_KEY = 'stocks:feed:subscribers'
+LATEST_KEY = 'stocks:feed:latest'
+
+# Seconds the producer lease lasts without renewal; a crashed leader is replaced after this
+LEADER_LEASE = 15.0
+
+# Renewals per lease while the producer is polling, so a slow poll cannot outlive the lease
+RENEWALS_PER_LEASE = 3
+
+# Extend the lease (KEYS[1]) by ARGV[2] ms only if this worker (ARGV[1]) still holds it
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete the lease (KEYS[1]) only if this worker (ARGV[1]) still holds it
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def worker_id() -> str:
+    """Unique name of this worker process."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class LocalCoordinator:
+    """Coordinator of a single worker process: always the producer, nothing shared."""
+
+    renew_interval = LEADER_LEASE / RENEWALS_PER_LEASE
+
+    def __init__(self):
+        self.worker_id = worker_id()
+        self.latest: Dict[str, Dict] = {}
+
+    def acquire(self) -> bool:
+        return True
+
+    def renew(self) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+    def publish_subscriptions(self, symbols: List[str]):
+        self._symbols = list(symbols)
+
+    def all_subscriptions(self) -> List[str]:
+        return getattr(self, '_symbols', [])
+
+    def store_latest(self, quotes: Dict[str, Dict]):
+        self.latest.update(quotes)
+
+    def load_latest(self, symbols: List[str]) -> Dict[str, Dict]:
+        return {s: self.latest[s] for s in symbols if s in self.latest}
+
+
+class RedisCoordinator:
+    """Elects one producer among workers sharing a Redis server.
+
+    The producer holds a lease key (``SET NX PX``) and renews it every poll, and
+    every `renew_interval` seconds while a poll is running; when it stops
+    renewing, another worker takes over after `lease` seconds. Renewal and release
+    run as Lua scripts that compare the holder first, so a worker whose lease
+    already expired can neither extend nor delete its successor's. Workers
+    publish the symbols their sockets subscribe to under expiring keys, listed in
+    the `SUBSCRIBERS_KEY` set, and the producer polls their union. The producer
+    also keeps the latest quotes in a hash so any worker can answer a
+    subscription with a snapshot.
+
+    The client is a synchronous redis-py client (or `tests.fakes.FakeRedis`);
+    call the methods off the event loop.
+
+    Args:
+        client: redis.Redis-compatible client
+        lease: Seconds the producer lease and subscription keys last
+    """
+
+    def __init__(self, client, lease: float = LEADER_LEASE):
+        self.client = client
+        self.lease_ms = int(lease * 1000)
+        self.renew_interval = lease / RENEWALS_PER_LEASE
+        self.worker_id = worker_id()
+
+    def acquire(self) -> bool:
+        """Take or renew the producer lease. Returns whether this worker is the producer."""
+        if self.client.set(LEADER_KEY, self.worker_id, nx=True, px=self.lease_ms):
+            logger.info(f"Worker {self.worker_id} is now the market data producer")
+            return True
+        return self.renew()
+
+    def renew(self) -> bool:
+        """Extend the lease if this worker still holds it. Returns whether it does."""
+        return bool(self.client.eval(RENEW_SCRIPT, 1, LEADER_KEY, self.worker_id, self.lease_ms))
+
+    def release(self):
+        """Give up the lease (if held) and withdraw this worker's subscriptions."""
+        self.client.eval(RELEASE_SCRIPT, 1, LEADER_KEY, self.worker_id)
+        self.client.delete(SUBSCRIPTIONS_KEY + self.worker_id)
+        self.client.srem(SUBSCRIBERS_KEY, self.worker_id)
+
+    def publish_subscriptions(self, symbols: List[str]):
+        key = SUBSCRIPTIONS_KEY + self.worker_id
+        if symbols:
+            self.client.set(key, json.dumps(sorted(symbols)), px=self.lease_ms)
+            self.client.sadd(SUBSCRIBERS_KEY, self.worker_id)
+        else:
+            self.client.delete(key)
+            self.client.srem(SUBSCRIBERS_KEY, self.worker_id)
+
+    def all_subscriptions(self) -> List[str]:
+        workers = sorted(self.client.smembers(SUBSCRIBERS_KEY))
+        if not workers:
+            return []
+        symbols: Set[str] = set()
+        gone = []
+        for worker, value in zip(workers, self.client.mget([SUBSCRIPTIONS_KEY + w for w in workers])):
+            if value:
+                symbols.update(json.loads(value))
+            else:
+                # Its subscriptions expired: the worker died without releasing them
+                gone.append(worker)
+        if gone:
+            self.client.srem(SUBSCRIBERS_KEY, *gone)
+        return sorted(symbols)
+
+    def store_latest(self, quotes: Dict[str, Dict]):
+        if quotes:
+            self.client.hset(LATEST_KEY, mapping={s: json.dumps(q) for s, q in quotes.items()})
+
+    def load_latest(self, symbols: List[str]) -> Dict[str, Dict]:
+        if not symbols:
+            return {}
+        values = self.client.hmget(LATEST_KEY, symbols)
+        return {s: json.loads(v) for s, v in zip(symbols, values) if v}
+
+
+def default_coordinator():
+    """Redis coordination when REDIS_URL is set (see settings.CHANNEL_LAYERS), else single-process."""
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        return LocalCoordinator()
+    import redis
+    return RedisCoordinator(redis.Redis.from_url(redis_url, decode_responses=True))
@@ -1,99 +1,190 @@
 import json
 import asyncio
+import logging
+from collections import deque
 from channels.generic.websocket import AsyncWebsocketConsumer
-from nselib import capital_market
-from datetime import datetime
 
-# Top 10 companies on NSE
-TOP_10_COMPANIES = [
-    "RELIANCE", "TCS", "INFY", "HDFCBANK", "HDFC",
-    "ICICIBANK", "BHARTIARTL", "KOTAKBANK", "LT", "ITC"
-]
+from .feed import MAX_SUBSCRIPTIONS, SubscriptionLimitError, encode, is_known_symbol, market_feed
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Unsent error messages kept per connection; older ones are dropped
+MAX_PENDING_CONTROL = 16
 
 
 class StockConsumer(AsyncWebsocketConsumer):
+    """Per-symbol market data stream.
+
+    Clients send ``{"action": "subscribe", "symbols": [...]}`` or
+    ``{"action": "unsubscribe", "symbols": [...]}``. The server answers a
+    subscription with one ``snapshot`` message holding the full quote of each new
+    symbol, then sends ``delta`` messages with only the fields that changed.
+    Every snapshot and delta carries a per-connection ``seq`` that increases by
+    one, so a client that sees a gap can resubscribe to get a fresh snapshot.
+
+    Outbound data goes through a per-connection outbox drained by one sender task.
+    The outbox holds at most one pending quote per subscribed symbol: while a slow
+    client is still receiving, newer updates are conflated into the unsent ones
+    (a newer snapshot replaces an older one, deltas are merged field by field)
+    instead of queueing without limit.
+    """
+
+    # Process-wide feed; sockets register as its local listeners
+    feed = market_feed
+
     async def connect(self):
+        self.subscriptions = set()
+        # Subscribed symbols whose snapshot has not been queued yet
+        self.awaiting_snapshot = set()
+        self.seq = 0
+        self.pending_snapshot = {}
+        self.pending_delta = {}
+        self.pending_control = deque(maxlen=MAX_PENDING_CONTROL)
+        self.outbox_ready = asyncio.Event()
         await self.accept()
-        print("✅ WebSocket Connected")
+        logger.debug(f"WebSocket connected: {self.channel_name}")
 
-        # Start pushing stock data every 5 seconds
-        asyncio.create_task(self.send_stock_data())
+        self.sender = asyncio.create_task(self.drain_outbox())
+        self.feed.add_listener(self)
+        metrics.gauge_add('ws_connections', 1)
+        metrics.gauge_add('ws_sender_tasks', 1)
 
     async def disconnect(self, close_code):
-        print("❌ WebSocket Disconnected")
-
-    async def receive(self, text_data):
-        print(f"📩 Data Received from Frontend: {text_data}")
-        # Optional: Handle any incoming data if needed
-
-    async def send_stock_data(self):
-        while True:
-            stock_data = {}
-
-            for symbol in TOP_10_COMPANIES:
-                try:
-
-                    data = capital_market.price_volume_and_deliverable_position_data(
-                        symbol=symbol,
-                        from_date="25-03-2024",
-                        to_date="26-03-2024",
-                    )
-                    
-                    # data = quote.equity(symbol)
-                    print(f"Data for {symbol}:")
-                    print(data)
-                    data.columns = data.columns.str.strip().str.replace(" ", "", regex=True)
-
-                    # List of columns to clean
-                    columns_to_clean = ["OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "PrevClose"]
-
-                    # Clean and convert columns to float safely
-                    for col in columns_to_clean:
-                        if col in data.columns:
-                            data[col] = (
-                                data[col]
-                                .astype(str)  # Convert to string to apply .str
-                                .str.replace(",", "", regex=True)  # Remove commas
-                                .replace({"nan": None})  # Handle NaN values after conversion
-                                .astype(float)  # Convert to float
-                            )
-
-                    # Pick the most recent row from the data
-                    if not data.empty:
-                        latest_data = data.iloc[-1]
-                        
-                        
-                        stock_data[symbol] = {
-                            "symbol": symbol,
-                            "lastPrice": float(latest_data["ClosePrice"]),
-                            "open": float(latest_data["OpenPrice"]),
-                            "high": float(latest_data["HighPrice"]),
-                            "low": float(latest_data["LowPrice"]),
-                            "previousClose": float(latest_data["PrevClose"]),
-                        }
-                    else:
-                        stock_data[symbol] = {
-                            "symbol": symbol,
-                            "lastPrice": 0,
-                            "open": 0,
-                            "high": 0,
-                            "low": 0,
-                            "previousClose": 0,
-                        }
-                except Exception as e:
-                    print(f"⚠️ Error fetching data for {symbol}: {e}")
-                    stock_data[symbol] = {
-                        "symbol": symbol,
-                        "lastPrice": 0,
-                        "open": 0,
-                        "high": 0,
-                        "low": 0,
-                        "previousClose": 0,
-                    }
-
-            # Send the stock data to frontend
-            await self.send(text_data=json.dumps({"data": stock_data}))
-            print("📡 Stock Data Sent to Frontend")
-
-            # Wait for 5 seconds before sending the next update
-            await asyncio.sleep(5)
+        logger.debug(f"WebSocket disconnected: {self.channel_name} ({close_code})")
+        sender = getattr(self, 'sender', None)
+        if sender is None:
+            return
+        sender.cancel()
+        try:
+            await sender
+        except asyncio.CancelledError:
+            pass
+        metrics.gauge_add('ws_connections', -1)
+        self.feed.remove_listener(self)
+        await self.unsubscribe(list(self.subscriptions))
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data)
+            action = message.get("action")
+            symbols = message.get("symbols", [])
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            symbols = [str(s).strip().upper() for s in symbols if str(s).strip()]
+        except (TypeError, ValueError, AttributeError):
+            self.queue_error("Messages must be JSON objects with an action and symbols")
+            return
+
+        if action == "subscribe":
+            await self.subscribe(symbols)
+        elif action == "unsubscribe":
+            await self.unsubscribe(symbols)
+        else:
+            self.queue_error(f"Unknown action: {action}")
+
+    async def subscribe(self, symbols):
+        new = [s for s in dict.fromkeys(symbols) if s not in self.subscriptions]
+        if len(self.subscriptions) + len(new) > MAX_SUBSCRIPTIONS:
+            self.queue_error(f"At most {MAX_SUBSCRIPTIONS} symbols per connection")
+            return
+        unknown = [s for s in new if not is_known_symbol(s)]
+        if unknown:
+            self.queue_error(f"Unknown symbols: {', '.join(unknown)}")
+            new = [s for s in new if s not in unknown]
+        if not new:
+            return
+        self.subscriptions.update(new)
+
+        # Symbols the feed already has a quote for get their snapshot right away
+        self.awaiting_snapshot.update(new)
+        try:
+            snapshot = await self.feed.subscribe(new)
+        except SubscriptionLimitError as e:
+            self.subscriptions.difference_update(new)
+            self.awaiting_snapshot.difference_update(new)
+            self.queue_error(str(e))
+            return
+        self.awaiting_snapshot.difference_update(snapshot)
+        self.queue_snapshot(snapshot)
+
+    async def unsubscribe(self, symbols):
+        removed = [s for s in dict.fromkeys(symbols) if s in self.subscriptions]
+        if not removed:
+            return
+        self.subscriptions.difference_update(removed)
+        self.awaiting_snapshot.difference_update(removed)
+        for symbol in removed:
+            self.pending_snapshot.pop(symbol, None)
+            self.pending_delta.pop(symbol, None)
+        await self.feed.unsubscribe(removed)
+
+    def feed_changes(self, updates):
+        """Called by the feed, on this worker's event loop, for every relayed update."""
+        snapshot, delta = {}, {}
+        for symbol, changes in updates.items():
+            if symbol in self.awaiting_snapshot:
+                if symbol in self.feed.latest:
+                    snapshot[symbol] = self.feed.latest[symbol]
+                    self.awaiting_snapshot.discard(symbol)
+            elif symbol in self.subscriptions:
+                delta[symbol] = changes
+        self.queue_snapshot(snapshot)
+        self.queue_delta(delta)
+
+    def queue_snapshot(self, snapshot):
+        for symbol, quote in snapshot.items():
+            if symbol in self.pending_snapshot or self.pending_delta.pop(symbol, None) is not None:
+                metrics.incr('ws_updates_conflated')
+            self.pending_snapshot[symbol] = quote
+        if snapshot:
+            self.outbox_ready.set()
+
+    def queue_delta(self, delta):
+        for symbol, changes in delta.items():
+            if symbol in self.pending_snapshot:
+                # The client has not seen the snapshot yet; send it up to date instead
+                self.pending_snapshot[symbol] = dict(self.pending_snapshot[symbol], **changes)
+                metrics.incr('ws_updates_conflated')
+            elif symbol in self.pending_delta:
+                self.pending_delta[symbol].update(changes)
+                metrics.incr('ws_updates_conflated')
+            else:
+                self.pending_delta[symbol] = dict(changes)
+        if delta:
+            self.outbox_ready.set()
+
+    def queue_error(self, error):
+        if len(self.pending_control) == self.pending_control.maxlen:
+            metrics.incr('ws_messages_dropped')
+        self.pending_control.append({"type": "error", "error": error})
+        self.outbox_ready.set()
+
+    async def drain_outbox(self):
+        """Send whatever is pending, one message per kind, until the socket closes."""
+        try:
+            while True:
+                await self.outbox_ready.wait()
+                self.outbox_ready.clear()
+                while self.pending_control:
+                    await self.send_message(self.pending_control.popleft())
+                if self.pending_snapshot:
+                    snapshot, self.pending_snapshot = self.pending_snapshot, {}
+                    await self.send_data("snapshot", snapshot)
+                if self.pending_delta:
+                    delta, self.pending_delta = self.pending_delta, {}
+                    await self.send_data("delta", delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stopped sending to {self.channel_name}: {e}")
+        finally:
+            metrics.gauge_add('ws_sender_tasks', -1)
+
+    async def send_data(self, kind, data):
+        self.seq += 1
+        await self.send_message({"type": kind, "seq": self.seq, "data": data})
+
+    async def send_message(self, message):
+        await self.send(text_data=encode(message))
+        metrics.incr('ws_messages_sent')
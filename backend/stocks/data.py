@@ -3,13 +3,19 @@ from pathlib import Path
 from statistics import covariance
 from nselib import capital_market 
 import pandas as pd
-from IPython.display import display
 import io
-from pandasgui import show
 import numpy as np
 from scipy.stats import norm
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
+import logging
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from nselib.libutil import nse_urlfetch
+from . import bhavcopy, risk, risk_matrix
+from .store import normalize_symbol, nse_price_store
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -19,17 +25,141 @@ def get_nifty_50_data(index,from_date,to_date):
     nifty_50_list = capital_market.nifty50_equity_list(index,from_date,to_date)
     return nifty_50_list
 
+#NSE price columns served from the local NSE price store (raw prices, separate from the adjusted yfinance history)
+store_cols = {"Open": "Open Price", "High": "High Price", "Low": "Low Price", "Close": "Close Price", "Volume": "Total Traded Quantity"}
+
+#NSE security-wise price, volume and deliverable report, read by nselib's price_volume_and_deliverable_position_data
+SECURITY_ARCHIVE_ORIGIN = "https://nsewebsite-staging.nseindia.com/report-detail/eq_security"
+SECURITY_ARCHIVE_URL = "https://nsewebsite-staging.nseindia.com/api/historical/securityArchives?"
+
+#NSE serves at most a year of the report per request
+MAX_REQUEST_DAYS = 365
+
+#concurrent downloads in get_bulk_price_df
+BULK_FETCH_WORKERS = 8
+
+#the report lists every series a symbol traded in; prices come from the normal equity market only
+PRICE_SERIES = "EQ"
+
+def last_settled_day():
+    #a day counts as downloaded only once it is over, since NSE publishes a session's report after the close
+    return pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+
+def read_stored_price_df(Symbol,start,end,store=nse_price_store):
+    #prices of a date range from the local price store in the NSE column layout
+    df = store.read(Symbol, start=start, end=end).rename(columns=store_cols).reset_index()
+    df.insert(0, "Symbol", normalize_symbol(Symbol))
+    return df
+
+def request_ranges(from_date,to_date):
+    #splits a dd-mm-YYYY range into the year-long (from, to) windows NSE accepts
+    start = pd.to_datetime(from_date, format="%d-%m-%Y")
+    end = pd.to_datetime(to_date, format="%d-%m-%Y")
+    ranges = []
+    while start <= end:
+        stop = min(start + pd.Timedelta(days=MAX_REQUEST_DAYS - 1), end)
+        ranges.append((start.strftime("%d-%m-%Y"), stop.strftime("%d-%m-%Y")))
+        start = stop + pd.Timedelta(days=1)
+    return ranges
+
+def fetch_price_volume_csv(Symbol,from_date,to_date):
+    #raw report body of one symbol for at most a year, kept in memory instead of nselib's file.csv (blocking)
+    payload = (f"from={from_date}&to={to_date}&symbol={quote(normalize_symbol(Symbol))}"
+               "&dataType=priceVolumeDeliverable&series=ALL&csv=true")
+    response = nse_urlfetch(SECURITY_ARCHIVE_URL + payload, origin_url=SECURITY_ARCHIVE_ORIGIN)
+    response.raise_for_status()
+    return response.content
+
+def fetch_price_volume_report(Symbol,from_date,to_date):
+    #report of one symbol for any range as one CSV body, a request per year, without nselib's shared file.csv (blocking)
+    #nothing touches the disk, so downloads of different symbols, threads and worker processes run concurrently
+    lines = []
+    for start, stop in request_ranges(from_date, to_date):
+        header, _, rows = fetch_price_volume_csv(Symbol, start, stop).rstrip(b"\r\n").partition(b"\n")
+        if not lines and header.strip():
+            lines.append(header)
+        if lines and rows:
+            lines.append(rows)
+    return b"\n".join(lines) + b"\n"
+
+def parse_price_volume_csv(data):
+    #parses a report body (bytes or text) or nselib DataFrame in memory, see stocks.bhavcopy
+    return bhavcopy.parse(data)
+
+def equity_series(df):
+    #keeps the PRICE_SERIES rows, so BE/BL/block rows of the same date never stand in for the EQ price
+    if "Series" not in df.columns:
+        return df
+    return df[df["Series"].astype(str).str.strip().str.upper() == PRICE_SERIES].reset_index(drop=True)
+
+def download_price_df(Symbol,from_date,to_date,fetch_report=fetch_price_volume_report):
+    #downloads daily NSE prices of one symbol, parsed in memory; fetch_report returns the report as a CSV body
+    df = equity_series(parse_price_volume_csv(fetch_report(Symbol, from_date, to_date)))
+    if df.empty:
+        return bhavcopy.empty_frame()
+    return df
+
+def store_price_df(Symbol,df,store=nse_price_store,covered=None):
+    #keeps a download so the next request for this range is served locally
+    #covered is the (first, last) date range it was downloaded for, so days without a session are not asked for again
+    if "Date" not in df.columns or df.empty or store_cols["Volume"] not in df.columns:
+        if covered is not None:
+            store.append(Symbol, None, covered=covered)
+        return
+    ohlcv = df.rename(columns={v: k for k, v in store_cols.items()})
+    ohlcv.index = pd.to_datetime(df["Date"], format="%d-%b-%Y", errors="coerce")
+    ohlcv = ohlcv[ohlcv.index.notna()]
+    ohlcv["Volume"] = pd.to_numeric(ohlcv["Volume"], errors="coerce")
+    store.append(Symbol, ohlcv, covered=covered)
+
+def fill_stored_price_df(Symbol,from_date,to_date,fetch_report=fetch_price_volume_report,store=nse_price_store):
+    #downloads only the days of the range the price store has not covered yet, then serves the range from the store
+    start = pd.to_datetime(from_date, format="%d-%m-%Y")
+    end = pd.to_datetime(to_date, format="%d-%m-%Y")
+    span = store.missing_span(Symbol, start, end)
+    if span is not None:
+        first, last = span
+        df = download_price_df(Symbol, first.strftime("%d-%m-%Y"), last.strftime("%d-%m-%Y"), fetch_report)
+        settled = min(last, last_settled_day())
+        store_price_df(Symbol, df, store, covered=(first, settled) if first <= settled else None)
+    return read_stored_price_df(Symbol, start, end, store)
+
+def load_price_df(Symbol,from_date,to_date):
+    #returns daily NSE prices, downloading only the days the local price store does not cover
+    return fill_stored_price_df(Symbol, from_date, to_date)
+
+def get_bulk_price_df(Symbols,from_date,to_date,fetch_report=fetch_price_volume_report,store=nse_price_store,max_workers=BULK_FETCH_WORKERS):
+    #returns one tidy frame (a row per symbol and day, sorted by symbol then date) with the Return % of every symbol
+    #days missing from the store are downloaded concurrently; symbols that fail or have no rows are left out
+    #pass store=None to always download and keep nothing
+    def load(Symbol):
+        try:
+            if store is not None:
+                df = fill_stored_price_df(Symbol, from_date, to_date, fetch_report, store)
+            else:
+                df = download_price_df(Symbol, from_date, to_date, fetch_report)
+            df["Symbol"] = normalize_symbol(Symbol)
+            return df
+        except Exception as e:
+            logger.warning(f"Error fetching prices for {Symbol}: {e}")
+            return None
+
+    if not Symbols:
+        frames = []
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(Symbols))) as pool:
+            frames = [df for df in pool.map(load, Symbols) if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=["Symbol", "Date", *numeric_cols, "Return %"])
+
+    df = pd.concat(frames, ignore_index=True)
+    df["Return %"] = (df["Close Price"]/df["Open Price"] - 1) * 100
+    return df.sort_values(["Symbol", "Date"], kind="stable", ignore_index=True)
+
 #stock return percentage 
 def get_stock_return_df(Symbol,from_date,to_date):
     #returns a dataframe conatining the Return %
-    data = capital_market.price_volume_and_deliverable_position_data(symbol=Symbol, from_date=from_date, to_date=to_date)
-    df = pd.read_csv("file.csv",skipinitialspace=True)
-    df.columns = df.columns.str.strip()
-    for col in df.columns:
-        if df[col].dtype == object:  # Check if the column contains strings
-            df[col] = df[col].str.replace(",", "")
-    
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
+    df = load_price_df(Symbol, from_date, to_date)
     df["Return %"] = (df["Close Price"]/df["Open Price"] - 1) * 100
     return df
 
@@ -47,41 +177,15 @@ def get_std_dev(Symbol,from_date,to_date):
     return std_dev
 
 #beta market sensitivity
-def get_market_sensitivity(Symbol,index,from_date,to_date):
-    stock_return = get_stock_return_df(Symbol,from_date,to_date)["Return %"]
-    market_return = get_market_return_df(index,from_date,to_date)["Market Return %"]
-    
-    min_length = min(len(stock_return), len(market_return))
-
-    # Truncate both arrays to the same length
-    stock_return = stock_return[:min_length]
-    market_return = market_return[:min_length]
-    
-    data = {
-        "Stock Return":stock_return,
-        "Market Return":market_return,
-    }
-    #[[0.00143  0.001075]
-    #[0.001075 0.00083 ]]
-    #cov_matrix[0, 0] → Variance of stock returns = 0.00143
-    #cov_matrix[1, 1] → Variance of market returns = 0.00083
-    #cov_matrix[0, 1] or cov_matrix[1, 0] → Covariance between stock and market returns = 0.001075
-    temp_df = pd.DataFrame(data)
-    covariance= temp_df.cov().iloc[0,1]
-
-    var_market = market_return.var(ddof=1)
-    beta = covariance / var_market
-    return beta
+def get_market_sensitivity(Symbol,index,from_date,to_date,**bulk_options):
+    #beta over the dates both the stock and the index traded, from the cached risk matrix (see get_risk_matrix)
+    as_of = pd.to_datetime(to_date, format="%d-%m-%Y")
+    matrix = get_risk_matrix([Symbol], index, window=None, as_of=as_of, from_date=from_date, **bulk_options)
+    return float(matrix.betas.get(normalize_symbol(Symbol), np.nan))
 
 #maximum_drawdown
 def maximum_drawdown(Symbol,from_date,to_date):
-    data = capital_market.price_volume_and_deliverable_position_data(symbol=Symbol, from_date=from_date, to_date=to_date)
-    df = pd.read_csv("file.csv",skipinitialspace=True)
-    df.columns = df.columns.str.strip()
-    for col in df.columns:
-        if df[col].dtype == object:  # Check if the column contains strings
-            df[col] = df[col].str.replace(",", "")
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
+    df = load_price_df(Symbol, from_date, to_date)
     stock_prices = df['Close Price']
     rolling_max = stock_prices.cummax()
     drawdown = (stock_prices - rolling_max) / rolling_max
@@ -110,29 +214,54 @@ def sharpe_ratio(Symbol,from_date,to_date):
     sharpe_ratio = (mean_return - risk_free_rate) / std_dev
     return sharpe_ratio
 
+#market Return % of an index by trading date
+def get_market_returns(index,from_date,to_date):
+    df = get_market_return_df(index, from_date, to_date)
+    dates = pd.to_datetime(df["TIMESTAMP"], format="mixed", dayfirst=True, errors="coerce")
+    returns = pd.Series(pd.to_numeric(df["Market Return %"], errors="coerce").to_numpy(), index=dates)
+    return returns[returns.index.notna()]
+
+#risk profiles of many symbols against one index
+def get_risk_profiles(Symbols,index,from_date,to_date,**bulk_options):
+    #loads every symbol's prices (see get_bulk_price_df) and the index once, then computes all metrics together
+    #stock and index returns are aligned by date; returns a dict of symbol to RiskProfile
+    prices = get_bulk_price_df(Symbols, from_date, to_date, **bulk_options)
+    market = get_market_returns(index, from_date, to_date)
+    return risk.compute_risk_profiles(prices, market)
+
+def get_risk_profile(Symbol,index,from_date,to_date,**bulk_options):
+    #RiskProfile of one symbol, or None without price data
+    return get_risk_profiles([Symbol], index, from_date, to_date, **bulk_options).get(normalize_symbol(Symbol))
+
+#calendar days fetched per trading day of a risk matrix window, with slack for holidays
+CALENDAR_DAYS_PER_TRADING_DAY = 1.5
+
+def get_risk_matrix(Symbols,index,window=252,as_of=None,rolling_window=None,dtype="float64",shrinkage=None,from_date=None,**bulk_options):
+    #betas, covariance and correlation of a universe over its last `window` trading days up to as_of (default today)
+    #from_date (dd-mm-YYYY) fixes the start instead, and window=None keeps every date from there
+    #cached per (universe, index, window, start, as-of date, options) in risk_matrix.risk_matrix_cache
+    as_of = pd.Timestamp(as_of if as_of is not None else pd.Timestamp.today()).normalize()
+    if from_date is None:
+        from_date = (as_of - pd.Timedelta(days=int(window * CALENDAR_DAYS_PER_TRADING_DAY) + 10)).strftime("%d-%m-%Y")
+    universe = tuple(sorted({normalize_symbol(s) for s in Symbols}))
+    key = (universe, index, window, from_date, as_of, rolling_window, dtype, shrinkage)
+
+    def compute():
+        to_date = as_of.strftime("%d-%m-%Y")
+        prices = get_bulk_price_df(list(universe), from_date, to_date, **bulk_options)
+        returns = prices.drop_duplicates(["Date", "Symbol"], keep="last").pivot(index="Date", columns="Symbol", values="Return %")
+        market = get_market_returns(index, from_date, to_date)
+        return risk_matrix.compute_risk_matrix(returns, market, window=window, rolling_window=rolling_window,
+                                               dtype=dtype, shrinkage=shrinkage)
+
+    return risk_matrix.risk_matrix_cache.get(key, compute)
+
 def calculate_risk_tolerance(Symbol,index,from_date,to_date):
-    volatility = get_std_dev(Symbol,from_date,to_date)
-    beta = get_market_sensitivity(Symbol,index,from_date,to_date)
-    max_drawdown = maximum_drawdown(Symbol,from_date,to_date)
-    vaR = value_at_risk(Symbol,from_date,to_date)
-    sR = sharpe_ratio(Symbol,from_date,to_date)
-    
-    w_volatility = 0.25
-    w_beta = 0.20
-    w_drawdown = -0.20
-    w_var = -0.25
-    w_sharpe = 0.30
-    
-    risk_tolerance_score = (
-        w_volatility * volatility +
-        w_beta * beta +
-        w_drawdown * max_drawdown +
-        w_var * vaR +
-        w_sharpe * sR
-    )
-    
-    
-    return risk_tolerance_score
+    #one load of the stock and the index instead of one per metric, see risk.TOLERANCE_WEIGHTS
+    profile = get_risk_profile(Symbol, index, from_date, to_date)
+    if profile is None:
+        raise ValueError(f"No price data for {Symbol} between {from_date} and {to_date}")
+    return profile.risk_tolerance
 
 
 
@@ -0,0 +1,218 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model inputs, in the order the scaler and model were fitted on
+FEATURE_COLUMNS = [
+    'Returns', 'Volatility', 'RSI', 'MACD', 'BB_position',
+    'Volume_Ratio', 'Max_Drawdown', 'Sharpe_Ratio', 'Sortino_Ratio'
+]
+
+
+def frame_error(df: pd.DataFrame) -> Optional[str]:
+    """Why a per-symbol OHLCV DataFrame cannot go into a `PricePanel`, None if it can."""
+    try:
+        df['Close'].to_numpy(dtype=np.float64)
+        df['Volume'].to_numpy(dtype=np.float64)
+    except (KeyError, TypeError, ValueError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def valid_frames(stock_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """The frames of `stock_data` a panel can be built from; the others are logged and dropped."""
+    valid = {}
+    for symbol, df in stock_data.items():
+        if df is None or len(df) == 0:
+            continue
+        error = frame_error(df)
+        if error is not None:
+            logger.error(f"Error processing {symbol}: {error}")
+            continue
+        valid[symbol] = df
+    return valid
+
+
+class PricePanel:
+    """Close and volume histories of many symbols as (bars x symbols) matrices.
+
+    Every symbol's history is aligned on its most recent bar, so the last row holds
+    the latest bar of every symbol and shorter histories are padded with NaN at the
+    top. For symbols on the same exchange calendar this is the usual dates x symbols
+    matrix; rolling windows always run over a symbol's own consecutive bars, which
+    keeps the results identical to `StockRecommender.calculate_features`.
+    """
+
+    def __init__(self, symbols: List[str], close: np.ndarray, volume: np.ndarray, start: np.ndarray):
+        self.symbols = symbols
+        self.close = close
+        self.volume = volume
+        # Row index of the first real bar of every symbol
+        self.start = start
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.close.shape
+
+    @classmethod
+    def from_frames(cls, stock_data: Dict[str, pd.DataFrame]) -> 'PricePanel':
+        """Build a panel from per-symbol OHLCV DataFrames with 'Close' and 'Volume' columns."""
+        symbols = [s for s, df in stock_data.items() if df is not None and len(df) > 0]
+        n_bars = max((len(stock_data[s]) for s in symbols), default=0)
+        close = np.full((n_bars, len(symbols)), np.nan)
+        volume = np.full((n_bars, len(symbols)), np.nan)
+        start = np.zeros(len(symbols), dtype=np.int64)
+
+        for j, symbol in enumerate(symbols):
+            df = stock_data[symbol]
+            offset = n_bars - len(df)
+            close[offset:, j] = df['Close'].to_numpy(dtype=np.float64)
+            volume[offset:, j] = df['Volume'].to_numpy(dtype=np.float64)
+            start[j] = offset
+
+        return cls(symbols, close, volume, start)
+
+    def valid_mask(self) -> np.ndarray:
+        """Boolean (bars x symbols) mask that is False on padding rows."""
+        rows = np.arange(self.close.shape[0])[:, None]
+        return rows >= self.start[None, :]
+
+
+def _shift_down(a: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full_like(a, np.nan)
+    out[periods:] = a[:-periods]
+    return out
+
+
+def _rolling_sums(a: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Windowed count of non-NaN values, sum and sum of squares, all from prefix sums."""
+    valid = ~np.isnan(a)
+    filled = np.where(valid, a, 0.0)
+    zeros = np.zeros((1, a.shape[1]))
+
+    def windowed(x):
+        csum = np.concatenate([zeros, np.cumsum(x, axis=0)])
+        out = np.full(a.shape, np.nan)
+        out[window - 1:] = csum[window:] - csum[:-window]
+        return out
+
+    return windowed(valid.astype(np.float64)), windowed(filled), windowed(filled * filled)
+
+
+def rolling_mean(a: np.ndarray, window: int) -> np.ndarray:
+    """Column-wise rolling mean; NaN unless the full window is populated (pandas min_periods)."""
+    count, total, _ = _rolling_sums(a, window)
+    return np.where(count == window, total / window, np.nan)
+
+
+def rolling_std(a: np.ndarray, window: int) -> np.ndarray:
+    """Column-wise rolling sample standard deviation (ddof=1)."""
+    # Centre each column first so the sum-of-squares form keeps its precision
+    with np.errstate(invalid='ignore'):
+        centre = np.nanmean(a, axis=0)
+    count, total, total_sq = _rolling_sums(a - np.nan_to_num(centre), window)
+    var = (total_sq - total * total / window) / (window - 1)
+    return np.where(count == window, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+
+
+def ewm_mean(a: np.ndarray, span: int) -> np.ndarray:
+    """Column-wise exponential moving average, equivalent to `ewm(span, adjust=False).mean()`."""
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(a)
+    prev = np.full(a.shape[1], np.nan)
+    for t in range(a.shape[0]):
+        x = a[t]
+        prev = np.where(np.isnan(prev), x, np.where(np.isnan(x), prev, (1 - alpha) * prev + alpha * x))
+        out[t] = prev
+    return out
+
+
+def _bfill(a: np.ndarray) -> np.ndarray:
+    flipped = a[::-1]
+    idx = np.where(~np.isnan(flipped), np.arange(a.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return flipped[idx, np.arange(a.shape[1])][::-1]
+
+
+def compute_features(panel: PricePanel) -> Dict[str, np.ndarray]:
+    """Compute every model feature for all symbols of a panel in one batched pass.
+
+    Mirrors `StockRecommender.calculate_features` column for column, including its
+    NaN fill rules, and returns a dict of (bars x symbols) arrays keyed by feature
+    name plus the 'Returns_Shifted' training target.
+    """
+    close, volume = panel.close, panel.volume
+    valid = panel.valid_mask()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = close / _shift_down(close) - 1
+        returns_shifted = np.full_like(returns, np.nan)
+        returns_shifted[:-1] = returns[1:]
+
+        volatility = _bfill(rolling_std(returns, 20))
+
+        # RSI (14-day); the first real bar counts as a zero gain/loss like `where` does
+        delta = close - _shift_down(close)
+        gain = np.where(valid, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(valid, np.where(delta < 0, -delta, 0.0), np.nan)
+        rs = rolling_mean(gain, 14) / rolling_mean(loss, 14)
+        rsi = 100 - (100 / (1 + rs))
+
+        macd = ewm_mean(close, 12) - ewm_mean(close, 26)
+
+        bb_middle = rolling_mean(close, 20)
+        bb_std = rolling_std(close, 20)
+        bb_upper = bb_middle + bb_std * 2
+        bb_lower = bb_middle - bb_std * 2
+        bb_position = (close - bb_lower) / (bb_upper - bb_lower)
+
+        volume_ratio = volume / rolling_mean(volume, 20)
+
+        max_drawdown = close / np.fmax.accumulate(close, axis=0) - 1
+
+        mean_return = np.nanmean(returns, axis=0)
+        sharpe = mean_return / np.nanstd(returns, axis=0, ddof=1) * np.sqrt(252)
+        positive_returns = np.where(returns < 0, 0.0, returns)
+        sortino = mean_return / np.nanstd(positive_returns, axis=0, ddof=1) * np.sqrt(252)
+
+    n_bars = close.shape[0]
+    return {
+        'Close': close,
+        'Returns': np.where(np.isnan(returns), 0.0, returns),
+        'Returns_Shifted': np.where(np.isnan(returns_shifted), 0.0, returns_shifted),
+        'Volatility': volatility,
+        'RSI': np.where(np.isnan(rsi), 50.0, rsi),
+        'MACD': np.where(np.isnan(macd), 0.0, macd),
+        'BB_position': np.where(np.isnan(bb_position), 0.5, bb_position),
+        'Volume_Ratio': np.where(np.isnan(volume_ratio), 1.0, volume_ratio),
+        'Max_Drawdown': np.where(np.isnan(max_drawdown), 0.0, max_drawdown),
+        'Sharpe_Ratio': np.broadcast_to(np.where(np.isnan(sharpe), 0.0, sharpe), (n_bars, len(sharpe))),
+        'Sortino_Ratio': np.broadcast_to(np.where(np.isnan(sortino), 0.0, sortino), (n_bars, len(sortino))),
+    }
+
+
+def training_matrix(panel: PricePanel, features: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stack the training samples of every symbol, in symbol order.
+
+    Returns:
+        Tuple of (X, y, samples per symbol). The last bar of each symbol is dropped
+        because it has no next-day target, as are rows with NaN features or target.
+    """
+    n_bars = panel.shape[0]
+    rows = panel.valid_mask()
+    rows[n_bars - 1:] = False
+
+    # (symbols, bars, features) so samples come out grouped per symbol
+    stacked = np.stack([features[name] for name in FEATURE_COLUMNS], axis=-1).transpose(1, 0, 2)
+    target = features['Returns_Shifted'].T
+    mask = rows.T & ~np.isnan(stacked).any(axis=-1) & ~np.isnan(target)
+
+    return stacked[mask], target[mask], mask.sum(axis=1)
+
+
+def latest_feature_matrix(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """Return the (symbols x features) matrix of every symbol's most recent bar."""
+    return np.column_stack([features[name][-1] for name in FEATURE_COLUMNS])
@@ -0,0 +1,352 @@
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from channels.layers import get_channel_layer
+
+from . import data
+from .cluster import default_coordinator
+from .metrics import metrics
+from .store import normalize_symbol
+from .symbols import SymbolIndex, symbol_index
+from .universe import DEFAULT_UNIVERSE
+
+logger = logging.getLogger(__name__)
+
+# Top 10 companies on NSE
+TOP_10_COMPANIES = [
+    "RELIANCE", "TCS", "INFY", "HDFCBANK", "HDFC",
+    "ICICIBANK", "BHARTIARTL", "KOTAKBANK", "LT", "ITC"
+]
+
+# Channel layer group of every worker's relay channel
+MARKET_GROUP = 'market_data'
+
+# Most symbols a single socket may subscribe to
+MAX_SUBSCRIPTIONS = 50
+
+# Most distinct symbols a worker streams across all its sockets, and the producer polls
+MAX_FEED_SYMBOLS = 200
+
+# Upstream requests in flight at once during a poll
+FETCH_WORKERS = 8
+
+# Seconds between upstream polls
+POLL_INTERVAL = 5.0
+
+# Calendar days of the price/volume report a quote is read from, so it holds the latest session after holidays
+QUOTE_HISTORY_DAYS = 7
+
+
+def empty_quote(symbol: str) -> Dict:
+    return {
+        "symbol": symbol,
+        "lastPrice": 0,
+        "open": 0,
+        "high": 0,
+        "low": 0,
+        "previousClose": 0,
+    }
+
+
+def fetch_quote(symbol: str) -> Dict:
+    """Latest session of a symbol from NSE's price/volume report. Blocking; call it off the event loop.
+
+    The report is read in memory (`data.fetch_price_volume_csv`), not through
+    nselib's shared file.csv, so quotes are fetched concurrently.
+    """
+    try:
+        today = pd.Timestamp.today()
+        df = data.download_price_df(symbol, (today - pd.Timedelta(days=QUOTE_HISTORY_DAYS)).strftime("%d-%m-%Y"),
+                                    today.strftime("%d-%m-%Y"), fetch_report=data.fetch_price_volume_csv)
+        if df.empty:
+            return empty_quote(symbol)
+
+        def price(column):
+            value = latest.get(column)
+            return 0 if pd.isna(value) else float(value)
+
+        latest = df.sort_values("Date", kind="stable").iloc[-1]
+        return {
+            "symbol": symbol,
+            "lastPrice": price("Close Price"),
+            "open": price("Open Price"),
+            "high": price("High Price"),
+            "low": price("Low Price"),
+            "previousClose": price("Prev Close"),
+        }
+    except Exception as e:
+        logger.warning(f"Error fetching data for {symbol}: {e}")
+        return empty_quote(symbol)
+
+
+# Shared by every poll, so a tick never has more than FETCH_WORKERS requests upstream
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='feed-fetch')
+
+
+def fetch_snapshot(symbols: List[str]) -> Dict[str, Dict]:
+    """Latest quote of every symbol, `FETCH_WORKERS` requests at a time. Blocking; call it off the event loop."""
+    return dict(zip(symbols, _fetch_pool.map(fetch_quote, symbols)))
+
+
+def is_known_symbol(symbol: str, index: SymbolIndex = symbol_index) -> bool:
+    """Whether a symbol may be streamed: it is in the universe or one of `TOP_10_COMPANIES`.
+
+    Until a universe file has been written, `universe.DEFAULT_UNIVERSE` stands in for it.
+    """
+    if symbol in TOP_10_COMPANIES or symbol in index:
+        return True
+    if len(index):
+        return False
+    base = normalize_symbol(symbol)
+    return any(base == normalize_symbol(s) for symbols in DEFAULT_UNIVERSE.values() for s in symbols)
+
+
+class SubscriptionLimitError(Exception):
+    """Raised when a subscription would take a worker past `MAX_FEED_SYMBOLS` distinct symbols."""
+
+
+def diff_quote(old: Optional[Dict], new: Dict) -> Dict:
+    """Fields of `new` that differ from `old`; every field when there is no old quote."""
+    if old is None:
+        return dict(new)
+    return {field: value for field, value in new.items() if old.get(field) != value}
+
+
+def encode(message: Dict) -> str:
+    """Compact JSON for the wire."""
+    return json.dumps(message, separators=(',', ':'))
+
+
+class MarketDataFeed:
+    """Market data for every /ws/data/ socket of a worker, from one producer per deployment.
+
+    Sockets register as listeners and subscribe to symbols. Every worker publishes
+    the union of its sockets' symbols to the coordinator, which elects exactly one
+    worker as the producer. The producer polls all workers' symbols on a worker
+    thread, so its event loop keeps serving sockets, and broadcasts only the
+    fields that changed to `MARKET_GROUP` through the channel layer. Each worker
+    has one relay channel in that group and hands every update to its local
+    listeners, so the channel layer carries one message per worker rather than
+    one per socket. The feed stops when its last local subscription goes away.
+
+    With the default in-memory channel layer and no REDIS_URL, the single worker
+    is always the producer; see `stocks.cluster`.
+
+    Args:
+        fetch: Blocking function returning the quotes of a list of symbols
+        interval: Seconds between polls
+        channel_layer: Channel layer to broadcast on, defaults to the configured one
+        coordinator: Producer election and shared state, defaults to `cluster.default_coordinator()`
+        max_symbols: Most distinct symbols subscribed on this worker, and polled by the producer
+    """
+
+    def __init__(self, fetch: Callable[[List[str]], Dict] = fetch_snapshot, interval: float = POLL_INTERVAL,
+                 channel_layer=None, coordinator=None, max_symbols: int = MAX_FEED_SYMBOLS):
+        self.fetch = fetch
+        self.interval = interval
+        self.max_symbols = max_symbols
+        self._channel_layer = channel_layer
+        self._coordinator = coordinator
+        # Local subscriber count and latest known quote per symbol
+        self.subscriptions: Dict[str, int] = {}
+        self.latest: Dict[str, Dict] = {}
+        self.listeners = set()
+        self.is_producer = False
+        self.ticks = 0
+        self.relayed = 0
+        # Last quote broadcast per symbol while this worker is the producer
+        self._produced: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    @property
+    def coordinator(self):
+        if self._coordinator is None:
+            self._coordinator = default_coordinator()
+        return self._coordinator
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.subscriptions)
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def add_listener(self, listener):
+        """Register a local socket; it receives `feed_changes(changes)` calls for every update."""
+        self.listeners.add(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.discard(listener)
+
+    async def subscribe(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Add a subscriber to each symbol, starting the feed if it is idle.
+
+        Returns:
+            Latest known quote of the symbols that already have one, for the snapshot
+
+        Raises:
+            SubscriptionLimitError: If the worker would stream more than `max_symbols` symbols
+        """
+        new = [s for s in dict.fromkeys(symbols) if s not in self.subscriptions]
+        if len(self.subscriptions) + len(new) > self.max_symbols:
+            raise SubscriptionLimitError(f"The server streams at most {self.max_symbols} symbols")
+        for symbol in symbols:
+            self.subscriptions[symbol] = self.subscriptions.get(symbol, 0) + 1
+        missing = [s for s in new if s not in self.latest]
+        if missing:
+            # Quotes another worker's producer has already published
+            self.latest.update(await asyncio.to_thread(self.coordinator.load_latest, missing))
+        if not self.running:
+            self._wake = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._run_relay()), asyncio.create_task(self._run_producer())]
+        elif new:
+            self._wake.set()
+        return {s: self.latest[s] for s in symbols if s in self.latest}
+
+    async def unsubscribe(self, symbols: List[str]):
+        """Remove a subscriber from each symbol, stopping the feed when none are left."""
+        for symbol in symbols:
+            count = self.subscriptions.get(symbol, 0) - 1
+            if count > 0:
+                self.subscriptions[symbol] = count
+            else:
+                self.subscriptions.pop(symbol, None)
+                self.latest.pop(symbol, None)
+        if not self.subscriptions and self.running:
+            await self.stop()
+
+    async def stop(self):
+        """Cancel the relay and producer tasks and withdraw from the coordinator."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await asyncio.to_thread(self.coordinator.release)
+        except Exception as e:
+            logger.error(f"Could not release market data subscriptions: {e}")
+
+    async def _run_relay(self):
+        metrics.gauge_add('feed_relay_tasks', 1)
+        channel = await self.channel_layer.new_channel()
+        await self.channel_layer.group_add(MARKET_GROUP, channel)
+        try:
+            while True:
+                message = await self.channel_layer.receive(channel)
+                self._dispatch(message["changes"])
+        finally:
+            metrics.gauge_add('feed_relay_tasks', -1)
+            try:
+                await asyncio.shield(self.channel_layer.group_discard(MARKET_GROUP, channel))
+            except Exception:
+                pass
+
+    def _dispatch(self, changes: Dict[str, Dict]):
+        local = {s: delta for s, delta in changes.items() if s in self.subscriptions}
+        if not local:
+            return
+        self.relayed += 1
+        for symbol, delta in local.items():
+            self.latest[symbol] = dict(self.latest.get(symbol, {}), **delta)
+        for listener in list(self.listeners):
+            listener.feed_changes(local)
+
+    async def _run_producer(self):
+        metrics.gauge_add('feed_producer_tasks', 1)
+        try:
+            while self.subscriptions:
+                self._wake.clear()
+                try:
+                    await self._tick()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Market data poll failed: {e}")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            metrics.gauge_add('feed_producer_tasks', -1)
+            if self.is_producer:
+                self.is_producer = False
+                metrics.gauge_add('feed_is_producer', -1)
+
+    async def _tick(self):
+        coordinator = self.coordinator
+        await asyncio.to_thread(coordinator.publish_subscriptions, self.symbols)
+        is_producer = await asyncio.to_thread(coordinator.acquire)
+        if is_producer != self.is_producer:
+            self.is_producer = is_producer
+            metrics.gauge_add('feed_is_producer', 1 if is_producer else -1)
+            if is_producer:
+                # Continue from what the previous producer broadcast
+                self._produced = await asyncio.to_thread(coordinator.load_latest,
+                                                         await asyncio.to_thread(coordinator.all_subscriptions))
+        if not is_producer:
+            return
+
+        symbols = await asyncio.to_thread(coordinator.all_subscriptions)
+        if len(symbols) > self.max_symbols:
+            # Every worker is capped, but together they can still ask for more
+            logger.warning(f"Polling {self.max_symbols} of {len(symbols)} subscribed symbols")
+            symbols = sorted(symbols)[:self.max_symbols]
+        quotes = await self._fetch_holding_lease(symbols)
+        if quotes is None:
+            logger.warning(f"Worker {coordinator.worker_id} lost the producer lease during a poll")
+            self.is_producer = False
+            metrics.gauge_add('feed_is_producer', -1)
+            return
+        self.ticks += 1
+        metrics.incr('feed_polls')
+        changes = {}
+        for symbol in symbols:
+            quote = quotes.get(symbol)
+            if quote is None:
+                continue
+            delta = diff_quote(self._produced.get(symbol), quote)
+            self._produced[symbol] = quote
+            if delta:
+                changes[symbol] = delta
+        self._produced = {s: q for s, q in self._produced.items() if s in quotes}
+        if changes:
+            await asyncio.to_thread(coordinator.store_latest, {s: self._produced[s] for s in changes})
+            await self.channel_layer.group_send(MARKET_GROUP, {"type": "feed.delta", "changes": changes})
+
+
+    async def _fetch_holding_lease(self, symbols: List[str]) -> Optional[Dict[str, Dict]]:
+        """Fetch the quotes, renewing the lease every `renew_interval` seconds until they arrive.
+
+        Returns:
+            The quotes, or None if the lease went to another worker meanwhile
+        """
+        coordinator = self.coordinator
+        fetch = asyncio.ensure_future(asyncio.to_thread(self.fetch, symbols))
+        holds_lease = True
+        while True:
+            done, _ = await asyncio.wait({fetch}, timeout=coordinator.renew_interval)
+            if done:
+                quotes = fetch.result()
+                return quotes if holds_lease else None
+            if holds_lease:
+                await asyncio.to_thread(coordinator.publish_subscriptions, self.symbols)
+                holds_lease = await asyncio.to_thread(coordinator.renew)
+
+
+market_feed = MarketDataFeed()
@@ -0,0 +1,143 @@
+import time
+import random
+import logging
+import threading
+import pandas as pd
+import yfinance as yf
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryProvider(ABC):
+    """Source of daily OHLCV history for a single symbol.
+
+    Providers return yfinance-shaped DataFrames (a date index and 'Open', 'High',
+    'Low', 'Close', 'Volume' columns) and raise on transport errors so the fetcher
+    can retry. An empty DataFrame means the symbol has no data.
+    """
+
+    name = 'base'
+    # Maximum requests per second across all fetchers in the process, None for unlimited
+    rate_limit: Optional[float] = None
+
+    @abstractmethod
+    def fetch_history(self, symbol: str, period: str = '1y', start=None) -> pd.DataFrame:
+        """History of `symbol`: the last `period`, or every bar from `start` when it is given."""
+
+
+class YFinanceProvider(HistoryProvider):
+    """Yahoo Finance history for NSE listings."""
+
+    name = 'yfinance'
+    rate_limit = 5.0
+
+    def fetch_history(self, symbol: str, period: str = '1y', start=None) -> pd.DataFrame:
+        # Remove .NS suffix if present
+        base_symbol = symbol.replace('.NS', '')
+        ticker = yf.Ticker(f"{base_symbol}.NS")
+        if start is not None:
+            return ticker.history(start=start)
+        return ticker.history(period=period)
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` acquisitions per second."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def rate_limiter_for(provider: HistoryProvider) -> Optional[RateLimiter]:
+    """Return the process-wide rate limiter shared by every fetcher of a provider."""
+    if not provider.rate_limit:
+        return None
+    with _rate_limiters_lock:
+        if provider.name not in _rate_limiters:
+            _rate_limiters[provider.name] = RateLimiter(provider.rate_limit)
+        return _rate_limiters[provider.name]
+
+
+class HistoryFetcher:
+    """Concurrent, rate-limited history downloads with retries and exponential backoff.
+
+    Args:
+        provider: Data source, defaults to Yahoo Finance
+        max_workers: Size of the download thread pool
+        max_retries: Retries per symbol after the first failed attempt
+        backoff: Base delay in seconds, doubled on every retry (plus jitter)
+    """
+
+    def __init__(self, provider: Optional[HistoryProvider] = None, max_workers: int = 8,
+                 max_retries: int = 3, backoff: float = 0.5):
+        self.provider = provider or YFinanceProvider()
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter_for(self.provider)
+
+    def fetch_one(self, symbol: str, period: str = '1y', start=None) -> Optional[pd.DataFrame]:
+        """Fetch one symbol, retrying transport errors. Returns None if every attempt failed."""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                return self.provider.fetch_history(symbol, period=period, start=start)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error fetching data for {symbol}: {str(e)}")
+                    return None
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                logger.warning(f"Retrying {symbol} in {delay:.2f}s after error: {str(e)}")
+                time.sleep(delay)
+
+    def fetch_many(self, symbols: List[str], period: str = '1y', min_rows: int = 1,
+                   start=None) -> Dict[str, pd.DataFrame]:
+        """Fetch many symbols concurrently.
+
+        Args:
+            symbols: Stock symbols to download
+            period: yfinance period string, ignored when `start` is given
+            min_rows: Symbols with fewer rows than this are dropped
+            start: Optional first date to download, for delta refreshes
+
+        Returns:
+            Dict of symbol to history, in the order of `symbols`, for symbols with enough data
+        """
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as pool:
+            results = list(pool.map(lambda s: self.fetch_one(s, period, start), symbols))
+
+        data = {}
+        for symbol, hist in zip(symbols, results):
+            if hist is None:
+                continue
+            if len(hist) >= min_rows and not hist.empty:
+                data[symbol] = hist
+                logger.info(f"Successfully fetched data for {symbol}")
+            else:
+                logger.warning(f"No data available for {symbol}")
+        return data
@@ -0,0 +1,189 @@
+import math
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict, Optional
+
+from .features import FEATURE_COLUMNS
+
+
+class RollingWindow:
+    """Fixed-size window with O(1) mean and sample variance (sliding Welford)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    def push(self, x: float):
+        if len(self.values) < self.size:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+
+    def window_mean(self) -> float:
+        return self.mean if self.full else math.nan
+
+    def window_std(self) -> float:
+        if not self.full:
+            return math.nan
+        return math.sqrt(max(self.m2 / (self.size - 1), 0.0))
+
+
+class RunningStats:
+    """Expanding mean and sample standard deviation (Welford)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def std(self) -> float:
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class IndicatorState:
+    """Running indicator state of one symbol, updated in O(1) per new daily bar.
+
+    Holds the accumulators behind every model feature so that a new bar does not
+    recompute the full history. `update` returns the same feature values as
+    `stocks.features.compute_features` (and `calculate_features`) would for the
+    latest bar of the full history, within floating-point tolerance.
+    """
+
+    def __init__(self):
+        self.n_bars = 0
+        self.last_close = math.nan
+        self.first_date = None
+        self.last_date = None
+        self.returns = RollingWindow(20)
+        self.gains = RollingWindow(14)
+        self.losses = RollingWindow(14)
+        self.closes = RollingWindow(20)
+        self.volumes = RollingWindow(20)
+        self.ewm_fast = math.nan
+        self.ewm_slow = math.nan
+        self.running_max = -math.inf
+        self.return_stats = RunningStats()
+        self.positive_return_stats = RunningStats()
+        self.features: Dict[str, float] = {}
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> 'IndicatorState':
+        """Build the state by streaming a symbol's full OHLCV history through `update`."""
+        state = cls()
+        for date, close, volume in zip(df.index, df['Close'].to_numpy(float), df['Volume'].to_numpy(float)):
+            state.update(close, volume, date)
+        return state
+
+    def update(self, close: float, volume: float, date=None) -> Dict[str, float]:
+        """Apply one new bar and return the features as of that bar."""
+        if self.n_bars == 0:
+            ret = math.nan
+            gain = loss = 0.0
+        else:
+            ret = close / self.last_close - 1
+            delta = close - self.last_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            self.returns.push(ret)
+            self.return_stats.push(ret)
+            self.positive_return_stats.push(max(ret, 0.0))
+
+        self.gains.push(gain)
+        self.losses.push(loss)
+        self.closes.push(close)
+        self.volumes.push(volume)
+
+        alpha_fast, alpha_slow = 2.0 / 13.0, 2.0 / 27.0
+        if self.n_bars == 0:
+            self.ewm_fast = self.ewm_slow = close
+        else:
+            self.ewm_fast = (1 - alpha_fast) * self.ewm_fast + alpha_fast * close
+            self.ewm_slow = (1 - alpha_slow) * self.ewm_slow + alpha_slow * close
+        self.running_max = max(self.running_max, close)
+
+        if self.n_bars == 0:
+            self.first_date = date
+        self.n_bars += 1
+        self.last_close = close
+        self.last_date = date
+        self.features = self._features(ret, close, volume)
+        return self.features
+
+    def _features(self, ret: float, close: float, volume: float) -> Dict[str, float]:
+        avg_gain, avg_loss = self.gains.window_mean(), self.losses.window_mean()
+        if math.isnan(avg_gain) or (avg_gain == 0 and avg_loss == 0):
+            rsi = 50.0
+        elif avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        bb_middle, bb_std = self.closes.window_mean(), self.closes.window_std()
+        if math.isnan(bb_std) or bb_std == 0:
+            bb_position = 0.5
+        else:
+            bb_position = (close - (bb_middle - 2 * bb_std)) / (4 * bb_std)
+
+        avg_volume = self.volumes.window_mean()
+        if math.isnan(avg_volume) or (avg_volume == 0 and volume == 0):
+            volume_ratio = 1.0
+        else:
+            volume_ratio = volume / avg_volume if avg_volume else math.inf
+
+        def ratio(stats: RunningStats) -> float:
+            std = stats.std()
+            if math.isnan(std) or std == 0:
+                return 0.0
+            return self.return_stats.mean / std * math.sqrt(252)
+
+        return {
+            'Returns': 0.0 if math.isnan(ret) else ret,
+            'Volatility': self.returns.window_std(),
+            'RSI': rsi,
+            'MACD': self.ewm_fast - self.ewm_slow,
+            'BB_position': bb_position,
+            'Volume_Ratio': volume_ratio,
+            'Max_Drawdown': close / self.running_max - 1,
+            'Sharpe_Ratio': ratio(self.return_stats),
+            'Sortino_Ratio': ratio(self.positive_return_stats),
+        }
+
+    def feature_vector(self) -> np.ndarray:
+        """Latest features in `FEATURE_COLUMNS` order."""
+        return np.array([self.features.get(name, math.nan) for name in FEATURE_COLUMNS])
+
+
+def build_indicator_states(stock_data: Dict[str, pd.DataFrame]) -> Dict[str, IndicatorState]:
+    """Build the indicator state of every symbol from its stored history."""
+    return {symbol: IndicatorState.from_history(df) for symbol, df in stock_data.items() if len(df) > 0}
+
+
+def update_indicator_state(state: Optional[IndicatorState], bars: pd.DataFrame) -> IndicatorState:
+    """Apply only the bars newer than the state's last bar."""
+    state = state or IndicatorState()
+    if state.last_date is not None:
+        bars = bars[bars.index > state.last_date]
+    for date, close, volume in zip(bars.index, bars['Close'].to_numpy(float), bars['Volume'].to_numpy(float)):
+        state.update(close, volume, date)
+    return state
@@ -0,0 +1,40 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """Process-wide counters and gauges for the market data stream.
+
+    Counters only go up (messages sent, conflated, dropped); gauges track things
+    that come and go (open sockets, running tasks), so a leak shows up as a gauge
+    that keeps growing after clients disconnect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, int] = defaultdict(int)
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def gauge_add(self, name: str, value: int):
+        with self._lock:
+            self._gauges[name] += value
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters[name]
+
+    def gauge(self, name: str) -> int:
+        with self._lock:
+            return self._gauges[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {'counters': dict(self._counters), 'gauges': dict(self._gauges)}
+
+
+metrics = Metrics()
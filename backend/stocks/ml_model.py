@@ -2,53 +2,211 @@ import os
 import json
 import time
 import logging
+import threading
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from typing import List, Dict, Union
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
+from typing import List, Dict, Optional, Union
 from joblib import dump, load as joblib_load
+from .backends import RANDOM_FOREST, ModelBackend, get_backend
+from .features import (FEATURE_COLUMNS, PricePanel, compute_features, latest_feature_matrix, training_matrix,
+                       valid_frames)
+from .fetcher import HistoryFetcher
+from .indicators import build_indicator_states, update_indicator_state
+from .store import PriceStore, price_store
+from .symbols import symbol_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Number of most recent daily bars (about one year) used for training and scoring
+HISTORY_BARS = 252
+
+# Price panel arrays saved next to the model as raw .npy files
+PANEL_FILES = {'close': 'prices_close.npy', 'volume': 'prices_volume.npy', 'start': 'prices_start.npy'}
+
+# Name of the model backend a directory was trained with; directories without it hold a random forest
+BACKEND_FILE = 'backend.json'
+
+# Process-wide cache of loaded model artifacts, keyed by (model_dir, artifact mtimes)
+_artifact_cache: Dict[tuple, Dict] = {}
+_artifact_cache_lock = threading.Lock()
+
+def load_artifacts(model_dir: str) -> Optional[Dict]:
+    """Load the saved artifacts of a model directory, once per process.
+    
+    The model and scaler are joblib-loaded with mmap_mode='r' and the price panel
+    from raw .npy files, so their numpy arrays are memory-mapped: pages are read
+    lazily and shared through the OS page cache by every worker process. Entries
+    are keyed by the directory and the artifacts' modification times, so warm loads
+    do no disk I/O beyond a stat and a re-saved model is picked up automatically.
+    
+    Returns:
+        Dict of model, scaler, backend name, symbols, indicator_states, panel and
+        the legacy stock_data pickle, or None if the directory holds no trained model
+    """
+    model_path = os.path.join(model_dir, 'stock_recommender.joblib')
+    scaler_path = os.path.join(model_dir, 'scaler.joblib')
+    try:
+        key = (os.path.abspath(model_dir), os.stat(model_path).st_mtime_ns, os.stat(scaler_path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    
+    artifacts = _artifact_cache.get(key)
+    if artifacts is not None:
+        return artifacts
+    
+    with _artifact_cache_lock:
+        artifacts = _artifact_cache.get(key)
+        if artifacts is not None:
+            return artifacts
+        
+        logger.info(f"Loading existing model and scaler from {model_dir}...")
+        artifacts = {
+            'model': joblib_load(model_path, mmap_mode='r'),
+            'scaler': joblib_load(scaler_path, mmap_mode='r'),
+            'backend': RANDOM_FOREST,
+            'symbols': None,
+            'indicator_states': {},
+            'panel': None,
+            'stock_data': None,
+            'lock': threading.Lock(),
+            'synced': False
+        }
+        backend_path = os.path.join(model_dir, BACKEND_FILE)
+        if os.path.exists(backend_path):
+            with open(backend_path, 'r') as f:
+                artifacts['backend'] = json.load(f)['backend']
+        symbols_path = os.path.join(model_dir, 'symbols.json')
+        if os.path.exists(symbols_path):
+            with open(symbols_path, 'r') as f:
+                artifacts['symbols'] = json.load(f)
+        indicator_state_path = os.path.join(model_dir, 'indicator_state.joblib')
+        if os.path.exists(indicator_state_path):
+            artifacts['indicator_states'] = joblib_load(indicator_state_path)
+        panel_paths = {name: os.path.join(model_dir, f) for name, f in PANEL_FILES.items()}
+        if artifacts['symbols'] is not None and all(os.path.exists(p) for p in panel_paths.values()):
+            arrays = {name: np.load(path, mmap_mode='r') for name, path in panel_paths.items()}
+            artifacts['panel'] = PricePanel(artifacts['symbols'], arrays['close'], arrays['volume'],
+                                            np.asarray(arrays['start']))
+        data_path = os.path.join(model_dir, 'stock_data.joblib')
+        if artifacts['symbols'] is None and os.path.exists(data_path):
+            # Models saved before the price store kept a pickled copy of their history
+            artifacts['stock_data'] = joblib_load(data_path)
+            artifacts['symbols'] = list(artifacts['stock_data'].keys())
+        
+        # Drop artifacts of older saves of the same directory
+        for stale in [k for k in _artifact_cache if k[0] == key[0]]:
+            del _artifact_cache[stale]
+        _artifact_cache[key] = artifacts
+        return artifacts
+
 class StockRecommender:
-    def __init__(self, model_dir: str = 'models/large_cap'):
+    symbols: Optional[List[str]] = None
+    panel: Optional[PricePanel] = None
+    _stock_data: Optional[Dict[str, pd.DataFrame]] = None
+    _state_lock: Optional[threading.Lock] = None
+    # (universe key, scored universe) of the last scored_universe() call
+    _scored: Optional[tuple] = None
+
+    def __init__(self, model_dir: str = 'models/large_cap', fetcher: Optional[HistoryFetcher] = None,
+                 store: Optional[PriceStore] = None, backend: Union[str, ModelBackend, None] = None):
         """Initialize the StockRecommender.
         
         Args:
             model_dir: Directory to save/load model files. Defaults to large_cap model.
                      Use 'models/mid_cap' for mid-cap stocks and 'models/small_cap' for small-cap stocks.
+            fetcher: History fetcher used by train(). Defaults to concurrent yfinance downloads.
+            store: Local price store that history is read from. Defaults to `stocks.store.price_store`.
+            backend: Model backend (a name in `stocks.backends.BACKENDS` or an instance) that train()
+                     fits. Defaults to the one the saved model was trained with, else a random forest.
         """
         self.model_dir = model_dir
+        self.fetcher = fetcher or HistoryFetcher()
+        self.store = store or price_store
         self.model_path = os.path.join(model_dir, 'stock_recommender.joblib')
         self.scaler_path = os.path.join(model_dir, 'scaler.joblib')
-        self.data_path = os.path.join(model_dir, 'stock_data.joblib')
+        self.symbols_path = os.path.join(model_dir, 'symbols.json')
+        self.backend_path = os.path.join(model_dir, BACKEND_FILE)
+        self.indicator_state_path = os.path.join(model_dir, 'indicator_state.joblib')
         
         # Create model directory if it doesn't exist
         os.makedirs(model_dir, exist_ok=True)
         
-        # Try to load existing model, scaler and data
-        if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
-            logger.info(f"Loading existing model and scaler from {model_dir}...")
-            self.model = joblib_load(self.model_path)
-            self.scaler = joblib_load(self.scaler_path)
-            if os.path.exists(self.data_path):
-                self.stock_data = joblib_load(self.data_path)
-            else:
-                self.stock_data = None
+        # Try to load existing model, scaler and data (shared with other instances in the process)
+        artifacts = load_artifacts(model_dir)
+        if artifacts is not None:
+            self.model = artifacts['model']
+            self.scaler = artifacts['scaler']
+            self.backend = get_backend(backend or artifacts['backend'])
+            self.symbols = artifacts['symbols']
+            self.indicator_states = artifacts['indicator_states']
+            self.panel = artifacts['panel']
+            self._stock_data = artifacts['stock_data']
+            self._state_lock = artifacts['lock']
             self.is_trained = True
+            if self.symbols and self.indicator_states and not artifacts['synced']:
+                # Once per load, so scoring starts from the latest bars in the price store
+                self.sync_indicator_states()
+                artifacts['synced'] = True
         else:
             logger.info(f"No existing model found in {model_dir}. Will need to train first.")
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.scaler = StandardScaler()
-            self.stock_data = None
+            self.backend = get_backend(backend)
+            self.model = self.backend.create_model()
+            self.scaler = self.backend.create_scaler()
+            self.indicator_states = {}
             self.is_trained = False
 
+    @property
+    def stock_data(self) -> Optional[Dict[str, pd.DataFrame]]:
+        """Price history per symbol, read from the price store on first access."""
+        if self._stock_data is None and self.symbols:
+            self.load_stock_data(self.symbols)
+        return self._stock_data
+
+    @stock_data.setter
+    def stock_data(self, value: Optional[Dict[str, pd.DataFrame]]):
+        self._stock_data = value
+
+    def load_stock_data(self, symbols: List[str]):
+        """Read the history of `symbols` from the price store.
+        
+        Symbols with indicator state get the same history the state has seen, so
+        the batch and incremental feature paths agree.
+        """
+        stock_data = {}
+        for symbol in symbols:
+            state = self.indicator_states.get(symbol)
+            if state is not None and state.first_date is not None:
+                df = self.store.read(symbol, start=state.first_date)
+            else:
+                df = self.store.read(symbol, tail=HISTORY_BARS)
+            if len(df) > 0:
+                stock_data[symbol] = df
+        self._stock_data = stock_data
+
+    def sync_indicator_states(self):
+        """Apply bars stored after the indicator states were saved.
+        
+        Only each symbol's Parquet footer is read unless it has newer bars, so
+        scoring always sees the latest stored bar without reloading history.
+        """
+        with self._state_lock or threading.Lock():
+            for symbol in self.symbols:
+                state = self.indicator_states.get(symbol)
+                if state is None or state.last_date is None:
+                    continue
+                seen = pd.Timestamp(state.last_date).tz_localize(None)
+                last = self.store.last_date(symbol)
+                if last is not None and last > seen:
+                    update_indicator_state(state, self.store.read(symbol, start=seen + pd.Timedelta(days=1)))
+
     def save_model(self):
-        """Save the trained model, scaler and stock data to disk."""
+        """Save the trained model, scaler, symbol list and price panel to disk.
+        
+        Artifacts are written uncompressed so they can be memory-mapped on load,
+        see `load_artifacts`. The full price history lives in the price store.
+        """
         if not self.is_trained:
             logger.warning("Cannot save untrained model")
             return
@@ -56,27 +214,26 @@ class StockRecommender:
         logger.info("Saving model, scaler and stock data...")
         dump(self.model, self.model_path)
         dump(self.scaler, self.scaler_path)
-        if self.stock_data is not None:
-            dump(self.stock_data, self.data_path)
+        with open(self.backend_path, 'w') as f:
+            json.dump({'backend': self.backend.name}, f)
+        if self._stock_data is not None:
+            panel = PricePanel.from_frames(self._stock_data)
+            with open(self.symbols_path, 'w') as f:
+                json.dump(panel.symbols, f)
+            np.save(os.path.join(self.model_dir, PANEL_FILES['close']), panel.close)
+            np.save(os.path.join(self.model_dir, PANEL_FILES['volume']), panel.volume)
+            np.save(os.path.join(self.model_dir, PANEL_FILES['start']), panel.start)
+        if self.indicator_states:
+            dump(self.indicator_states, self.indicator_state_path)
         logger.info("Model, scaler and stock data saved successfully")
 
     def fetch_nse_data(self, symbols: List[str], period: str = "1y") -> Dict[str, pd.DataFrame]:
-        """Fetch historical data for NSE stocks"""
-        data = {}
-        for symbol in symbols:
-            try:
-                # Remove .NS suffix if present
-                base_symbol = symbol.replace('.NS', '')
-                ticker = yf.Ticker(f"{base_symbol}.NS")
-                hist = ticker.history(period=period)
-                
-                if not hist.empty:
-                    logger.info(f"Successfully fetched data for {symbol}")
-                    data[symbol] = hist
-                else:
-                    logger.warning(f"No data available for {symbol}")
-            except Exception as e:
-                logger.error(f"Error fetching data for {symbol}: {str(e)}")
+        """Fetch historical data for NSE stocks.
+        
+        Only bars missing from the local price store are downloaded, concurrently
+        through `self.fetcher`; the result is read back from the store.
+        """
+        data = self.store.refresh(symbols, self.fetcher, period=period, tail=HISTORY_BARS)
         
         if not data:
             logger.error("Failed to fetch data for any symbols")
@@ -137,85 +294,96 @@ class StockRecommender:
         return df
 
     def prepare_training_data(self, stock_data: Dict[str, pd.DataFrame]) -> tuple:
-        """Prepare data for model training."""
-        all_X = []
-        all_y = []
-        
-        for symbol, df in stock_data.items():
-            try:
-                # Calculate features
-                df_processed = self.calculate_features(df)
-                
-                # Prepare features for training
-                features = [
-                    'Returns', 'Volatility', 'RSI', 'MACD', 'BB_position',
-                    'Volume_Ratio', 'Max_Drawdown', 'Sharpe_Ratio', 'Sortino_Ratio'
-                ]
-                
-                X = df_processed[features].values[:-1]  # Remove last row as it won't have a target
-                y = df_processed['Returns_Shifted'].values[:-1]
-                
-                # Add valid samples to training data
-                valid_samples = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
-                X = X[valid_samples]
-                y = y[valid_samples]
-                
-                if len(X) > 0:
-                    all_X.append(X)
-                    all_y.append(y)
-                    logger.info(f"Added {len(X)} samples from {symbol}")
-            except Exception as e:
-                logger.error(f"Error processing {symbol}: {str(e)}")
-                continue
+        """Prepare data for model training.
+
+        Features for all symbols are computed in one batched pass over a
+        (bars x symbols) panel, see `stocks.features`. Frames the panel cannot
+        hold, e.g. without a numeric 'Close' or 'Volume', are skipped.
+        """
+        panel = PricePanel.from_frames(valid_frames(stock_data))
+        features = compute_features(panel)
+        X, y, samples = training_matrix(panel, features)
+
+        for symbol, count in zip(panel.symbols, samples):
+            if count > 0:
+                logger.debug(f"Added {count} samples from {symbol}")
         
-        if not all_X:
+        if len(X) == 0:
             raise ValueError("No valid training data available")
-            
-        X = np.vstack(all_X)
-        y = np.concatenate(all_y)
         
         logger.info(f"Final training data shape: X={X.shape}, y={y.shape}")
         return X, y
 
-    def train(self, symbols: List[str], force_retrain: bool = False):
+    def train(self, symbols: List[str], force_retrain: bool = False,
+              stock_data: Optional[Dict[str, pd.DataFrame]] = None, n_jobs: Optional[int] = None):
         """Train the recommendation model.
         
         Args:
             symbols: List of stock symbols to train on
             force_retrain: Whether to force retraining even if model exists
+            stock_data: Already downloaded history per symbol; fetched when omitted
+            n_jobs: Threads fitting the model where the backend supports it; the saved model
+                predicts single-threaded
         """
         if self.is_trained and not force_retrain:
             logger.info("Model already trained. Use force_retrain=True to retrain.")
             return
             
         # Fetch data
-        self.stock_data = self.fetch_nse_data(symbols)
+        if stock_data is None:
+            stock_data = self.fetch_nse_data(symbols)
+        self.stock_data = valid_frames({symbol: stock_data[symbol] for symbol in symbols if symbol in stock_data})
+        self.symbols = list(self.stock_data.keys())
+        self.panel = None
+        self._scored = None
         
         # Prepare training data
         X, y = self.prepare_training_data(self.stock_data)
         
+        # Fresh, unfitted estimators of the backend; a loaded model is memory-mapped and read-only
+        self.model = self.backend.create_model()
+        self.scaler = self.backend.create_scaler()
+        
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
         
         # Train model
-        self.model.fit(X_scaled, y)
+        self.backend.fit(self.model, X_scaled, y, n_jobs=n_jobs)
         self.is_trained = True
         
+        # Seed the incremental indicators so later bars can be applied in O(1)
+        self.indicator_states = build_indicator_states(self.stock_data)
+        
         # Save the trained model and data
         self.save_model()
 
+    def latest_features(self) -> tuple:
+        """Latest feature row and price of every symbol in `stock_data`.
+        
+        Uses the incremental indicator states when they cover the universe and
+        falls back to one batched panel pass otherwise.
+        
+        Returns:
+            Tuple of (symbols, (symbols x features) matrix, current prices)
+        """
+        symbols = self.symbols or list(self.stock_data.keys())
+        states = self.indicator_states
+        if symbols and all(symbol in states and states[symbol].features for symbol in symbols):
+            X = np.vstack([states[symbol].feature_vector() for symbol in symbols])
+            prices = np.array([states[symbol].last_close for symbol in symbols])
+            return symbols, X, prices
+        
+        panel = self.panel if self.panel is not None else PricePanel.from_frames(self.stock_data)
+        features = compute_features(panel)
+        return panel.symbols, latest_feature_matrix(features), panel.close[-1].copy()
+
     def get_stock_metrics(self, symbol: str, data: pd.DataFrame) -> Dict:
         """Calculate current metrics for a stock."""
         try:
             df = self.calculate_features(data)
             current_price = df['Close'].iloc[-1]
             
-            features = [
-                'Returns', 'Volatility', 'RSI', 'MACD', 'BB_position',
-                'Volume_Ratio', 'Max_Drawdown', 'Sharpe_Ratio', 'Sortino_Ratio'
-            ]
-            
-            X = df[features].iloc[-1].values.reshape(1, -1)
+            X = df[FEATURE_COLUMNS].iloc[-1].values.reshape(1, -1)
             X_scaled = self.scaler.transform(X)
             expected_return = self.model.predict(X_scaled)[0]
             
@@ -294,6 +462,41 @@ class StockRecommender:
             logger.error(f"Error calculating risk-adjusted score: {str(e)}")
             return -float('inf')
 
+    def calculate_risk_adjusted_scores(
+        self,
+        X: np.ndarray,
+        expected_returns: np.ndarray,
+        rts_score: float
+    ) -> np.ndarray:
+        """Vectorized `calculate_risk_adjusted_score` over a (symbols x features) matrix."""
+        risk_tolerance = rts_score / 100
+        column = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+        volatility = X[:, column['Volatility']]
+        sharpe = X[:, column['Sharpe_Ratio']]
+        sortino = X[:, column['Sortino_Ratio']]
+        max_drawdown = np.abs(X[:, column['Max_Drawdown']])
+        rsi = X[:, column['RSI']]
+        macd = X[:, column['MACD']]
+        bb_pos = X[:, column['BB_position']]
+        
+        return_score = expected_returns * 2
+        risk_score = (
+            volatility * (1 - risk_tolerance) +
+            max_drawdown * 0.5 +
+            (1 - (sharpe + 2) / 4) * 0.3 +
+            (1 - (sortino + 2) / 4) * 0.2
+        )
+        tech_score = (
+            ((rsi >= 50) & (rsi <= 70)) * 0.2 +
+            (macd > 0) * 0.1 +
+            ((bb_pos >= 0.3) & (bb_pos <= 0.7)) * 0.1
+        )
+        return (
+            return_score * (0.5 + 0.2 * risk_tolerance) +
+            -risk_score * (0.4 - 0.1 * risk_tolerance) +
+            tech_score * 0.1
+        )
+
     def calculate_investment_metrics(
         self,
         current_price: float,
@@ -320,12 +523,53 @@ class StockRecommender:
             logger.error(f"Error calculating investment metrics: {str(e)}")
             return None
 
+    def _universe_key(self) -> Optional[tuple]:
+        """Changes whenever the latest features can change; None when they cannot be tracked."""
+        states = self.indicator_states
+        if self.symbols and all(symbol in states for symbol in self.symbols):
+            return (id(self.model), sum(states[symbol].n_bars for symbol in self.symbols))
+        if self.panel is not None and self._stock_data is None:
+            return (id(self.model), id(self.panel))
+        return None
+
+    def scored_universe(self) -> tuple:
+        """Latest features, prices and predicted returns of every scorable symbol.
+        
+        The prediction does not depend on the request, so it is computed with a
+        single transform and predict and reused until new bars change the features.
+        
+        Returns:
+            Tuple of (symbols, features, current prices, expected returns)
+        """
+        if not self.is_trained or not (self.symbols or self.stock_data):
+            raise ValueError("No stock data available. Call train() method.")
+        
+        key = self._universe_key()
+        cached = self._scored
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+        
+        symbols, X, current_prices = self.latest_features()
+        
+        # Symbols whose features cannot be computed are skipped, as before
+        valid = np.isfinite(X).all(axis=1) & np.isfinite(current_prices) & (current_prices > 0)
+        symbols = [s for s, ok in zip(symbols, valid) if ok]
+        X, current_prices = X[valid], current_prices[valid]
+        
+        # Score the whole universe with a single transform and a single predict
+        expected_returns = self.model.predict(self.scaler.transform(X)) if symbols else np.empty(0)
+        scored = (symbols, X, current_prices, expected_returns)
+        if key is not None:
+            self._scored = (key, scored)
+        return scored
+
     def get_recommendations(
         self,
         rts_score: float = 50,
         target_amount: float = 1000000,
         monthly_investment: float = 50000,
-        investment_duration: int = 60
+        investment_duration: int = 60,
+        top_n: int = 5
     ) -> List[Dict]:
         """Get stock recommendations based on user parameters.
         
@@ -334,75 +578,94 @@ class StockRecommender:
             target_amount: Target investment amount
             monthly_investment: Monthly investment amount
             investment_duration: Investment duration in months
+            top_n: Number of recommendations, best risk-adjusted score first
             
         Returns:
             List of recommended stocks with their metrics
         """
-        if not self.is_trained or self.stock_data is None:
-            raise ValueError("No stock data available. Call train() method.")
-            
+        symbols, X, current_prices, expected_returns = self.scored_universe()
+        if not symbols:
+            return []
+        
+        scores = self.calculate_risk_adjusted_scores(X, expected_returns, rts_score)
+        
+        # Investment-specific metrics, see calculate_investment_metrics
+        shares_possible = monthly_investment / current_prices
+        projected_values = monthly_investment * shares_possible * (1 + expected_returns) ** investment_duration
+        
+        # Top N by risk-adjusted score
+        order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind='stable')[:top_n]
+        column = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
         recommendations = []
+        for i in order:
+            recommendations.append({
+                'symbol': symbols[i],
+                'current_price': float(current_prices[i]),
+                'expected_return': float(expected_returns[i]),
+                'risk_metrics': {
+                    'volatility': float(X[i, column['Volatility']]),
+                    'sharpe_ratio': float(X[i, column['Sharpe_Ratio']]),
+                    'sortino_ratio': float(X[i, column['Sortino_Ratio']]),
+                    'max_drawdown': float(X[i, column['Max_Drawdown']])
+                },
+                'technical_indicators': {
+                    'rsi': float(X[i, column['RSI']]),
+                    'macd': float(X[i, column['MACD']]),
+                    'bb_position': float(X[i, column['BB_position']]),
+                    'volume_ratio': float(X[i, column['Volume_Ratio']])
+                },
+                'risk_adjusted_score': float(scores[i]),
+                'shares_possible': float(shares_possible[i]),
+                'projected_value': float(projected_values[i])
+            })
         
-        for symbol, data in self.stock_data.items():
-            try:
-                # Get current metrics
-                metrics = self.get_stock_metrics(symbol, data)
-                if metrics is None:
-                    continue
-                    
-                # Calculate risk-adjusted score
-                risk_adjusted_score = self.calculate_risk_adjusted_score(metrics, rts_score)
-                metrics['risk_adjusted_score'] = risk_adjusted_score
-                
-                # Calculate investment-specific metrics
-                investment_metrics = self.calculate_investment_metrics(
-                    metrics['current_price'],
-                    metrics['expected_return'],
-                    monthly_investment,
-                    investment_duration
-                )
-                
-                if investment_metrics:
-                    metrics.update(investment_metrics)
-                    recommendations.append(metrics)
-                    
-            except Exception as e:
-                logger.error(f"Error processing recommendations for {symbol}: {str(e)}")
-                continue
+        return recommendations
+
+    def return_history(self, symbols: List[str], window: int = 252) -> np.ndarray:
+        """Daily close-to-close returns of `symbols` over their last `window` bars.
         
-        # Sort by risk-adjusted score
-        recommendations.sort(key=lambda x: x['risk_adjusted_score'], reverse=True)
+        Args:
+            symbols: Symbols of this recommender's universe
+            window: Number of returns per symbol
+            
+        Returns:
+            (window x symbols) array, NaN where a symbol's history is shorter or unknown
+        """
+        returns = np.full((window, len(symbols)), np.nan)
+        if self.panel is not None:
+            column = {symbol: j for j, symbol in enumerate(self.panel.symbols)}
+            found = [i for i, symbol in enumerate(symbols) if symbol in column]
+            close = self.panel.close[-(window + 1):, [column[symbols[i]] for i in found]]
+            if len(close) > 1:
+                returns[-(len(close) - 1):, found] = close[1:] / close[:-1] - 1
+            return returns
         
-        # Return top 5 recommendations
-        return recommendations[:5]
+        stock_data = self.stock_data or {}
+        for i, symbol in enumerate(symbols):
+            df = stock_data.get(symbol)
+            if df is None or len(df) < 2:
+                continue
+            close = df['Close'].to_numpy(dtype=np.float64)[-(window + 1):]
+            returns[-(len(close) - 1):, i] = close[1:] / close[:-1] - 1
+        return returns
 
     @staticmethod
     def get_market_cap_category(symbol: str) -> str:
         """Get the market cap category for a stock symbol."""
-        try:
-            cache_dir = 'cache'
-            os.makedirs(cache_dir, exist_ok=True)
-            cache_file = os.path.join(cache_dir, 'nse_stocks.json')
-            
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r') as f:
-                    stocks = json.load(f)['stocks']
-                    
-                for category, symbols in stocks.items():
-                    if symbol in symbols:
-                        return category
-            
-            return 'unknown'
-            
-        except Exception as e:
-            logger.error(f"Error getting market cap category: {str(e)}")
-            return 'unknown'
+        # O(1) lookup in the process-wide index, reloaded only when the universe file changes
+        return symbol_index.category(symbol)
 
     @classmethod
     def get_recommender_for_symbol(cls, symbol: str) -> 'StockRecommender':
         """Get the appropriate recommender instance for a stock symbol."""
+        from .registry import LEGACY_VERSION, registry
+
         category = cls.get_market_cap_category(symbol)
-        return cls(model_dir=f'models/{category}')
+        # The category's loaded model is shared; only an untrained category gets a new instance
+        recommender = registry.get_recommender(category)
+        if recommender is None:
+            recommender = cls(model_dir=registry.version_dir(category, LEGACY_VERSION))
+        return recommender
 
     @staticmethod
     def get_all_recommendations(
@@ -422,37 +685,23 @@ class StockRecommender:
         Returns:
             List of top 5 stock recommendations across all categories
         """
-        all_recommendations = []
-        categories = ['large_cap', 'mid_cap', 'small_cap']
-        
+        from .pool import get_pool
+
         try:
-            for category in categories:
-                recommender = StockRecommender(model_dir=f'stocks/models/{category}')
-                if recommender.is_trained:
-                    try:
-                        category_recommendations = recommender.get_recommendations(
-                            rts_score=rts_score,
-                            target_amount=target_amount,
-                            monthly_investment=monthly_investment,
-                            investment_duration=investment_duration
-                        )
-                        # Add market cap category to each recommendation
-                        for rec in category_recommendations:
-                            rec['market_cap_category'] = category
-                        all_recommendations.extend(category_recommendations)
-                    except Exception as e:
-                        logger.error(f"Error getting recommendations for {category}: {str(e)}")
-                else:
-                    logger.warning(f"No trained model found for {category}")
+            # Categories are loaded once per process and scored concurrently
+            recommendations, timings = get_pool().recommend(
+                rts_score=rts_score,
+                target_amount=target_amount,
+                monthly_investment=monthly_investment,
+                investment_duration=investment_duration
+            )
+            logger.info("Scored categories in " + ", ".join(f"{c}: {t * 1000:.1f} ms" for c, t in timings.items()))
             
-            if not all_recommendations:
+            if not recommendations:
                 raise ValueError("No recommendations available. Models need to be trained first.")
             
-            # Sort all recommendations by risk-adjusted score
-            all_recommendations.sort(key=lambda x: x['risk_adjusted_score'], reverse=True)
-            
-            # Return top 5 recommendations across all categories
-            return all_recommendations[:5]
+            # Top 5 recommendations across all categories
+            return recommendations
             
         except Exception as e:
             logger.error(f"Error getting recommendations across categories: {str(e)}")
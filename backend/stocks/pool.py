@@ -0,0 +1,280 @@
+import math
+import time
+import heapq
+import logging
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import portfolio, projection
+from .registry import CATEGORIES, ModelRegistry, registry
+from .risk_matrix import RiskMatrixCache, risk_matrix_cache
+from .store import PriceStore, price_store
+
+logger = logging.getLogger(__name__)
+
+# Best-scored stocks across categories that the portfolio stage allocates between
+PORTFOLIO_CANDIDATES = 50
+
+
+def _score_key(recommendation: Dict) -> float:
+    score = recommendation['risk_adjusted_score']
+    return -math.inf if math.isnan(score) else score
+
+
+class RecommenderPool:
+    """Long-lived recommenders for every market cap category.
+
+    Each category's model is loaded once through the registry and reloaded only
+    when a newer version is published. Categories are scored concurrently and
+    their already ranked lists are merged with a heap, so only the best
+    candidates are ever compared across categories. A portfolio stage then
+    allocates between the candidates (see `stocks.portfolio`) and keeps the
+    largest holdings, each with its 'weight' in percent; `project` simulates
+    the plan against the user's target (see `stocks.projection`).
+
+    Args:
+        registry: Registry the models are served from
+        categories: Categories to score, in tie-break order
+        cache: Cache of the candidates' covariance
+        store: Price store the projection reads its longer history from
+    """
+
+    def __init__(self, registry: ModelRegistry = registry, categories: List[str] = CATEGORIES,
+                 cache: RiskMatrixCache = risk_matrix_cache, store: PriceStore = price_store):
+        self.registry = registry
+        self.categories = list(categories)
+        self.cache = cache
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=len(self.categories), thread_name_prefix='recommender')
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            stage: {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'last_seconds': 0.0}
+            for stage in self.categories + ['portfolio', 'projection']
+        }
+
+    def warm(self) -> Dict[str, bool]:
+        """Load and score every category's latest model ahead of the first request.
+
+        Returns:
+            Dict of category to whether a trained model is available
+        """
+        ready = {}
+        for category in self.categories:
+            recommender = self.registry.get_recommender(category)
+            if recommender is not None:
+                # Predict the universe now so the first request only ranks
+                recommender.scored_universe()
+            ready[category] = recommender is not None
+        return ready
+
+    def _record(self, stage: str, elapsed: float):
+        with self._stats_lock:
+            stats = self._stats[stage]
+            stats['calls'] += 1
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            stats['last_seconds'] = elapsed
+
+    def _score_category(self, category: str, rts_score: float, target_amount: float,
+                        monthly_investment: float, investment_duration: int,
+                        top_n: int = 5) -> Tuple[List[Dict], float]:
+        start = time.perf_counter()
+        recommendations = []
+        recommender = self.registry.get_recommender(category)
+        if recommender is not None and recommender.is_trained:
+            try:
+                recommendations = recommender.get_recommendations(
+                    rts_score=rts_score,
+                    target_amount=target_amount,
+                    monthly_investment=monthly_investment,
+                    investment_duration=investment_duration,
+                    top_n=top_n
+                )
+                # Add market cap category to each recommendation
+                for rec in recommendations:
+                    rec['market_cap_category'] = category
+            except Exception as e:
+                logger.error(f"Error getting recommendations for {category}: {str(e)}")
+        else:
+            logger.warning(f"No trained model found for {category}")
+        elapsed = time.perf_counter() - start
+        self._record(category, elapsed)
+        return recommendations, elapsed
+
+    def rank(self, rts_score: float, target_amount: float, monthly_investment: float,
+             investment_duration: int, top_n: int = 5) -> Tuple[List[Dict], Dict[str, float]]:
+        """Score all categories concurrently and merge their best recommendations.
+
+        Returns:
+            Tuple of (best `top_n` distinct symbols across categories, seconds spent per category)
+        """
+        futures = {
+            category: self._executor.submit(self._score_category, category, rts_score, target_amount,
+                                            monthly_investment, investment_duration, top_n)
+            for category in self.categories
+        }
+        ranked, timings = [], {}
+        for category, future in futures.items():
+            recommendations, timings[category] = future.result()
+            # get_recommendations returns each category already ranked best first
+            ranked.append(recommendations)
+
+        merged, seen = [], set()
+        for recommendation in heapq.merge(*ranked, key=_score_key, reverse=True):
+            # A symbol listed in two categories is a single candidate
+            if recommendation['symbol'] not in seen:
+                seen.add(recommendation['symbol'])
+                merged.append(recommendation)
+                if len(merged) == top_n:
+                    break
+        return merged, timings
+
+    def recommend(self, rts_score: float, target_amount: float, monthly_investment: float,
+                  investment_duration: int, top_k: int = 5, candidates: int = PORTFOLIO_CANDIDATES,
+                  method: str = portfolio.MEAN_VARIANCE) -> Tuple[List[Dict], Dict[str, float]]:
+        """Rank all categories, then allocate a portfolio between the best candidates.
+
+        Args:
+            top_k: Most holdings to recommend
+            candidates: Best-scored stocks the portfolio is allocated between
+            method: `portfolio.MEAN_VARIANCE` (rts_score sets the risk aversion) or `portfolio.RISK_PARITY`
+
+        Returns:
+            Tuple of (up to `top_k` recommendations, largest weight first, seconds spent per category)
+        """
+        merged, timings = self.rank(rts_score, target_amount, monthly_investment, investment_duration,
+                                    top_n=max(top_k, candidates))
+
+        start = time.perf_counter()
+        try:
+            recommendations = self.allocate(merged, rts_score, top_k, method)
+        except Exception as e:
+            logger.error(f"Portfolio allocation failed, falling back to equal weights: {str(e)}")
+            recommendations = merged[:top_k]
+            for rec, weight in zip(recommendations, portfolio.weight_percentages(np.ones(len(recommendations)))):
+                rec['weight'] = weight
+        self._record('portfolio', time.perf_counter() - start)
+        return recommendations, timings
+
+    def return_history(self, recommendations: List[Dict], window: int = portfolio.COVARIANCE_WINDOW) -> np.ndarray:
+        """(window x recommendations) daily returns from each category's stored price history."""
+        returns = np.full((window, len(recommendations)), np.nan)
+        by_category: Dict[str, List[int]] = {}
+        for i, rec in enumerate(recommendations):
+            by_category.setdefault(rec.get('market_cap_category'), []).append(i)
+        for category, columns in by_category.items():
+            recommender = self.registry.get_recommender(category) if category in self.categories else None
+            if recommender is not None:
+                returns[:, columns] = recommender.return_history([recommendations[i]['symbol'] for i in columns], window)
+        return returns
+
+    def stored_return_history(self, recommendations: List[Dict], window: int) -> np.ndarray:
+        """(window x recommendations) daily returns from the price store, aligned by date.
+
+        The store keeps every bar refreshes have appended, so it reaches further
+        back than the `ml_model.HISTORY_BARS` a model keeps. Falls back to the models'
+        history (see `return_history`) when the store has none of the symbols.
+        """
+        closes = {}
+        for i, rec in enumerate(recommendations):
+            close = self.store.read(rec['symbol'], tail=window + 1)['Close']
+            if len(close) > 1:
+                closes[i] = close
+        if not closes:
+            return self.return_history(recommendations, window)
+        frame = pd.DataFrame(closes).sort_index()
+        daily = frame.pct_change(fill_method=None).iloc[1:].tail(window)
+        returns = np.full((window, len(recommendations)), np.nan)
+        returns[window - len(daily):, list(daily.columns)] = daily.to_numpy()
+        return returns
+
+    def candidate_covariance(self, candidates: List[Dict]) -> np.ndarray:
+        """Monthly covariance of the candidates' returns (see `portfolio.return_covariance`).
+
+        The returns come from the loaded models, so the covariance is cached per
+        candidate list and model versions until a category publishes a new one.
+        """
+        categories = sorted({rec.get('market_cap_category') for rec in candidates} & set(self.categories))
+        key = ('portfolio', tuple((rec.get('market_cap_category'), rec['symbol']) for rec in candidates),
+               tuple((category, self.registry.latest_version(category)) for category in categories))
+
+        def compute():
+            covariance = portfolio.return_covariance(self.return_history(candidates))
+            covariance.setflags(write=False)
+            return covariance
+
+        return self.cache.get(key, compute)
+
+    def allocate(self, candidates: List[Dict], rts_score: float, top_k: int = 5,
+                 method: str = portfolio.MEAN_VARIANCE) -> List[Dict]:
+        """Allocate between the candidates, keep the `top_k` largest holdings and re-solve among them.
+
+        Returns:
+            The held candidates, largest weight first, each with 'weight' in percent (summing to 100)
+        """
+        if not candidates:
+            return []
+        expected_returns = np.array([rec['expected_return'] for rec in candidates], dtype=np.float64)
+        covariance = self.candidate_covariance(candidates)
+        weights = portfolio.allocate(expected_returns, None, rts_score, method, covariance=covariance)
+
+        # The re-solve gives weights that are optimal for what is actually held
+        held = [i for i in np.argsort(-weights, kind='stable')[:top_k] if weights[i] > 0] or [int(np.argmax(weights))]
+        held_covariance = covariance[np.ix_(held, held)]
+        weights = portfolio.allocate(expected_returns[held], None, rts_score, method,
+                                     max_weight=max(portfolio.MAX_WEIGHT, 1.0 / len(held)),
+                                     covariance=held_covariance)
+
+        recommendations = []
+        for i, weight in sorted(zip(held, portfolio.weight_percentages(weights)), key=lambda item: -item[1]):
+            if weight > 0:
+                recommendations.append(dict(candidates[i], weight=weight))
+        return recommendations
+
+    def project(self, recommendations: List[Dict], monthly_investment: float, investment_duration: int,
+                target_amount: float, paths: int = projection.DEFAULT_PATHS, method: str = projection.BLOCK,
+                seed: Optional[int] = None) -> Optional[projection.GoalProjection]:
+        """Monte Carlo projection of investing monthly in the recommended portfolio at its weights.
+
+        Months are resampled from up to `projection.HISTORY_WINDOW` bars of stored history.
+
+        Returns:
+            GoalProjection, or None without recommendations or return history
+        """
+        weights = np.array([float(rec.get('weight', 0)) for rec in recommendations], dtype=np.float64)
+        if not len(weights) or weights.sum() <= 0:
+            return None
+        start = time.perf_counter()
+        try:
+            history = self.stored_return_history(recommendations, projection.HISTORY_WINDOW)
+            result = projection.simulate_sip(history, weights, monthly_investment, investment_duration, target_amount,
+                                             paths=paths, method=method, seed=seed)
+        except ValueError as e:
+            logger.warning(f"Goal projection skipped: {str(e)}")
+            return None
+        self._record('projection', time.perf_counter() - start)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-category scoring, portfolio allocation and projection calls, total, max and last latency in seconds."""
+        with self._stats_lock:
+            return {category: dict(stats) for category, stats in self._stats.items()}
+
+
+_pool: Optional[RecommenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> RecommenderPool:
+    """Return the process-wide recommender pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RecommenderPool()
+    return _pool
@@ -0,0 +1,241 @@
+import numpy as np
+from typing import List, Optional
+
+from .risk_matrix import covariance_matrix
+
+# Models predict next-day returns and the covariance comes from daily bars; both are scaled to a month
+TRADING_DAYS_PER_MONTH = 21
+
+# Daily bars of history the covariance is estimated from
+COVARIANCE_WINDOW = 252
+
+# Largest share of the portfolio a single stock may take
+MAX_WEIGHT = 0.35
+
+# Risk aversion at rts_score 0 and 100, interpolated on a log scale in between
+RISK_AVERSION_RANGE = (100.0, 1.0)
+
+MEAN_VARIANCE = 'mean_variance'
+RISK_PARITY = 'risk_parity'
+METHODS = (MEAN_VARIANCE, RISK_PARITY)
+
+
+def risk_aversion(rts_score: float) -> float:
+    """Mean-variance risk aversion of a risk tolerance score (0-100): cautious users penalise variance more."""
+    high, low = RISK_AVERSION_RANGE
+    fraction = min(max(float(rts_score), 0.0), 100.0) / 100
+    return float(high * (low / high) ** fraction)
+
+
+def project_capped_simplex(v: np.ndarray, cap: float = 1.0) -> np.ndarray:
+    """Euclidean projection onto {w : sum(w) = 1, 0 <= w <= cap}.
+
+    Sort-based simplex projection; coordinates that end up above the cap are
+    fixed at it and the rest are projected again onto the remaining budget.
+    """
+    n = len(v)
+    cap = max(cap, 1.0 / n)
+    w = np.zeros(n)
+    free = np.ones(n, dtype=bool)
+    budget = 1.0
+    while True:
+        u = v[free]
+        s = np.sort(u)[::-1]
+        css = np.cumsum(s) - budget
+        rho = np.nonzero(s * np.arange(1, len(s) + 1) > css)[0][-1]
+        x = np.maximum(u - css[rho] / (rho + 1), 0.0)
+        over = x > cap
+        if not over.any():
+            w[free] = x
+            return w
+        capped = np.flatnonzero(free)[over]
+        w[capped] = cap
+        free[capped] = False
+        budget = 1.0 - cap * (~free).sum()
+        if not free.any() or budget <= 0:
+            return w
+
+
+def _largest_eigenvalue(matrix: np.ndarray, iterations: int = 30) -> float:
+    x = np.full(len(matrix), 1 / np.sqrt(len(matrix)))
+    value = 0.0
+    for _ in range(iterations):
+        y = matrix @ x
+        value = float(np.linalg.norm(y))
+        if value == 0:
+            return 0.0
+        x = y / value
+    return value
+
+
+def _solve_on_support(mu: np.ndarray, covariance: np.ndarray, risk_aversion: float, w: np.ndarray,
+                      cap: float, tol: float = 1e-9, max_steps: int = 25) -> Optional[np.ndarray]:
+    """Exact optimum by an active-set search started from the support of `w`.
+
+    Holds zero and capped weights fixed and solves the KKT equations of the free
+    ones. Free weights that leave [0, cap] are moved to the bound they crossed;
+    a fixed weight whose gradient says it should move is freed. Returns None if
+    the search does not settle within `max_steps`.
+    """
+    n = len(w)
+    capped = w >= cap - 1e-9
+    free = (w > 1e-9) & ~capped
+    for _ in range(max_steps):
+        k = int(free.sum())
+        if k == 0:
+            return None
+        free_index = np.flatnonzero(free)
+        system = np.empty((k + 1, k + 1))
+        system[:k, :k] = risk_aversion * covariance[np.ix_(free_index, free_index)]
+        system[:k, k] = 1.0
+        system[k, :k] = 1.0
+        system[k, k] = 0.0
+        rhs = np.empty(k + 1)
+        rhs[:k] = mu[free] - risk_aversion * cap * covariance[np.ix_(free_index, np.flatnonzero(capped))].sum(axis=1)
+        rhs[k] = 1.0 - cap * capped.sum()
+        try:
+            solution = np.linalg.solve(system, rhs)
+        except np.linalg.LinAlgError:
+            return None
+        x = solution[:k]
+        below, above = x < -tol, x > cap + tol
+        if below.any() or above.any():
+            free[free_index[below | above]] = False
+            capped[free_index[above]] = True
+            continue
+
+        candidate = np.zeros(n)
+        candidate[capped] = cap
+        candidate[free] = x
+        # Gradient of the minimised objective: equal on free weights, not lower on zeros, not higher on caps
+        gradient = risk_aversion * (covariance @ candidate) - mu
+        level = -solution[k]
+        violation = np.zeros(n)
+        zero = ~free & ~capped
+        violation[zero] = np.maximum(level - gradient[zero], 0)
+        violation[capped] = np.maximum(gradient[capped] - level, 0)
+        worst = int(np.argmax(violation))
+        if violation[worst] <= tol:
+            return np.clip(candidate, 0.0, cap)
+        free[worst] = True
+        capped[worst] = False
+    return None
+
+
+def mean_variance_weights(expected_returns: np.ndarray, covariance: np.ndarray, risk_aversion: float,
+                          max_weight: float = MAX_WEIGHT, tol: float = 1e-8, max_iter: int = 2000,
+                          polish_every: int = 5) -> np.ndarray:
+    """Long-only weights maximising mu'w - risk_aversion / 2 * w'Sw with weights summing to 1.
+
+    Accelerated projected gradient (FISTA with adaptive restart), one
+    matrix-vector product and one projection per iteration, finds which weights
+    are zero, capped or free; every `polish_every` iterations the KKT system on
+    that support is solved directly, which ends the search as soon as the
+    support is right.
+    """
+    mu = np.asarray(expected_returns, dtype=np.float64)
+    n = len(mu)
+    if n == 0:
+        return np.empty(0)
+    cap = max(max_weight, 1.0 / n)
+    step = 1.0 / max(risk_aversion * _largest_eigenvalue(covariance), 1e-12)
+    # Start from the optimum that ignores covariances between candidates
+    w = project_capped_simplex(mu / (risk_aversion * np.maximum(np.diag(covariance), 1e-12)), cap)
+    y, t = w, 1.0
+    for iteration in range(1, max_iter + 1):
+        gradient = risk_aversion * (covariance @ y) - mu
+        w_next = project_capped_simplex(y - step * gradient, cap)
+        if np.abs(w_next - w).max() < tol:
+            return w_next
+        if gradient @ (w_next - w) > 0:
+            # Objective went up: restart the momentum
+            y, t = w_next, 1.0
+        else:
+            t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            y = w_next + ((t - 1) / t_next) * (w_next - w)
+            t = t_next
+        w = w_next
+        if polish_every and iteration % polish_every == 0:
+            exact = _solve_on_support(mu, covariance, risk_aversion, w, cap)
+            if exact is not None:
+                return exact
+    return w
+
+
+def risk_parity_weights(covariance: np.ndarray, tol: float = 1e-10, max_iter: int = 50) -> np.ndarray:
+    """Long-only weights with equal risk contributions w_i (Sw)_i, summing to 1.
+
+    Newton's method on the convex problem min x'Sx / 2 - sum(log x) / n, whose
+    solution has equal risk contributions once normalised; steps are shortened
+    to keep x positive.
+    """
+    n = len(covariance)
+    if n == 0:
+        return np.empty(0)
+    budget = 1.0 / n
+    x = 1 / np.sqrt(np.diag(covariance))
+    x /= np.sqrt(x @ covariance @ x)
+    for _ in range(max_iter):
+        gradient = covariance @ x - budget / x
+        if np.abs(gradient).max() < tol:
+            break
+        hessian = covariance + np.diag(budget / (x * x))
+        direction = np.linalg.solve(hessian, -gradient)
+        shrinking = direction < 0
+        step = min(1.0, 0.99 * float(np.min(-x[shrinking] / direction[shrinking]))) if shrinking.any() else 1.0
+        x = x + step * direction
+    return x / x.sum()
+
+
+def return_covariance(returns: np.ndarray) -> np.ndarray:
+    """Monthly covariance of (bars x assets) daily returns, Ledoit-Wolf shrunk so it stays invertible."""
+    covariance, _ = covariance_matrix(returns, shrinkage='ledoit-wolf')
+    covariance = np.nan_to_num(covariance) * TRADING_DAYS_PER_MONTH
+    # Assets without any overlapping history get the average variance and no covariance
+    diagonal = np.diag(covariance).copy()
+    missing = ~(diagonal > 0)
+    if missing.any():
+        covariance[missing, :] = 0
+        covariance[:, missing] = 0
+        diagonal[missing] = diagonal[~missing].mean() if (~missing).any() else 1.0
+        covariance[np.diag_indices(len(covariance))] = diagonal
+    return covariance
+
+
+def allocate(expected_returns: np.ndarray, returns: np.ndarray, rts_score: float, method: str = MEAN_VARIANCE,
+             max_weight: float = MAX_WEIGHT, covariance: Optional[np.ndarray] = None) -> np.ndarray:
+    """Portfolio weights (summing to 1) of the candidates.
+
+    Args:
+        expected_returns: Expected next-day return of each candidate, as the models predict it;
+            scaled to a month like the covariance
+        returns: (bars x candidates) daily returns, NaN before a candidate's history starts
+        rts_score: Risk tolerance score (0-100), the risk aversion of mean-variance
+        method: `MEAN_VARIANCE` or `RISK_PARITY`
+        max_weight: Cap per candidate for mean-variance
+        covariance: Precomputed monthly covariance, instead of estimating it from `returns`
+
+    Returns:
+        Weight of each candidate
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown allocation method: {method}")
+    if covariance is None:
+        covariance = return_covariance(returns)
+    if method == RISK_PARITY:
+        return risk_parity_weights(covariance)
+    monthly_returns = np.asarray(expected_returns, dtype=np.float64) * TRADING_DAYS_PER_MONTH
+    return mean_variance_weights(monthly_returns, covariance, risk_aversion(rts_score), max_weight)
+
+
+def weight_percentages(weights: np.ndarray) -> List[float]:
+    """Weights as percentages with two decimals (Recommendation.weight) that add up to exactly 100."""
+    weights = np.clip(np.asarray(weights, dtype=np.float64), 0, None)
+    if len(weights) == 0 or weights.sum() <= 0:
+        return [0.0] * len(weights)
+    cents = np.floor(weights / weights.sum() * 10000).astype(np.int64)
+    # Hand the rounding remainder to the largest fractional parts
+    remainder = 10000 - int(cents.sum())
+    fractions = weights / weights.sum() * 10000 - cents
+    cents[np.argsort(-fractions, kind='stable')[:remainder]] += 1
+    return [int(c) / 100 for c in cents]
@@ -0,0 +1,179 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+# Daily bars compounded into one simulated month
+TRADING_DAYS_PER_MONTH = 21
+
+# Daily bars of price store history monthly returns are drawn from. A fresh store holds the year
+# training downloads and grows with every refresh, so the full window is reached after three years
+HISTORY_WINDOW = 756
+
+# Simulated paths per projection
+DEFAULT_PATHS = 10000
+
+# Percentiles reported for the final value and for every month
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Consecutive months drawn together by the block bootstrap
+BLOCK_MONTHS = 6
+
+HISTORICAL = 'historical'
+BLOCK = 'block'
+METHODS = (HISTORICAL, BLOCK)
+
+
+@dataclass
+class GoalProjection:
+    """Monte Carlo projection of a monthly investment plan (SIP) against a target amount.
+
+    Attributes:
+        target_amount: Amount the plan should reach
+        probability: Share of paths whose final value reaches `target_amount`
+        invested: Total of the monthly contributions
+        expected_value: Mean final value
+        percentiles: Percentile of the final value, by percentile
+        bands: (months x percentiles) portfolio value percentiles at the end of every month
+        paths: Number of simulated paths
+        months: Investment duration in months
+        method: `HISTORICAL` or `BLOCK`
+        seed: Seed of the random generator, None if unseeded
+    """
+    target_amount: float
+    probability: float
+    invested: float
+    expected_value: float
+    percentiles: Dict[int, float]
+    bands: np.ndarray
+    paths: int
+    months: int
+    method: str
+    seed: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'target_amount': self.target_amount,
+            'probability': self.probability,
+            'invested': self.invested,
+            'expected_value': self.expected_value,
+            'percentiles': {str(p): value for p, value in self.percentiles.items()},
+            'bands': {str(p): self.bands[:, j].tolist() for j, p in enumerate(self.percentiles)},
+            'paths': self.paths,
+            'months': self.months,
+            'method': self.method,
+            'seed': self.seed,
+        }
+
+
+def monthly_returns(daily_returns: np.ndarray, days_per_month: int = TRADING_DAYS_PER_MONTH) -> np.ndarray:
+    """Overlapping monthly returns of (days x assets) daily returns, compounded over `days_per_month` bars.
+
+    A day an asset did not trade (NaN) takes the mean return of the other assets
+    that day, so short histories do not drop the common months.
+
+    Returns:
+        (windows x assets) monthly returns, window i starting at day i
+    """
+    daily = np.asarray(daily_returns, dtype=np.float64)
+    if daily.ndim == 1:
+        daily = daily[:, None]
+    daily = daily[~np.isnan(daily).all(axis=1)]
+    if len(daily) < days_per_month:
+        raise ValueError(f"Need at least {days_per_month} days of returns, got {len(daily)}")
+    missing = np.isnan(daily)
+    if missing.any():
+        fill = np.nanmean(daily, axis=1)
+        daily = np.where(missing, fill[:, None], daily)
+    growth = np.concatenate([np.zeros((1, daily.shape[1])), np.cumsum(np.log1p(daily), axis=0)])
+    return np.expm1(growth[days_per_month:] - growth[:-days_per_month])
+
+
+def sample_months(n_windows: int, paths: int, months: int, rng: np.random.Generator, method: str = BLOCK,
+                  block_months: int = BLOCK_MONTHS, days_per_month: int = TRADING_DAYS_PER_MONTH) -> np.ndarray:
+    """(paths x months) indices into the monthly returns of `monthly_returns`.
+
+    `HISTORICAL` draws every month independently; `BLOCK` draws runs of
+    `block_months` consecutive, non-overlapping months (a circular block
+    bootstrap), which keeps momentum and volatility clustering within a block.
+    """
+    if method == HISTORICAL:
+        return rng.integers(0, n_windows, size=(paths, months))
+    if method != BLOCK:
+        raise ValueError(f"Unknown sampling method: {method}")
+    n_blocks = -(-months // block_months)
+    starts = rng.integers(0, n_windows, size=(paths, n_blocks, 1))
+    index = (starts + np.arange(block_months) * days_per_month) % n_windows
+    return index.reshape(paths, n_blocks * block_months)[:, :months]
+
+
+def simulate_sip(daily_returns: np.ndarray, weights: Sequence[float], monthly_investment: float, months: int,
+                 target_amount: float, paths: int = DEFAULT_PATHS, method: str = BLOCK,
+                 percentiles: Sequence[int] = DEFAULT_PERCENTILES, rebalance: bool = True,
+                 seed: Optional[int] = None, block_months: int = BLOCK_MONTHS) -> GoalProjection:
+    """Project a monthly investment into a portfolio by resampling its assets' history.
+
+    Every month the contribution is invested at the start and the portfolio then
+    earns one sampled month of returns; all assets of a path draw the same month,
+    so their correlation is kept. With `rebalance` the portfolio is brought back
+    to `weights` every month and its return is the weighted return, so paths are
+    simulated on one series whatever the number of assets; without it every
+    asset's holding compounds on its own.
+
+    Args:
+        daily_returns: (days x assets) daily returns, NaN where an asset did not trade
+        weights: Portfolio weight of each asset, normalised to sum to 1
+        monthly_investment: Amount invested at the start of every month
+        months: Investment duration in months
+        target_amount: Amount the plan should reach
+        paths: Number of simulated paths
+        method: `HISTORICAL` (independent months) or `BLOCK` (blocks of consecutive months)
+        percentiles: Percentiles of the final value and of the monthly bands
+        rebalance: Rebalance to `weights` every month instead of buy-and-hold
+        seed: Seed for a reproducible projection
+        block_months: Months per block for `BLOCK`
+
+    Returns:
+        GoalProjection
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.sum() <= 0 or (weights < 0).any():
+        raise ValueError("Weights must be non-negative with a positive sum")
+    if months < 1 or paths < 1:
+        raise ValueError("Need at least one month and one path")
+    weights = weights / weights.sum()
+    returns = monthly_returns(daily_returns)
+    if returns.shape[1] != len(weights):
+        raise ValueError(f"Got {len(weights)} weights for {returns.shape[1]} assets")
+
+    rng = np.random.default_rng(seed)
+    index = sample_months(len(returns), paths, months, rng, method, block_months)
+    values = np.empty((paths, months))
+    if rebalance:
+        growth = 1 + returns @ weights
+        value = np.zeros(paths)
+        for month in range(months):
+            value = (value + monthly_investment) * growth[index[:, month]]
+            values[:, month] = value
+    else:
+        growth = 1 + returns
+        contribution = monthly_investment * weights
+        holdings = np.zeros((paths, len(weights)))
+        for month in range(months):
+            holdings = (holdings + contribution) * growth[index[:, month]]
+            values[:, month] = holdings.sum(axis=1)
+
+    percentiles = tuple(int(p) for p in percentiles)
+    bands = np.percentile(values, percentiles, axis=0).T
+    final = values[:, -1]
+    return GoalProjection(
+        target_amount=float(target_amount),
+        probability=float(np.mean(final >= target_amount)),
+        invested=float(monthly_investment * months),
+        expected_value=float(final.mean()),
+        percentiles={p: float(value) for p, value in zip(percentiles, bands[-1])},
+        bands=bands,
+        paths=paths,
+        months=months,
+        method=method,
+        seed=seed,
+    )
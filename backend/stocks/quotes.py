@@ -0,0 +1,217 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import pandas as pd
+from nselib import capital_market
+
+logger = logging.getLogger(__name__)
+
+# Seconds a quote is served without asking upstream
+QUOTE_TTL = 30.0
+
+# Seconds past the TTL a quote is still served while one background fetch refreshes it
+QUOTE_STALE_TTL = 300.0
+
+# Concurrent upstream fetches
+QUOTE_WORKERS = 8
+
+# Keys kept in memory; the least recently used one goes first
+MAX_QUOTE_KEYS = 256
+
+# History requested for an index quote; a week always holds the last two sessions
+QUOTE_PERIOD = '1W'
+
+MARKET_INDEX = "NIFTY 50"
+SECTOR_INDICES = ["NIFTY BANK", "NIFTY IT", "NIFTY AUTO", "NIFTY PHARMA", "NIFTY FMCG"]
+
+
+def index_quote(index: str, market=capital_market) -> Dict:
+    """Latest session of an NSE index as a quote, from nselib's daily index history.
+
+    Args:
+        index: Index name as on the NSE site, e.g. 'NIFTY 50'
+        market: Module providing `index_data` (nselib's capital_market)
+
+    Returns:
+        Dict of last, open, high, low, previousClose, change, pChange, volume and value;
+        a value NSE left out, and the change on an index's first session, is None
+    """
+    df = market.index_data(index=index, period=QUOTE_PERIOD)
+    if df is None or df.empty:
+        raise ValueError(f"No data for index {index}")
+    dates = pd.to_datetime(df['TIMESTAMP'], format='mixed', dayfirst=True, errors='coerce')
+    df = df.assign(TIMESTAMP=dates).dropna(subset=['TIMESTAMP']).sort_values('TIMESTAMP')
+    if df.empty:
+        raise ValueError(f"No dated sessions for index {index}")
+
+    def value(row, column) -> Optional[float]:
+        # None rather than NaN, which JSON cannot carry
+        number = pd.to_numeric(str(row.get(column, 'nan')).replace(',', ''), errors='coerce')
+        return None if pd.isna(number) else float(number)
+
+    latest = df.iloc[-1]
+    last = value(latest, 'CLOSE_INDEX_VAL')
+    # Without an earlier session there is nothing to compare with
+    previous_close = value(df.iloc[-2], 'CLOSE_INDEX_VAL') if len(df) > 1 else None
+    change = last - previous_close if last is not None and previous_close is not None else None
+    return {
+        "last": last,
+        "open": value(latest, 'OPEN_INDEX_VAL'),
+        "high": value(latest, 'HIGH_INDEX_VAL'),
+        "low": value(latest, 'LOW_INDEX_VAL'),
+        "previousClose": previous_close,
+        "change": change,
+        "pChange": change / previous_close * 100 if change is not None and previous_close else None,
+        "volume": value(latest, 'TRADED_QTY'),
+        "value": value(latest, 'TURN_OVER'),
+        "date": latest['TIMESTAMP'].strftime('%Y-%m-%d'),
+    }
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fetched_at: float
+
+
+class QuoteService:
+    """Per-key TTL cache in front of a slow upstream, with stale-while-revalidate and singleflight.
+
+    A quote younger than `ttl` is served from memory. An older one, up to
+    `ttl + stale_ttl`, is still served at once while a single background fetch
+    refreshes it; a failed refresh keeps serving it until it expires. Callers
+    that need a key nobody has (or only an expired copy) wait for the upstream,
+    and every concurrent caller for that key waits on the same fetch. Fetches for
+    different keys run concurrently on a thread pool. At most `max_keys` values
+    are kept: expired ones are dropped first, then the least recently used.
+
+    Args:
+        fetch: Upstream call for one key, e.g. `index_quote`
+        ttl: Seconds a value is fresh
+        stale_ttl: Seconds past `ttl` a value may be served while it is refreshed
+        max_workers: Concurrent upstream fetches
+        clock: Monotonic clock, replaceable in tests
+        max_keys: Most values kept in memory
+    """
+
+    def __init__(self, fetch: Callable[[Hashable], Any], ttl: float = QUOTE_TTL, stale_ttl: float = QUOTE_STALE_TTL,
+                 max_workers: int = QUOTE_WORKERS, clock: Callable[[], float] = time.monotonic,
+                 max_keys: int = MAX_QUOTE_KEYS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.max_keys = max_keys
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quotes')
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'upstream_calls': 0,
+                       'upstream_errors': 0, 'upstream_seconds': 0.0, 'evictions': 0}
+
+    def get(self, key: Hashable) -> Any:
+        """Value of one key; raises the upstream error if there is nothing servable."""
+        return self._lookup(key).result()
+
+    def get_many(self, keys: List[Hashable], return_exceptions: bool = False) -> Dict[Hashable, Any]:
+        """Values of several keys, fetching the missing ones concurrently.
+
+        Args:
+            keys: Keys to look up
+            return_exceptions: Put a failed key's exception in the result instead of raising it
+
+        Returns:
+            Dict of key to value (or exception), in the order of `keys`
+        """
+        futures = {key: self._lookup(key) for key in dict.fromkeys(keys)}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[key] = e
+        return results
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Forget one key, or every key."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._stats, keys=len(self._entries), inflight=len(self._inflight))
+
+    def _lookup(self, key: Hashable) -> Future:
+        """A done future for a servable cached value, otherwise the key's (possibly shared) upstream fetch."""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = self.clock() - entry.fetched_at if entry is not None else None
+            if age is not None and age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                if age < self.ttl:
+                    self._stats['hits'] += 1
+                else:
+                    self._stats['stale_hits'] += 1
+                    self._flight(key)
+                done = Future()
+                done.set_result(entry.value)
+                return done
+            self._stats['misses'] += 1
+            return self._flight(key)
+
+    def _flight(self, key: Hashable) -> Future:
+        """The in-flight upstream fetch of `key`, started if there is none. Call with the lock held."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+            return future
+        future = self._executor.submit(self._load, key)
+        self._inflight[key] = future
+        return future
+
+    def _load(self, key: Hashable) -> Any:
+        start = self.clock()
+        try:
+            value = self.fetch(key)
+        except Exception as e:
+            logger.warning(f"Quote fetch for {key} failed: {str(e)}")
+            with self._lock:
+                self._stats['upstream_errors'] += 1
+            raise
+        else:
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._stats['upstream_calls'] += 1
+                self._stats['upstream_seconds'] += self.clock() - start
+                self._inflight.pop(key, None)
+
+    def _store(self, key: Hashable, value: Any):
+        """Keep a fetched value, evicting down to `max_keys`. Call with the lock held."""
+        now = self.clock()
+        self._entries[key] = _Entry(value, now)
+        self._entries.move_to_end(key)
+        if len(self._entries) <= self.max_keys:
+            return
+        before = len(self._entries)
+        expired = [k for k, entry in self._entries.items() if now - entry.fetched_at >= self.ttl + self.stale_ttl]
+        for expired_key in expired:
+            del self._entries[expired_key]
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        self._stats['evictions'] += before - len(self._entries)
+
+
+quote_service = QuoteService(index_quote)
@@ -0,0 +1,140 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from .ml_model import StockRecommender
+
+logger = logging.getLogger(__name__)
+
+# All model artifacts live under stocks/models, independent of the working directory
+MODELS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+CATEGORIES = ['large_cap', 'mid_cap', 'small_cap']
+
+LEGACY_VERSION = 'legacy'
+
+
+class ModelRegistry:
+    """Versioned store of trained recommenders, one lineage per market cap category.
+
+    Layout::
+
+        <root>/<category>/versions/<version>/   # immutable, fully written artifacts
+        <root>/<category>/CURRENT               # name of the latest ready version
+
+    Training writes into a hidden staging directory and `publish` renames it into
+    `versions/` before swapping the `CURRENT` pointer with `os.replace`, so readers
+    only ever see complete artifacts. The request path only reads from the registry.
+    """
+
+    def __init__(self, root: str = MODELS_ROOT, keep_versions: int = 3):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Tuple[str, StockRecommender]] = {}
+
+    def _category_dir(self, category: str) -> str:
+        return os.path.join(self.root, category)
+
+    def _versions_dir(self, category: str) -> str:
+        return os.path.join(self._category_dir(category), 'versions')
+
+    def _pointer_path(self, category: str) -> str:
+        return os.path.join(self._category_dir(category), 'CURRENT')
+
+    def create_staging(self, category: str) -> Tuple[str, str]:
+        """Reserve a new version and return (version, staging directory) to train into."""
+        version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        staging_dir = os.path.join(self._versions_dir(category), f'.staging-{version}')
+        os.makedirs(staging_dir, exist_ok=True)
+        return version, staging_dir
+
+    def discard(self, category: str, version: str):
+        """Remove the staging directory of a version that failed to train."""
+        staging_dir = os.path.join(self._versions_dir(category), f'.staging-{version}')
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def publish(self, category: str, version: str):
+        """Atomically make a staged version the latest ready version of a category."""
+        versions_dir = self._versions_dir(category)
+        staging_dir = os.path.join(versions_dir, f'.staging-{version}')
+        os.rename(staging_dir, os.path.join(versions_dir, version))
+
+        pointer_path = self._pointer_path(category)
+        tmp_path = f'{pointer_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, pointer_path)
+        logger.info(f"Published {category} model version {version}")
+
+        self.prune(category)
+
+    def prune(self, category: str):
+        """Delete all but the newest `keep_versions` published versions."""
+        versions_dir = self._versions_dir(category)
+        current = self.latest_version(category)
+        versions = sorted(
+            v for v in os.listdir(versions_dir) if not v.startswith('.')
+        )
+        for version in versions[:-self.keep_versions]:
+            if version != current:
+                shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+
+    def latest_version(self, category: str) -> Optional[str]:
+        """Return the latest ready version of a category, or None if nothing is trained."""
+        try:
+            with open(self._pointer_path(category), 'r') as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+
+        # Fall back to a model trained into the flat, pre-registry layout
+        legacy_dir = self._category_dir(category)
+        if os.path.exists(os.path.join(legacy_dir, 'stock_recommender.joblib')):
+            return LEGACY_VERSION
+        return None
+
+    def version_dir(self, category: str, version: str) -> str:
+        if version == LEGACY_VERSION:
+            return self._category_dir(category)
+        return os.path.join(self._versions_dir(category), version)
+
+    def is_ready(self, category: Optional[str] = None) -> bool:
+        """Whether a trained model exists for the category (or for any category)."""
+        categories = [category] if category else CATEGORIES
+        return any(self.latest_version(c) is not None for c in categories)
+
+    def get_recommender(self, category: str) -> Optional[StockRecommender]:
+        """Return the recommender for the latest ready version of a category.
+
+        Each version is loaded from disk once per process; later calls only read
+        the `CURRENT` pointer to detect a newer publish.
+        """
+        version = self.latest_version(category)
+        if version is None:
+            return None
+
+        loaded = self._loaded.get(category)
+        if loaded is not None and loaded[0] == version:
+            return loaded[1]
+
+        with self._lock:
+            loaded = self._loaded.get(category)
+            if loaded is not None and loaded[0] == version:
+                return loaded[1]
+            recommender = StockRecommender(model_dir=self.version_dir(category, version))
+            if not recommender.is_trained:
+                return None
+            self._loaded[category] = (version, recommender)
+            logger.info(f"Loaded {category} model version {version}")
+            return recommender
+
+
+registry = ModelRegistry()
@@ -0,0 +1,96 @@
+import warnings
+import numpy as np
+import pandas as pd
+from dataclasses import asdict, dataclass
+from scipy.stats import norm
+from typing import Dict
+
+# Constants of the stocks.data risk metrics
+RISK_FREE_RATE = 0.05
+VAR_CONFIDENCE = 0.95
+TRADING_DAYS = 252
+
+# Weight of each metric in the risk tolerance score
+TOLERANCE_WEIGHTS = {
+    'volatility': 0.25,
+    'beta': 0.20,
+    'max_drawdown': -0.20,
+    'value_at_risk': -0.25,
+    'sharpe_ratio': 0.30,
+}
+
+
+@dataclass
+class RiskProfile:
+    """Risk metrics of one symbol against a market index.
+
+    Returns are the daily 'Return %' of stocks.data (close over open, in percent);
+    `beta` uses only the dates both the stock and the index traded.
+    """
+    symbol: str
+    volatility: float
+    beta: float
+    max_drawdown: float
+    value_at_risk: float
+    sharpe_ratio: float
+    observations: int
+
+    @property
+    def risk_tolerance(self) -> float:
+        """Weighted score of `calculate_risk_tolerance`."""
+        return float(sum(weight * getattr(self, name) for name, weight in TOLERANCE_WEIGHTS.items()))
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), risk_tolerance=self.risk_tolerance)
+
+
+def compute_risk_profiles(prices: pd.DataFrame, market_returns: pd.Series) -> Dict[str, RiskProfile]:
+    """Risk profiles of every symbol in a tidy price frame, in one vectorized pass.
+
+    Args:
+        prices: Rows of 'Symbol', 'Date', 'Open Price' and 'Close Price' (the
+            `get_bulk_price_df` layout); the last row wins on duplicate dates
+        market_returns: Market 'Return %' indexed by date
+
+    Returns:
+        Dict of symbol to RiskProfile, for symbols with at least one price
+    """
+    if prices.empty:
+        return {}
+    prices = prices.drop_duplicates(['Date', 'Symbol'], keep='last')
+    close = prices.pivot(index='Date', columns='Symbol', values='Close Price').sort_index()
+    open_ = prices.pivot(index='Date', columns='Symbol', values='Open Price').reindex_like(close)
+    symbols = list(close.columns)
+
+    close_values = close.to_numpy(dtype='float64')
+    returns = (close_values / open_.to_numpy(dtype='float64') - 1) * 100
+    market = market_returns.groupby(level=0).last().reindex(close.index).to_numpy(dtype='float64')
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        observations = np.sum(~np.isnan(returns), axis=0)
+        mean = np.nanmean(returns, axis=0)
+        std = np.nanstd(returns, axis=0, ddof=1)
+
+        # Beta over the dates both series have, per symbol
+        both = ~np.isnan(returns) & ~np.isnan(market)[:, None]
+        stock = np.where(both, returns, np.nan)
+        index = np.where(both, market[:, None], np.nan)
+        covariance = (np.nansum((stock - np.nanmean(stock, axis=0)) * (index - np.nanmean(index, axis=0)), axis=0)
+                      / (both.sum(axis=0) - 1))
+        beta = covariance / np.nanvar(index, axis=0, ddof=1)
+
+        # fmax skips the NaN of dates a symbol did not trade
+        running_max = np.fmax.accumulate(close_values, axis=0)
+        max_drawdown = np.nanmin((close_values - running_max) / running_max, axis=0)
+
+        value_at_risk = mean - norm.ppf(VAR_CONFIDENCE) * std
+        sharpe_ratio = (mean * TRADING_DAYS - RISK_FREE_RATE) / std
+
+    return {
+        symbol: RiskProfile(symbol=symbol, volatility=float(std[j]), beta=float(beta[j]),
+                            max_drawdown=float(max_drawdown[j]), value_at_risk=float(value_at_risk[j]),
+                            sharpe_ratio=float(sharpe_ratio[j]), observations=int(observations[j]))
+        for j, symbol in enumerate(symbols)
+        if observations[j]
+    }
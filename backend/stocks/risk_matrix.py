@@ -0,0 +1,210 @@
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Optional, Tuple, Union
+
+from sklearn.covariance import ledoit_wolf_shrinkage
+
+# Risk matrices kept by the process-wide cache
+MAX_CACHED_MATRICES = 16
+
+
+@dataclass
+class RiskMatrix:
+    """Betas and covariance of a universe of symbols against one index.
+
+    Attributes:
+        betas: Beta of each symbol against the index
+        covariance: Symbol x symbol covariance of returns, shrunk when requested
+        correlation: Correlation matrix matching `covariance`
+        market_variance: Variance of the index returns
+        shrinkage: Weight given to the scaled-identity target (0 without shrinkage)
+        observations: Number of aligned dates
+        rolling_betas: Date x symbol betas over a trailing window, if requested
+    """
+    betas: pd.Series
+    covariance: pd.DataFrame
+    correlation: pd.DataFrame
+    market_variance: float
+    shrinkage: float
+    observations: int
+    rolling_betas: Optional[pd.DataFrame] = None
+
+
+def align_returns(returns: pd.DataFrame, market: pd.Series, window: Optional[int] = None):
+    """Restrict a date x symbol returns matrix to the dates the index has, sorted, keeping the last `window`."""
+    market = market.dropna().groupby(level=0).last()
+    dates = returns.index.intersection(market.index).sort_values()
+    if window:
+        dates = dates[-window:]
+    return returns.loc[dates], market.loc[dates]
+
+
+def compute_risk_matrix(returns: pd.DataFrame, market: pd.Series, window: Optional[int] = None,
+                        rolling_window: Optional[int] = None, dtype: str = 'float64',
+                        shrinkage: Union[None, float, str] = None) -> RiskMatrix:
+    """Betas, covariance and correlation of every symbol in a few matrix products.
+
+    Missing returns (NaN) are allowed, so a symbol that listed late only affects
+    its own row and column: betas use exactly the dates each symbol traded, and
+    covariances divide by the number of dates both symbols have (each centred on
+    its own mean). With no gaps the results equal `DataFrame.cov()`.
+
+    Args:
+        returns: Date x symbol returns
+        market: Index returns by date
+        window: Use only the last `window` dates both have
+        rolling_window: Also compute betas over this many trailing dates
+        dtype: 'float64', or 'float32' for half the memory and faster products on large universes
+        shrinkage: Ledoit-Wolf weight towards a scaled identity for the covariance,
+            a float in [0, 1] or 'ledoit-wolf' to estimate it; betas are never shrunk
+
+    Returns:
+        RiskMatrix
+    """
+    returns, market = align_returns(returns, market, window)
+    symbols = returns.columns
+    stock = returns.to_numpy(dtype=dtype)
+    index = market.to_numpy(dtype=dtype)
+
+    present = ~np.isnan(stock)
+    weights = present.astype(dtype)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        centred = np.where(present, stock - np.nanmean(stock, axis=0), 0).astype(dtype, copy=False)
+        index_centred = (index - index.mean()).astype(dtype, copy=False)
+
+        # Pairwise counts, co-moments and betas: three products
+        counts = weights.T @ weights
+        covariance = (centred.T @ centred) / (counts - 1)
+        # Index co-moment, sum and sum of squares over each symbol's own dates
+        index_moments = np.stack([index_centred, index_centred ** 2]) @ np.column_stack([centred, weights])
+        n = len(symbols)
+        dates = counts.diagonal()
+        index_sum = index_moments[0, n:]
+        index_variance = index_moments[1, n:] - index_sum * index_sum / dates
+        betas = index_moments[0, :n] / index_variance
+
+        covariance, weight = shrink_covariance(covariance, centred, shrinkage)
+
+        std = np.sqrt(np.diag(covariance))
+        correlation = covariance / np.outer(std, std)
+
+    result = RiskMatrix(
+        betas=pd.Series(betas, index=symbols, name='beta'),
+        covariance=pd.DataFrame(covariance, index=symbols, columns=symbols),
+        correlation=pd.DataFrame(correlation, index=symbols, columns=symbols),
+        market_variance=float(np.var(index, ddof=1)) if len(index) > 1 else float('nan'),
+        shrinkage=weight,
+        observations=len(returns),
+    )
+    if rolling_window:
+        result.rolling_betas = rolling_betas(returns, market, rolling_window)
+    return result
+
+
+def covariance_matrix(returns: np.ndarray, dtype: str = 'float64',
+                      shrinkage: Union[None, float, str] = None) -> Tuple[np.ndarray, float]:
+    """Pairwise covariance of the columns of a (dates x assets) returns array that may hold NaN.
+
+    Returns:
+        Tuple of (assets x assets covariance, shrinkage weight applied)
+    """
+    returns = np.asarray(returns, dtype=dtype)
+    present = ~np.isnan(returns)
+    weights = present.astype(dtype)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        centred = np.where(present, returns - np.nanmean(returns, axis=0), 0).astype(dtype, copy=False)
+        covariance = (centred.T @ centred) / (weights.T @ weights - 1)
+        return shrink_covariance(covariance, centred, shrinkage)
+
+
+def shrink_covariance(covariance: np.ndarray, centred: np.ndarray,
+                      shrinkage: Union[None, float, str]) -> Tuple[np.ndarray, float]:
+    """Blend a covariance towards the scaled identity, by a fixed weight or the Ledoit-Wolf estimate."""
+    weight = 0.0
+    if shrinkage == 'ledoit-wolf':
+        weight = float(ledoit_wolf_shrinkage(centred, assume_centered=True))
+    elif shrinkage:
+        weight = float(shrinkage)
+    if weight:
+        target = np.nanmean(np.diag(covariance))
+        covariance = (1 - weight) * covariance
+        covariance[np.diag_indices(len(covariance))] += weight * target
+    return covariance, weight
+
+
+def rolling_betas(returns: pd.DataFrame, market: pd.Series, window: int) -> pd.DataFrame:
+    """Betas of every symbol over the trailing `window` dates, from running sums.
+
+    Sums are kept in float64 whatever the input dtype; a date needs `window`
+    dates with both returns before it gets a beta.
+    """
+    returns, market = align_returns(returns, market)
+    stock = returns.to_numpy(dtype='float64')
+    present = ~np.isnan(stock)
+    stock = np.where(present, stock, 0.0)
+    index = market.to_numpy(dtype='float64')[:, None] * present
+
+    def window_sum(values):
+        total = np.cumsum(values, axis=0)
+        total[window:] = total[window:] - total[:-window]
+        return total
+
+    n = window_sum(present.astype('float64'))
+    sum_stock, sum_index = window_sum(stock), window_sum(index)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = window_sum(stock * index) - sum_stock * sum_index / n
+        variance = window_sum(index * index) - sum_index * sum_index / n
+        betas = covariance / variance
+    betas[n < window] = np.nan
+    return pd.DataFrame(betas, index=returns.index, columns=returns.columns)
+
+
+class RiskMatrixCache:
+    """Risk matrices per (universe, index, window, as-of date, options), least recently used first out.
+
+    The recommender pool also keeps its candidates' covariance here, keyed by the
+    candidates and the model versions their history comes from. Concurrent
+    requests for the same key compute it once.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_MATRICES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, RiskMatrix]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, compute: Callable[[], RiskMatrix]) -> RiskMatrix:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+                self.misses += 1
+            matrix = compute()
+            with self._lock:
+                self._entries[key] = matrix
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._key_locks.pop(key, None)
+            return matrix
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+risk_matrix_cache = RiskMatrixCache()
@@ -0,0 +1,163 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from django.core.signals import request_started
+
+from .pool import RecommenderPool, get_pool
+from .train_model import TrainingJob, training_job
+
+logger = logging.getLogger(__name__)
+
+# Readiness states of the inference service
+COLD = 'cold'
+WARMING = 'warming'
+READY = 'ready'
+NO_MODEL = 'no_model'
+FAILED = 'failed'
+
+# Seconds a client should wait before retrying, per readiness state
+RETRY_AFTER = {COLD: 5, WARMING: 5, NO_MODEL: 60, FAILED: 30}
+
+
+class ServiceNotReady(Exception):
+    """Raised when recommendations are requested before a model is loaded."""
+
+    def __init__(self, state: str, retry_after: int):
+        super().__init__(f"Recommendation service is not ready ({state})")
+        self.state = state
+        self.retry_after = retry_after
+
+
+class InferenceService:
+    """Shared recommendation inference, warmed once per process.
+
+    Requests never load or train models: `warm` loads every category's published
+    model on a background thread and `recommend` raises `ServiceNotReady` until at
+    least one is loaded. When no model has been trained yet, or loading failed, a
+    background training run is started and the service warms again as soon as the
+    registry has a published version.
+
+    Args:
+        pool: Recommender pool to score with, defaults to the process-wide pool
+        training_job: Background job started when no model exists, None to never train
+    """
+
+    def __init__(self, pool: Optional[RecommenderPool] = None,
+                 training_job: Optional[TrainingJob] = training_job):
+        self._pool = pool
+        self.training_job = training_job
+        self.state = COLD
+        self.categories: Dict[str, bool] = {}
+        self.last_error: Optional[str] = None
+        self.warmed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pool(self) -> RecommenderPool:
+        if self._pool is None:
+            self._pool = get_pool()
+        return self._pool
+
+    def warm(self, background: bool = True):
+        """Load the latest model of every category, unless a warm-up is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.state != READY:
+                self.state = WARMING
+            if background:
+                self._thread = threading.Thread(target=self._warm, name='inference-warmup', daemon=True)
+                self._thread.start()
+                return
+        self._warm()
+
+    def warm_on_first_request(self):
+        """Warm when the server handles its first request rather than when the application is imported.
+
+        Importing the project's asgi/wsgi module, e.g. from a management command,
+        then starts no thread.
+        """
+        request_started.connect(self._on_request_started, weak=False, dispatch_uid=self._dispatch_uid)
+
+    @property
+    def _dispatch_uid(self) -> str:
+        return f'inference-warmup-{id(self)}'
+
+    def _on_request_started(self, **kwargs):
+        request_started.disconnect(dispatch_uid=self._dispatch_uid)
+        if self.state == COLD:
+            self.warm()
+
+    def _registry_ready(self) -> bool:
+        try:
+            return self.pool.registry.is_ready()
+        except Exception as e:
+            logger.error(f"Could not check the model registry: {str(e)}")
+            return False
+
+    def _warm(self):
+        try:
+            self.categories = self.pool.warm()
+            self.last_error = None
+            self.state = READY if any(self.categories.values()) else NO_MODEL
+            self.warmed_at = time.time()
+            logger.info(f"Inference service {self.state}: {self.categories}")
+        except Exception as e:
+            self.last_error = str(e)
+            self.state = FAILED
+            logger.error(f"Inference service warm-up failed: {str(e)}")
+
+    def check_ready(self):
+        """Raise `ServiceNotReady` unless a model is loaded.
+
+        The registry is checked again on every call, so a service without a model
+        (NO_MODEL, or FAILED to load one) warms as soon as a version is published
+        and otherwise keeps background training running.
+        """
+        if self.state == READY:
+            return
+        if self.state == COLD:
+            self.warm()
+        elif self.state in (NO_MODEL, FAILED):
+            if self._registry_ready():
+                self.warm()
+            elif self.training_job is not None:
+                self.training_job.start()
+        raise ServiceNotReady(self.state, RETRY_AFTER.get(self.state, 5))
+
+    def recommend(self, rts_score: float, target_amount: float, monthly_investment: float,
+                  investment_duration: int, top_k: int = 5) -> List[Dict]:
+        """Top recommendations across all market cap categories.
+
+        Raises:
+            ServiceNotReady: If no model is loaded yet
+        """
+        self.check_ready()
+        recommendations, _ = self.pool.recommend(rts_score, target_amount, monthly_investment,
+                                                 investment_duration, top_k)
+        return recommendations
+
+    def project(self, recommendations: List[Dict], monthly_investment: float, investment_duration: int,
+                target_amount: float, seed: Optional[int] = None) -> Optional[Dict]:
+        """Probability of reaching `target_amount` with the recommended portfolio, and percentile bands.
+
+        Returns:
+            `GoalProjection.to_dict()`, or None when it cannot be simulated
+        """
+        result = self.pool.project(recommendations, monthly_investment, investment_duration, target_amount, seed=seed)
+        return result.to_dict() if result is not None else None
+
+    def status(self) -> Dict:
+        return {
+            'state': self.state,
+            'categories': self.categories,
+            'warmed_at': self.warmed_at,
+            'last_error': self.last_error,
+            'training': self.training_job.status() if self.training_job is not None else None
+        }
+
+
+inference_service = InferenceService()
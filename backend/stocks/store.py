@@ -0,0 +1,264 @@
+import os
+import json
+import uuid
+import logging
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Local price history lives under stocks/prices, one Parquet file per symbol
+STORE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prices')
+
+# Raw NSE report prices, kept apart from the split- and dividend-adjusted yfinance history
+NSE_STORE_ROOT = os.path.join(STORE_ROOT, 'nse')
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Relative difference of a re-downloaded Close above which the provider re-adjusted the history
+ADJUSTMENT_TOLERANCE = 1e-6
+
+# Parquet metadata key of the date ranges a symbol's history was downloaded for
+COVERAGE_KEY = b'stocks.coverage'
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Store key of a symbol: yfinance 'RELIANCE.NS' and NSE 'RELIANCE' share one history."""
+    return symbol.replace('.NS', '').strip().upper()
+
+
+def normalize_history(df: pd.DataFrame) -> pd.DataFrame:
+    """OHLCV columns as float64 on a tz-naive daily 'Date' index, the store's layout."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df = df[OHLCV_COLUMNS].astype('float64')
+    df.index = index.normalize().rename('Date')
+    return df
+
+
+class PriceStore:
+    """Columnar daily OHLCV store keyed by (symbol, date).
+
+    Each symbol is a Parquet file sorted by date. Writes merge new rows into the
+    existing history (newer rows win on duplicate dates) and replace the file
+    atomically, so concurrent readers never see a partial file. Fetchers ask for
+    `last_date` and only download the missing tail, see `refresh`.
+
+    A write may also record the date range it was downloaded for. The file keeps
+    these ranges, so weekends and market holidays inside them are known to have
+    no bars, while days outside them are missing, see `missing_span`.
+    """
+
+    def __init__(self, root: str = STORE_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.root, f'{normalize_symbol(symbol)}.parquet')
+
+    def has(self, symbol: str) -> bool:
+        return os.path.exists(self.path(symbol))
+
+    def last_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        """Date of the newest stored bar, read from the Parquet footer statistics."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None
+        metadata = pq.ParquetFile(path).metadata
+        column = metadata.schema.names.index('Date')
+        last = None
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(column).statistics
+            if stats is None or not stats.has_min_max:
+                return self.read(symbol).index.max()
+            last = stats.max if last is None else max(last, stats.max)
+        return pd.Timestamp(last) if last is not None else None
+
+    def coverage(self, symbol: str) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Disjoint, sorted (first, last) date ranges the stored history was downloaded for."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return []
+        metadata = pq.read_schema(path).metadata or {}
+        return [(pd.Timestamp(first), pd.Timestamp(last))
+                for first, last in json.loads(metadata.get(COVERAGE_KEY, b'[]'))]
+
+    def missing_span(self, symbol: str, start, end) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Smallest (first, last) date range holding every day of [start, end] no download covered yet.
+
+        Returns:
+            None if the whole range is covered
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        first, last = start, end
+        coverage = self.coverage(symbol)
+        for covered_first, covered_last in coverage:
+            if covered_first <= first <= covered_last:
+                first = covered_last + pd.Timedelta(days=1)
+        for covered_first, covered_last in reversed(coverage):
+            if covered_first <= last <= covered_last:
+                last = covered_first - pd.Timedelta(days=1)
+        return (first, last) if first <= last else None
+
+    def read(self, symbol: str, start=None, end=None, tail: Optional[int] = None) -> pd.DataFrame:
+        """Stored history of a symbol.
+
+        Args:
+            symbol: Stock symbol, with or without the '.NS' suffix
+            start: Optional first date (inclusive)
+            end: Optional last date (inclusive)
+            tail: Optional number of most recent bars to keep
+        """
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', pd.Timestamp(start).tz_localize(None)))
+        if end is not None:
+            filters.append(('Date', '<=', pd.Timestamp(end).tz_localize(None)))
+        df = pd.read_parquet(path, filters=filters or None)
+        return df.iloc[-tail:] if tail else df
+
+    def read_many(self, symbols: List[str], start=None, end=None, tail: Optional[int] = None,
+                  min_rows: int = 1) -> Dict[str, pd.DataFrame]:
+        """Stored history of many symbols, keyed by the symbols as given."""
+        data = {}
+        for symbol in symbols:
+            df = self.read(symbol, start, end, tail)
+            if len(df) >= min_rows:
+                data[symbol] = df
+        return data
+
+    def append(self, symbol: str, df: pd.DataFrame, covered: Optional[Tuple] = None) -> int:
+        """Merge OHLCV rows into a symbol's history.
+
+        Args:
+            symbol: Stock symbol, with or without the '.NS' suffix
+            df: OHLCV rows on a date index
+            covered: Optional (first, last) dates `df` was downloaded for, even if it has no rows
+
+        Returns:
+            Number of stored bars after the merge
+        """
+        if (df is None or df.empty) and covered is None:
+            return len(self.read(symbol))
+        new = normalize_history(df) if df is not None and not df.empty else None
+        path = self.path(symbol)
+        with self._lock(normalize_symbol(symbol)):
+            coverage = self.coverage(symbol)
+            if os.path.exists(path):
+                merged = pd.concat([pd.read_parquet(path), new])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            else:
+                merged = new.sort_index() if new is not None else self.read(symbol)
+            if covered is not None:
+                coverage = merge_ranges(coverage + [tuple(pd.Timestamp(d).normalize() for d in covered)])
+            self._write(path, merged, coverage)
+        return len(merged)
+
+    def replace(self, symbol: str, df: pd.DataFrame) -> int:
+        """Replace a symbol's whole history, e.g. with a re-download on a new adjustment basis.
+
+        Returns:
+            Number of stored bars
+        """
+        new = normalize_history(df).sort_index()
+        new = new[~new.index.duplicated(keep='last')]
+        with self._lock(normalize_symbol(symbol)):
+            self._write(self.path(symbol), new, self.coverage(symbol))
+        return len(new)
+
+    def _write(self, path: str, df: pd.DataFrame, coverage: List[Tuple[pd.Timestamp, pd.Timestamp]]):
+        """Replace a symbol's file in one step. Call with the symbol's lock held."""
+        table = pa.Table.from_pandas(df)
+        ranges = [(first.isoformat(), last.isoformat()) for first, last in coverage]
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), COVERAGE_KEY: json.dumps(ranges)})
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def refresh(self, symbols: List[str], fetcher, period: str = '1y', min_rows: int = 1,
+                tail: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """Bring stored history up to date and return it.
+
+        Symbols already in the store download from their last stored date on; new
+        symbols download the full `period`. yfinance prices are split- and
+        dividend-adjusted, so when the re-downloaded Close of the last stored date
+        differs from the stored one, the earlier bars are on an old adjustment
+        basis and the symbol's full `period` is downloaded again and replaces them.
+
+        Args:
+            symbols: Stock symbols to refresh
+            fetcher: `stocks.fetcher.HistoryFetcher` to download with
+            period: History to download for symbols not yet stored
+            min_rows: Symbols with fewer stored rows are left out of the result
+            tail: Optional number of most recent bars to return per symbol
+
+        Returns:
+            Dict of symbol to stored history, for symbols with at least `min_rows` bars
+        """
+        last_dates = {symbol: self.last_date(symbol) for symbol in symbols}
+        today = pd.Timestamp.today().normalize()
+
+        def fetch_from(symbol):
+            # The last stored bar is downloaded again to check the adjustment basis
+            return last_dates[symbol]
+
+        pending = [s for s in symbols if last_dates[s] is None or last_dates[s] < today]
+        pending.sort(key=lambda s: (fetch_from(s) is not None, fetch_from(s) or today))
+        readjusted = []
+        for fetch_start, group in groupby(pending, key=fetch_from):
+            group = list(group)
+            downloaded = fetcher.fetch_many(group, period=period, start=fetch_start)
+            for symbol, hist in downloaded.items():
+                if fetch_start is not None and self._readjusted(symbol, hist, fetch_start):
+                    readjusted.append(symbol)
+                else:
+                    self.append(symbol, hist)
+            since = fetch_start.strftime('%Y-%m-%d') if fetch_start is not None else f'{period} ago'
+            logger.info(f"Refreshed {len(downloaded)} of {len(group)} symbols since {since}")
+
+        if readjusted:
+            downloaded = fetcher.fetch_many(readjusted, period=period)
+            for symbol, hist in downloaded.items():
+                self.replace(symbol, hist)
+            logger.info(f"Downloaded {len(downloaded)} of {len(readjusted)} re-adjusted symbols again")
+
+        return self.read_many(symbols, tail=tail, min_rows=min_rows)
+
+    def _readjusted(self, symbol: str, hist: pd.DataFrame, date: pd.Timestamp) -> bool:
+        """Whether `hist`'s Close on the stored `date` differs from the stored one, i.e. the provider re-adjusted."""
+        new = normalize_history(hist)['Close']
+        new = new[~new.index.duplicated(keep='last')]
+        stored = self.read(symbol, start=date, end=date)['Close']
+        if date not in new.index or stored.empty:
+            return False
+        old = stored.iloc[-1]
+        return abs(new.loc[date] - old) > ADJUSTMENT_TOLERANCE * abs(old)
+
+
+def merge_ranges(ranges: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Sorted union of (first, last) date ranges; ranges that overlap or touch are joined."""
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + pd.Timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+price_store = PriceStore()
+nse_price_store = PriceStore(NSE_STORE_ROOT)
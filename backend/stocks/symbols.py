@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .store import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+# The symbol universe lives in stocks/cache, independent of the working directory
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+SYMBOLS_FILE = os.path.join(CACHE_ROOT, 'nse_stocks.json')
+
+UNKNOWN_CATEGORY = 'unknown'
+
+# Seconds between checks of the file's modification time
+MTIME_CHECK_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class SymbolInfo:
+    """Static attributes of one symbol of the universe.
+
+    Attributes:
+        symbol: Symbol as listed in the universe file, e.g. 'RELIANCE.NS'
+        category: Market cap category
+        rank: Position within its category's list
+        attributes: Further metadata from the file's 'metadata' section, if any
+    """
+    symbol: str
+    category: str
+    rank: int
+    attributes: Dict = field(default_factory=dict)
+
+    @property
+    def base_symbol(self) -> str:
+        return normalize_symbol(self.symbol)
+
+
+class SymbolIndex:
+    """Process-wide symbol -> metadata index over the universe file `nse_stocks.json`.
+
+    The file is parsed once into a dict keyed by normalized symbol, so 'RELIANCE'
+    and 'RELIANCE.NS' resolve alike in O(1). Lookups check the file's
+    modification time at most every `check_interval` seconds and reload it when
+    it changed; each load swaps in a new dict, so readers never lock.
+
+    File layout::
+
+        {"timestamp": ..., "stocks": {"<category>": ["<symbol>", ...]},
+         "metadata": {"<symbol>": {...}}}   # optional
+
+    Args:
+        path: Universe file
+        check_interval: Seconds between modification time checks
+    """
+
+    def __init__(self, path: str = SYMBOLS_FILE, check_interval: float = MTIME_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._mtime: Optional[Tuple[float, int]] = None
+        self._checked_at = float('-inf')
+        self._by_symbol: Dict[str, SymbolInfo] = {}
+        self._categories: Dict[str, List[str]] = {}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            try:
+                stat = os.stat(self.path)
+                mtime = (stat.st_mtime, stat.st_size)
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime:
+                self._load(mtime)
+            self._checked_at = now
+
+    def _load(self, mtime: Optional[Tuple[float, int]]):
+        by_symbol, categories = {}, {}
+        if mtime is not None:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                # Keep serving the previous universe; the next change of the file is tried again
+                logger.error(f"Could not load symbol index {self.path}: {str(e)}")
+                self._mtime = mtime
+                return
+            metadata = data.get('metadata', {})
+            for category, symbols in data.get('stocks', {}).items():
+                categories[category] = list(symbols)
+                for rank, symbol in enumerate(symbols):
+                    # A symbol listed twice keeps its first category
+                    by_symbol.setdefault(normalize_symbol(symbol), SymbolInfo(
+                        symbol=symbol, category=category, rank=rank, attributes=metadata.get(symbol, {})))
+        self._by_symbol, self._categories = by_symbol, categories
+        self._mtime = mtime
+        self.loads += 1
+        logger.info(f"Loaded symbol index: {len(by_symbol)} symbols in {len(categories)} categories")
+
+    def invalidate(self):
+        """Check the file again on the next lookup."""
+        self._checked_at = float('-inf')
+
+    def get(self, symbol: str) -> Optional[SymbolInfo]:
+        self._refresh()
+        return self._by_symbol.get(normalize_symbol(symbol))
+
+    def category(self, symbol: str) -> str:
+        """Market cap category of a symbol, `UNKNOWN_CATEGORY` if it is not in the universe."""
+        info = self.get(symbol)
+        return info.category if info is not None else UNKNOWN_CATEGORY
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Optional[SymbolInfo]]:
+        """SymbolInfo (or None) of many symbols, keyed as given, with one freshness check."""
+        self._refresh()
+        by_symbol = self._by_symbol
+        return {symbol: by_symbol.get(normalize_symbol(symbol)) for symbol in symbols}
+
+    def categories(self, symbols: Iterable[str]) -> Dict[str, str]:
+        """Market cap category of many symbols, keyed as given."""
+        return {symbol: info.category if info is not None else UNKNOWN_CATEGORY
+                for symbol, info in self.get_many(symbols).items()}
+
+    def universe(self) -> Dict[str, List[str]]:
+        """Symbols of every category, as listed in the file."""
+        self._refresh()
+        return {category: list(symbols) for category, symbols in self._categories.items()}
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._by_symbol)
+
+
+symbol_index = SymbolIndex()
@@ -0,0 +1,370 @@
+"""In-process stand-ins for the external services the stocks app talks to.
+
+Used by the tests in this package and by `stocks.benchmarks`.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import zlib
+import asyncio
+import threading
+from collections import deque
+from multiprocessing.managers import BaseManager
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from channels.layers import BaseChannelLayer
+
+from ..cluster import RELEASE_SCRIPT, RENEW_SCRIPT
+from ..fetcher import HistoryProvider
+
+
+class FakeProvider(HistoryProvider):
+    """In-process provider with configurable latency and failures, for tests and benchmarks.
+
+    Args:
+        latency: Seconds each request sleeps
+        failure_rate: Probability that a request raises ConnectionError
+        missing: Symbols that return an empty history
+        n_days: Number of daily bars in a full history
+        rate_limit: Requests per second the provider allows
+        seed: Seed for the failure draws; price paths are seeded by symbol
+        name: Provider name, which also keys its shared rate limiter
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, missing=(), n_days: int = 250,
+                 rate_limit: Optional[float] = None, seed: int = 0, name: str = 'fake'):
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.missing = set(missing)
+        self.n_days = n_days
+        self.rate_limit = rate_limit
+        self.end = pd.Timestamp('2025-04-04', tz='Asia/Kolkata')
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch_history(self, symbol: str, period: str = '1y', start=None) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError(f"Simulated failure fetching {symbol}")
+        if symbol in self.missing:
+            return pd.DataFrame()
+
+        dates = pd.bdate_range(end=self.end, periods=self.n_days, tz='Asia/Kolkata', name='Date')
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        close = rng.uniform(50, 2000) * np.exp(np.cumsum(rng.normal(0.0005, 0.02, self.n_days)))
+        df = pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, 0.005, self.n_days)),
+            'High': close * (1 + np.abs(rng.normal(0, 0.01, self.n_days))),
+            'Low': close * (1 - np.abs(rng.normal(0, 0.01, self.n_days))),
+            'Close': close,
+            'Volume': rng.lognormal(13, 0.5, self.n_days).round(),
+        }, index=dates)
+
+        if start is not None:
+            start = pd.Timestamp(start)
+            if start.tzinfo is None:
+                start = start.tz_localize(df.index.tz)
+            df = df[df.index >= start]
+        elif period == '1mo':
+            df = df.iloc[-21:]
+        return df
+
+
+class FakeSecurityArchive:
+    """NSE security-wise price/volume report of one symbol as CSV text, the way NSE quotes it.
+
+    Args:
+        series: Series listed for every date; only 'EQ' rows carry the symbol's real price,
+            other series are priced `other_series_premium` higher
+        latency: Seconds each request sleeps
+    """
+
+    HEADER = ('Symbol  ,Series  ,Date  ,Prev Close  ,Open Price  ,High Price  ,Low Price  ,Last Price  ,'
+              'Close Price  ,Average Price  ,Total Traded Quantity  ,Turnover In Rs  ,No. of Trades  ,'
+              'Deliverable Qty  ,% Dly Qt to Traded Qty  ')
+
+    def __init__(self, series=('EQ',), latency: float = 0.0, other_series_premium: float = 0.5):
+        self.series = series
+        self.latency = latency
+        self.other_series_premium = other_series_premium
+        self.calls = 0
+        self.requests = []
+
+    def prices(self, symbol: str, dates: pd.DatetimeIndex) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        start = pd.Timestamp('2020-01-01')
+        steps = rng.normal(0, 0.01, (dates[-1] - start).days + 1)
+        return 1000 * np.exp(np.cumsum(steps))[(dates - start).days]
+
+    def __call__(self, symbol: str, from_date: str, to_date: str) -> str:
+        self.calls += 1
+        self.requests.append((from_date, to_date))
+        if self.latency:
+            time.sleep(self.latency)
+        dates = pd.bdate_range(pd.to_datetime(from_date, format='%d-%m-%Y'), pd.to_datetime(to_date, format='%d-%m-%Y'))
+        rows = [self.HEADER]
+        if len(dates) == 0:
+            return '\n'.join(rows) + '\n'
+        close = self.prices(symbol, dates)
+        for date, price in zip(dates, close):
+            for series in self.series:
+                quoted = price if series == 'EQ' else price * (1 + self.other_series_premium)
+                open_ = quoted * 0.99
+                rows.append(f'"{symbol}","{series}","{date:%d-%b-%Y}","{open_:,.2f}","{open_:,.2f}",'
+                            f'"{quoted * 1.01:,.2f}","{open_ * 0.99:,.2f}","{quoted:,.2f}","{quoted:,.2f}",'
+                            f'"{quoted:,.2f}","{100000:,}","{100000 * quoted:,.2f}","{2000:,}","{50000:,}","50.00"')
+        return '\n'.join(rows) + '\n'
+
+
+class FakeRecommender:
+    """Serves fixed daily returns per symbol and counts history reads."""
+
+    def __init__(self, returns):
+        self.returns = returns
+        self.reads = 0
+
+    def return_history(self, symbols, window=252):
+        self.reads += 1
+        return np.column_stack([self.returns[symbol][-window:] for symbol in symbols])
+
+
+class FakeRegistry:
+    """Serves one recommender for every category at a settable version."""
+
+    def __init__(self, recommender, version='v1'):
+        self.recommender = recommender
+        self.version = version
+
+    def latest_version(self, category):
+        return self.version
+
+    def get_recommender(self, category):
+        return self.recommender
+
+
+class WorkerKiller:
+    """Kills the process that unpickles it, like a training worker the OOM killer ends."""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+class FakeQuoteSource:
+    """Blocking quote source with per-symbol latency and random-walk prices, for tests and benchmarks.
+
+    Args:
+        latency: Seconds each symbol's request sleeps
+        move_probability: Chance that a symbol's price changes between polls
+        seed: Seed of the price moves
+    """
+
+    def __init__(self, latency: float = 0.0, move_probability: float = 1.0, seed: int = 0):
+        self.latency = latency
+        self.move_probability = move_probability
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._quotes: Dict[str, Dict] = {}
+
+    def __call__(self, symbols: List[str]) -> Dict[str, Dict]:
+        snapshot = {}
+        for symbol in symbols:
+            self.calls += 1
+            if self.latency:
+                time.sleep(self.latency)
+            quote = self._quotes.get(symbol)
+            if quote is None:
+                price = round(self._random.uniform(100, 3000), 2)
+                quote = {"symbol": symbol, "lastPrice": price, "open": price, "high": price,
+                         "low": price, "previousClose": price}
+            elif self._random.random() < self.move_probability:
+                price = round(quote["lastPrice"] * (1 + self._random.gauss(0, 0.002)), 2)
+                quote = dict(quote, lastPrice=price, high=max(quote["high"], price), low=min(quote["low"], price))
+            self._quotes[symbol] = quote
+            snapshot[symbol] = dict(quote)
+        return snapshot
+
+
+class FakeRedis:
+    """Thread-safe, in-memory stand-in for the Redis commands the feed uses.
+
+    For tests and benchmarks. Lua is not interpreted: `eval` runs Python
+    equivalents of the coordinator's scripts. Share one instance between processes with
+    `start_fake_redis`, which hosts it in a manager process the way a Redis server
+    would be shared.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, object] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Condition()
+
+    def _alive(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def ping(self) -> bool:
+        return True
+
+    def set(self, key: str, value, nx: bool = False, px: Optional[int] = None) -> bool:
+        with self._lock:
+            if nx and self._alive(key):
+                return False
+            self._data[key] = value
+            self._expires.pop(key, None)
+            if px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def get(self, key: str):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def pexpire(self, key: str, px: int) -> bool:
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def mget(self, keys: Iterable[str]) -> List:
+        with self._lock:
+            return [self._data.get(key) if self._alive(key) else None for key in keys]
+
+    def eval(self, script: str, numkeys: int, *keys_and_args):
+        """Run one of the coordinator's Lua scripts, atomically under the lock."""
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        with self._lock:
+            holds = self._alive(keys[0]) and self._data[keys[0]] == args[0]
+            if script == RENEW_SCRIPT:
+                return int(holds and self.pexpire(keys[0], int(args[1])))
+            if script == RELEASE_SCRIPT:
+                return self.delete(keys[0]) if holds else 0
+        raise NotImplementedError("FakeRedis only runs the scripts of stocks.cluster")
+
+    def hset(self, key: str, mapping: Dict) -> int:
+        with self._lock:
+            if not self._alive(key):
+                self._data[key] = {}
+            hash_ = self._data[key]
+            added = sum(field not in hash_ for field in mapping)
+            hash_.update(mapping)
+            return added
+
+    def hmget(self, key: str, fields: Iterable[str]) -> List:
+        with self._lock:
+            hash_ = self._data.get(key, {}) if self._alive(key) else {}
+            return [hash_.get(field) for field in fields]
+
+    def sadd(self, key: str, *members: str) -> int:
+        with self._lock:
+            set_ = self._data.setdefault(key, set())
+            added = sum(m not in set_ for m in members)
+            set_.update(members)
+            return added
+
+    def srem(self, key: str, *members: str) -> int:
+        with self._lock:
+            set_ = self._data.get(key, set())
+            removed = sum(m in set_ for m in members)
+            set_.difference_update(members)
+            return removed
+
+    def smembers(self, key: str) -> Set[str]:
+        with self._lock:
+            return set(self._data.get(key, set()))
+
+    def rpush(self, key: str, *values) -> int:
+        with self._lock:
+            list_ = self._data.setdefault(key, deque())
+            list_.extend(values)
+            self._lock.notify_all()
+            return len(list_)
+
+    def blpop(self, key: str, timeout: float = 0):
+        """Pop the head of a list, waiting up to `timeout` seconds (0 waits forever)."""
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            while True:
+                list_ = self._data.get(key)
+                if list_:
+                    return key, list_.popleft()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._lock.wait(remaining)
+
+
+class FakeRedisManager(BaseManager):
+    pass
+
+
+FakeRedisManager.register('FakeRedis', FakeRedis)
+
+
+def start_fake_redis():
+    """Host a `FakeRedis` in its own process and return (manager, client proxy).
+
+    The proxy can be passed to other processes; call `manager.shutdown()` when done.
+    """
+    manager = FakeRedisManager()
+    manager.start()
+    return manager, manager.FakeRedis()
+
+
+class FakeRedisChannelLayer(BaseChannelLayer):
+    """Channel layer over a `FakeRedis`, so several processes can share groups in tests.
+
+    Messages are JSON-serialized into per-channel lists, like channels_redis does
+    with its own encoding.
+    """
+
+    extensions = ['groups']
+
+    def __init__(self, client, expiry: int = 60, capacity: int = 100, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.client = client
+
+    async def new_channel(self, prefix: str = 'specific') -> str:
+        return f"{prefix}.{uuid.uuid4().hex}"
+
+    async def send(self, channel: str, message: Dict):
+        await asyncio.to_thread(self.client.rpush, f'channel:{channel}', json.dumps(message))
+
+    async def receive(self, channel: str) -> Dict:
+        while True:
+            item = await asyncio.to_thread(self.client.blpop, f'channel:{channel}', 1.0)
+            if item is not None:
+                return json.loads(item[1])
+
+    async def group_add(self, group: str, channel: str):
+        await asyncio.to_thread(self.client.sadd, f'group:{group}', channel)
+
+    async def group_discard(self, group: str, channel: str):
+        await asyncio.to_thread(self.client.srem, f'group:{group}', channel)
+
+    async def group_send(self, group: str, message: Dict):
+        for channel in await asyncio.to_thread(self.client.smembers, f'group:{group}'):
+            await self.send(channel, message)
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from threadpoolctl import threadpool_info
+
+from ..backends import BACKENDS, HistGradientBoostingBackend, ModelBackend, get_backend
+
+
+class ThreadCountingRegressor(RegressorMixin, BaseEstimator):
+    """Records the size of every native thread pool while it fits."""
+
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        self.fit_n_jobs_ = self.n_jobs
+        self.pool_threads_ = [pool['num_threads'] for pool in threadpool_info()]
+        return self
+
+    def predict(self, X):
+        return np.zeros(len(X))
+
+
+class CountingBackend(ModelBackend):
+    name = 'counting'
+
+    def create_model(self):
+        return ThreadCountingRegressor()
+
+
+class ModelBackendTests(unittest.TestCase):
+    def test_a_backend_must_create_a_model(self):
+        class Incomplete(ModelBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+        with self.assertRaises(TypeError):
+            ModelBackend()
+
+    def test_fit_caps_n_jobs_and_native_thread_pools(self):
+        # Load sklearn's OpenMP runtime so there is a native pool to cap
+        HistGradientBoostingBackend().create_model()
+        backend = CountingBackend()
+        model = backend.create_model()
+
+        backend.fit(model, np.zeros((4, 2)), np.zeros(4), n_jobs=2)
+
+        self.assertEqual(model.fit_n_jobs_, 2)
+        self.assertTrue(model.pool_threads_)
+        self.assertEqual(set(model.pool_threads_), {2})
+        self.assertIsNone(model.n_jobs)
+
+    def test_every_registered_backend_creates_a_model(self):
+        for name in BACKENDS:
+            with self.subTest(name):
+                self.assertIsInstance(get_backend(name).create_model(), BaseEstimator)
+
+
+if __name__ == '__main__':
+    unittest.main()
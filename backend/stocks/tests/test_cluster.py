@@ -0,0 +1,113 @@
+import time
+import asyncio
+import unittest
+
+from ..cluster import LEADER_KEY, SUBSCRIBERS_KEY, RedisCoordinator
+from ..feed import MarketDataFeed
+from .fakes import FakeQuoteSource, FakeRedis, FakeRedisChannelLayer
+
+
+class RedisCoordinatorTests(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+
+    def coordinators(self, n, lease=60.0):
+        return [RedisCoordinator(self.client, lease=lease) for _ in range(n)]
+
+    def test_a_single_producer_is_elected(self):
+        workers = self.coordinators(3)
+
+        self.assertEqual([w.acquire() for w in workers], [True, False, False])
+        # Renewing keeps the same producer
+        self.assertEqual([w.acquire() for w in workers], [True, False, False])
+        self.assertEqual(self.client.get(LEADER_KEY), workers[0].worker_id)
+
+    def test_an_expired_lease_passes_to_another_worker(self):
+        first, second = self.coordinators(2, lease=0.05)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+
+        time.sleep(0.1)
+
+        self.assertTrue(second.acquire())
+        # The old producer can neither renew nor release its successor's lease
+        self.assertFalse(first.renew())
+        self.assertFalse(first.acquire())
+        first.release()
+        self.assertEqual(self.client.get(LEADER_KEY), second.worker_id)
+
+    def test_release_hands_over_immediately(self):
+        first, second = self.coordinators(2)
+        first.acquire()
+        first.release()
+
+        self.assertTrue(second.acquire())
+
+    def test_subscriptions_of_dead_workers_expire(self):
+        alive, dead = self.coordinators(2, lease=0.05)
+        alive.publish_subscriptions(['TCS'])
+        dead.publish_subscriptions(['INFY', 'TCS'])
+        self.assertEqual(alive.all_subscriptions(), ['INFY', 'TCS'])
+
+        time.sleep(0.1)
+        alive.publish_subscriptions(['TCS'])
+
+        self.assertEqual(alive.all_subscriptions(), ['TCS'])
+        self.assertEqual(self.client.smembers(SUBSCRIBERS_KEY), {alive.worker_id})
+
+
+class FeedFailoverTests(unittest.TestCase):
+    def make_feed(self, client, lease, fetch=None):
+        return MarketDataFeed(fetch=fetch or FakeQuoteSource(), interval=60,
+                              channel_layer=FakeRedisChannelLayer(client),
+                              coordinator=RedisCoordinator(client, lease=lease))
+
+    def test_a_slow_poll_keeps_the_lease(self):
+        client = FakeRedis()
+        rival = RedisCoordinator(client, lease=0.1)
+        rival_acquired = []
+
+        def slow_fetch(symbols):
+            time.sleep(0.25)
+            rival_acquired.append(rival.acquire())
+            time.sleep(0.1)
+            return FakeQuoteSource()(symbols)
+
+        async def scenario():
+            feed = self.make_feed(client, lease=0.1, fetch=slow_fetch)
+            feed.subscriptions['TCS'] = 1
+            await feed._tick()
+            return feed
+
+        feed = asyncio.run(scenario())
+
+        self.assertEqual(rival_acquired, [False])
+        self.assertTrue(feed.is_producer)
+        self.assertEqual(feed.ticks, 1)
+
+    def test_another_worker_takes_over_from_a_dead_producer(self):
+        client = FakeRedis()
+
+        async def scenario():
+            first = self.make_feed(client, lease=0.05)
+            second = self.make_feed(client, lease=0.05)
+            for feed in (first, second):
+                feed.subscriptions['TCS'] = 1
+            await first._tick()
+            await second._tick()
+            producers = [first.is_producer, second.is_producer]
+
+            # The first producer dies without releasing its lease
+            await asyncio.sleep(0.1)
+            await second._tick()
+            return producers, second.is_producer, second.ticks
+
+        producers, took_over, ticks = asyncio.run(scenario())
+
+        self.assertEqual(producers, [True, False])
+        self.assertTrue(took_over)
+        self.assertEqual(ticks, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
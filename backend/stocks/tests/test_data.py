@@ -0,0 +1,152 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .. import data
+from ..store import PriceStore, nse_price_store, price_store
+from .fakes import FakeSecurityArchive
+
+
+class NSEPriceStoreTests(unittest.TestCase):
+    def test_nse_prices_are_not_stored_with_the_yfinance_history(self):
+        self.assertNotEqual(nse_price_store.path('RELIANCE'), price_store.path('RELIANCE.NS'))
+        for function in (data.read_stored_price_df, data.store_price_df, data.fill_stored_price_df,
+                         data.get_bulk_price_df):
+            with self.subTest(function=function.__name__):
+                self.assertIn(nse_price_store, function.__defaults__)
+                self.assertNotIn(price_store, function.__defaults__)
+
+    def test_only_eq_series_prices_are_kept(self):
+        archive = FakeSecurityArchive(series=('EQ', 'BL', 'BE'))
+        reference = FakeSecurityArchive()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PriceStore(root=tmp)
+            df = data.get_bulk_price_df(['ABC'], '01-01-2024', '31-03-2024', fetch_report=archive, store=store)
+            stored = store.read('ABC')
+        downloaded = data.get_bulk_price_df(['ABC'], '01-01-2024', '31-03-2024', fetch_report=archive, store=None)
+
+        expected = data.get_bulk_price_df(['ABC'], '01-01-2024', '31-03-2024', fetch_report=reference, store=None)
+        self.assertEqual(set(downloaded['Series']), {'EQ'})
+        self.assertFalse(df['Date'].duplicated().any())
+        np.testing.assert_allclose(df['Close Price'], expected['Close Price'])
+        np.testing.assert_allclose(stored['Close'], expected['Close Price'])
+
+    def test_stored_range_is_served_without_downloading(self):
+        archive = FakeSecurityArchive()
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PriceStore(root=tmp)
+            first = data.get_bulk_price_df(['ABC'], '01-01-2024', '31-03-2024', fetch_report=archive, store=store)
+            calls = archive.calls
+            again = data.get_bulk_price_df(['ABC'], '01-01-2024', '31-03-2024', fetch_report=archive, store=store)
+
+        self.assertEqual(archive.calls, calls)
+        np.testing.assert_allclose(again['Close Price'], first['Close Price'])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(again['Date']))
+
+
+class StoredRangeTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = PriceStore(root=tmp.name)
+        self.archive = FakeSecurityArchive()
+
+    def load(self, from_date, to_date):
+        return data.get_bulk_price_df(['ABC'], from_date, to_date, fetch_report=self.archive, store=self.store)
+
+    def test_a_stored_bar_near_both_ends_does_not_cover_the_range(self):
+        self.load('14-03-2025', '14-03-2025')
+
+        wide = self.load('12-03-2025', '18-03-2025')
+
+        self.assertEqual(list(wide['Date'].dt.strftime('%d-%m')), ['12-03', '13-03', '14-03', '17-03', '18-03'])
+        self.assertEqual(self.archive.requests[-1], ('12-03-2025', '18-03-2025'))
+
+    def test_only_the_days_not_downloaded_yet_are_requested(self):
+        self.load('03-03-2025', '14-03-2025')
+        self.load('03-03-2025', '21-03-2025')
+        # Weekends and holidays inside a downloaded range are not asked for again
+        self.load('08-03-2025', '16-03-2025')
+
+        self.assertEqual(self.archive.requests, [('03-03-2025', '14-03-2025'), ('15-03-2025', '21-03-2025')])
+
+    def test_a_gap_between_downloaded_ranges_is_filled(self):
+        self.load('03-03-2025', '07-03-2025')
+        self.load('17-03-2025', '21-03-2025')
+
+        df = self.load('03-03-2025', '21-03-2025')
+
+        self.assertEqual(self.archive.requests[-1], ('08-03-2025', '16-03-2025'))
+        self.assertEqual(len(df), 15)
+
+    def test_today_is_downloaded_again_until_it_is_over(self):
+        today = pd.Timestamp.today().normalize()
+        from_date = (today - pd.Timedelta(days=7)).strftime('%d-%m-%Y')
+        to_date = today.strftime('%d-%m-%Y')
+
+        self.load(from_date, to_date)
+        self.load(from_date, to_date)
+
+        self.assertEqual(self.archive.requests[-1], (to_date, to_date))
+
+
+class FakeNseUrlfetch:
+    """`nse_urlfetch` stand-in answering security archive requests from a `FakeSecurityArchive`."""
+
+    def __init__(self, archive, latency=0.0):
+        self.archive = archive
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url, origin_url=None):
+        query = parse_qs(urlsplit(url).query)
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+        body = self.archive(query['symbol'][0], query['from'][0], query['to'][0]).encode()
+        return mock.Mock(content=body)
+
+
+class InMemoryDownloadTests(unittest.TestCase):
+    def test_long_ranges_are_requested_a_year_at_a_time_and_parsed_in_memory(self):
+        archive = FakeSecurityArchive(series=('EQ', 'BE'))
+        expected = data.get_bulk_price_df(['ABC'], '01-01-2023', '31-03-2024', fetch_report=FakeSecurityArchive(),
+                                          store=None)
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(data, 'nse_urlfetch', FakeNseUrlfetch(archive)):
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                df = data.download_price_df('ABC.NS', '01-01-2023', '31-03-2024')
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(os.listdir(tmp), [])
+
+        self.assertEqual(archive.requests, [('01-01-2023', '31-12-2023'), ('01-01-2024', '31-03-2024')])
+        self.assertEqual(set(df['Series']), {'EQ'})
+        np.testing.assert_allclose(df['Close Price'], expected['Close Price'])
+
+    def test_bulk_downloads_run_concurrently(self):
+        urlfetch = FakeNseUrlfetch(FakeSecurityArchive(), latency=0.05)
+        with mock.patch.object(data, 'nse_urlfetch', urlfetch):
+            df = data.get_bulk_price_df(['A', 'B', 'C', 'D'], '03-03-2025', '07-03-2025', store=None)
+
+        self.assertEqual(df.groupby('Symbol').size().to_dict(), {'A': 5, 'B': 5, 'C': 5, 'D': 5})
+        self.assertGreater(urlfetch.peak, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
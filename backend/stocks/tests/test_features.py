@@ -0,0 +1,77 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from ..features import FEATURE_COLUMNS, PricePanel, compute_features, training_matrix
+from ..ml_model import StockRecommender
+from .fakes import FakeProvider
+
+
+def per_frame_training_data(stock_data):
+    """Training rows of the original per-DataFrame `calculate_features` path."""
+    recommender = StockRecommender.__new__(StockRecommender)
+    all_X, all_y = [], []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        for df in stock_data.values():
+            df = recommender.calculate_features(df.copy())
+            X = df[FEATURE_COLUMNS].values[:-1]
+            y = df['Returns_Shifted'].values[:-1]
+            valid = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+            all_X.append(X[valid])
+            all_y.append(y[valid])
+    return np.vstack(all_X), np.concatenate(all_y)
+
+
+class PanelFeatureTests(unittest.TestCase):
+    def setUp(self):
+        # Histories of different lengths, so the panel pads the shorter ones
+        self.stock_data = {
+            f'S{j}.NS': FakeProvider(n_days=n_days).fetch_history(f'S{j}.NS')
+            for j, n_days in enumerate([250, 120, 250, 60])
+        }
+
+    def test_panel_features_match_per_frame_features(self):
+        X_ref, y_ref = per_frame_training_data(self.stock_data)
+
+        panel = PricePanel.from_frames(self.stock_data)
+        X, y, samples = training_matrix(panel, compute_features(panel))
+
+        self.assertEqual(X.shape, X_ref.shape)
+        self.assertEqual(samples.sum(), len(X))
+        np.testing.assert_allclose(X, X_ref, rtol=1e-7, atol=1e-9)
+        np.testing.assert_allclose(y, y_ref, rtol=1e-7, atol=1e-12)
+
+    def test_panel_aligns_histories_on_their_last_bar(self):
+        panel = PricePanel.from_frames(self.stock_data)
+
+        self.assertEqual(panel.shape, (250, 4))
+        self.assertEqual(list(panel.start), [0, 130, 0, 190])
+        np.testing.assert_array_equal(panel.close[-1], [df['Close'].iloc[-1] for df in self.stock_data.values()])
+        self.assertTrue(np.isnan(panel.close[129, 1]))
+
+
+class PrepareTrainingDataTests(unittest.TestCase):
+    def test_malformed_frames_are_skipped(self):
+        provider = FakeProvider()
+        good = {symbol: provider.fetch_history(symbol) for symbol in ['A.NS', 'B.NS']}
+        stock_data = dict(good)
+        stock_data['NOVOL.NS'] = provider.fetch_history('NOVOL.NS').drop(columns=['Volume'])
+        stock_data['TEXT.NS'] = provider.fetch_history('TEXT.NS').assign(Close='n/a')
+        recommender = StockRecommender.__new__(StockRecommender)
+
+        with self.assertLogs('stocks.features', level='ERROR') as logs:
+            X, y = recommender.prepare_training_data(stock_data)
+
+        X_ref, y_ref = recommender.prepare_training_data(good)
+        np.testing.assert_array_equal(X, X_ref)
+        np.testing.assert_array_equal(y, y_ref)
+        self.assertEqual(len(logs.records), 2)
+
+    def test_no_usable_frame_raises(self):
+        recommender = StockRecommender.__new__(StockRecommender)
+        broken = FakeProvider().fetch_history('A.NS').drop(columns=['Close'])
+
+        with self.assertLogs('stocks.features', level='ERROR'), self.assertRaises(ValueError):
+            recommender.prepare_training_data({'A.NS': broken})
@@ -0,0 +1,141 @@
+import json
+import os
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+from channels.layers import InMemoryChannelLayer
+
+from .. import data, feed
+from ..cluster import LocalCoordinator
+from ..feed import MarketDataFeed, SubscriptionLimitError, fetch_snapshot, is_known_symbol
+from ..symbols import SymbolIndex
+from .fakes import FakeQuoteSource, FakeSecurityArchive
+
+
+class KnownSymbolTests(unittest.TestCase):
+    def test_symbols_are_checked_against_the_universe(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'nse_stocks.json')
+            with open(path, 'w') as f:
+                json.dump({'stocks': {'mid_cap': ['ABC.NS']}}, f)
+            index = SymbolIndex(path)
+
+            self.assertTrue(is_known_symbol('ABC', index))
+            self.assertTrue(is_known_symbol('RELIANCE', index))
+            self.assertFalse(is_known_symbol('NOTASYMBOL', index))
+
+    def test_default_universe_stands_in_without_a_universe_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SymbolIndex(os.path.join(tmp, 'missing.json'))
+
+            self.assertTrue(is_known_symbol('RELIANCE', index))
+            self.assertFalse(is_known_symbol('<script>', index))
+
+
+class FetchQuoteTests(unittest.TestCase):
+    def test_latest_equity_session_of_the_last_days_is_quoted(self):
+        archive = FakeSecurityArchive(series=('EQ', 'BE'))
+        with mock.patch.object(data, 'fetch_price_volume_csv', archive):
+            quote = feed.fetch_quote('ABC')
+
+        today = pd.Timestamp.today()
+        from_date, to_date = archive.requests[0]
+        self.assertEqual(to_date, today.strftime('%d-%m-%Y'))
+        self.assertEqual(from_date, (today - pd.Timedelta(days=feed.QUOTE_HISTORY_DAYS)).strftime('%d-%m-%Y'))
+        sessions = data.download_price_df('ABC', from_date, to_date, FakeSecurityArchive())
+        self.assertEqual(quote['lastPrice'], sessions['Close Price'].iloc[-1])
+        self.assertEqual(quote['previousClose'], sessions['Prev Close'].iloc[-1])
+
+    def test_report_is_read_in_memory(self):
+        body = FakeSecurityArchive()('ABC', '13-10-2026', '16-10-2026').encode()
+        response = mock.Mock(content=body)
+        fetch = mock.Mock(return_value=response)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(data, 'nse_urlfetch', fetch):
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                quote = feed.fetch_quote('ABC')
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(os.listdir(tmp), [])
+
+        self.assertIn('symbol=ABC', fetch.call_args.args[0])
+        response.raise_for_status.assert_called_once_with()
+        self.assertGreater(quote['lastPrice'], 0)
+
+
+class FetchSnapshotTests(unittest.TestCase):
+    def test_quotes_are_fetched_concurrently_up_to_the_worker_limit(self):
+        lock = threading.Lock()
+        active, peak = 0, 0
+
+        def fetch_quote(symbol):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+            return {"symbol": symbol}
+
+        symbols = [f'SYM{i}' for i in range(feed.FETCH_WORKERS * 3)]
+        with mock.patch.object(feed, 'fetch_quote', fetch_quote):
+            snapshot = fetch_snapshot(symbols)
+
+        self.assertEqual(list(snapshot), symbols)
+        self.assertTrue(all(snapshot[s]["symbol"] == s for s in symbols))
+        self.assertGreater(peak, 1)
+        self.assertLessEqual(peak, feed.FETCH_WORKERS)
+
+
+class CrowdedCoordinator(LocalCoordinator):
+    """Coordinator whose other workers subscribed to `extra` symbols."""
+
+    def __init__(self, extra):
+        super().__init__()
+        self.extra = extra
+
+    def all_subscriptions(self):
+        return sorted(set(super().all_subscriptions()) | set(self.extra))
+
+
+class FeedLimitTests(unittest.TestCase):
+    def make_feed(self, source, coordinator=None, max_symbols=3):
+        return MarketDataFeed(fetch=source, interval=60, channel_layer=InMemoryChannelLayer(),
+                              coordinator=coordinator or LocalCoordinator(), max_symbols=max_symbols)
+
+    def test_subscriptions_past_the_limit_are_rejected(self):
+        async def scenario():
+            market = self.make_feed(FakeQuoteSource())
+            await market.subscribe(['A', 'B'])
+            with self.assertRaises(SubscriptionLimitError):
+                await market.subscribe(['C', 'D'])
+            # Symbols already streamed do not count again
+            await market.subscribe(['A', 'C'])
+            symbols = sorted(market.symbols)
+            await market.stop()
+            return symbols
+
+        self.assertEqual(asyncio.run(scenario()), ['A', 'B', 'C'])
+
+    def test_producer_polls_at_most_the_limit(self):
+        async def scenario():
+            source = FakeQuoteSource()
+            market = self.make_feed(source, coordinator=CrowdedCoordinator([f'X{i}' for i in range(10)]))
+            await market.subscribe(['A'])
+            await market.stop()
+            calls = source.calls
+            await market._tick()
+            return source.calls - calls
+
+        self.assertEqual(asyncio.run(scenario()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
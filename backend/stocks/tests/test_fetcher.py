@@ -0,0 +1,66 @@
+import unittest
+
+import pandas as pd
+
+from ..fetcher import HistoryFetcher, HistoryProvider
+from .fakes import FakeProvider
+
+
+class FlakyProvider(FakeProvider):
+    """Fails the first `failures` requests of every symbol."""
+
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.attempts = {}
+
+    def fetch_history(self, symbol, period='1y', start=None):
+        with self._lock:
+            self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+            attempt = self.attempts[symbol]
+        if attempt <= self.failures:
+            raise ConnectionError(f"Flaky failure fetching {symbol}")
+        return super().fetch_history(symbol, period=period, start=start)
+
+
+class HistoryProviderTests(unittest.TestCase):
+    def test_provider_must_implement_fetch_history(self):
+        with self.assertRaises(TypeError):
+            HistoryProvider()
+
+
+class HistoryFetcherTests(unittest.TestCase):
+    def test_fetch_many_keeps_order_and_drops_missing_symbols(self):
+        provider = FakeProvider(missing={'B.NS'})
+        data = HistoryFetcher(provider, max_workers=4).fetch_many(['C.NS', 'B.NS', 'A.NS'])
+
+        self.assertEqual(list(data), ['C.NS', 'A.NS'])
+        self.assertEqual(len(data['A.NS']), provider.n_days)
+        self.assertEqual(provider.calls, 3)
+
+    def test_min_rows_drops_short_histories(self):
+        data = HistoryFetcher(FakeProvider(n_days=10)).fetch_many(['A.NS'], min_rows=21)
+        self.assertEqual(data, {})
+
+    def test_transient_errors_are_retried(self):
+        provider = FlakyProvider(failures=2)
+        data = HistoryFetcher(provider, max_retries=3, backoff=0).fetch_many(['A.NS', 'B.NS'])
+
+        self.assertEqual(list(data), ['A.NS', 'B.NS'])
+        self.assertEqual(provider.attempts, {'A.NS': 3, 'B.NS': 3})
+
+    def test_symbol_is_dropped_after_the_last_retry(self):
+        provider = FlakyProvider(failures=10)
+        fetcher = HistoryFetcher(provider, max_retries=2, backoff=0)
+
+        self.assertIsNone(fetcher.fetch_one('A.NS'))
+        self.assertEqual(provider.attempts['A.NS'], 3)
+
+    def test_start_downloads_only_the_delta(self):
+        provider = FakeProvider()
+        full = provider.fetch_history('A.NS')
+        start = full.index[-5]
+
+        delta = HistoryFetcher(provider).fetch_one('A.NS', start=start.tz_localize(None))
+
+        pd.testing.assert_frame_equal(delta, full.iloc[-5:])
@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from ..features import PricePanel, compute_features, latest_feature_matrix
+from ..indicators import IndicatorState, update_indicator_state
+from ..ml_model import StockRecommender
+from ..store import PriceStore, normalize_history
+from .fakes import FakeProvider
+
+
+def batch_features(df):
+    """Latest feature row of a full history through the batched panel engine."""
+    panel = PricePanel.from_frames({'S': df})
+    return latest_feature_matrix(compute_features(panel))[0]
+
+
+class IndicatorStateTests(unittest.TestCase):
+    def setUp(self):
+        self.history = normalize_history(FakeProvider(n_days=250).fetch_history('A.NS'))
+
+    def test_incremental_updates_equal_the_batch_features(self):
+        state = IndicatorState.from_history(self.history.iloc[:200])
+
+        for end in range(201, len(self.history) + 1):
+            update_indicator_state(state, self.history.iloc[:end])
+            np.testing.assert_allclose(state.feature_vector(), batch_features(self.history.iloc[:end]),
+                                       rtol=1e-7, atol=1e-9, err_msg=f"after bar {end}")
+        self.assertEqual(state.n_bars, len(self.history))
+
+    def test_bars_already_seen_are_ignored(self):
+        state = IndicatorState.from_history(self.history)
+        before = state.feature_vector()
+
+        update_indicator_state(state, self.history.iloc[-10:])
+
+        np.testing.assert_array_equal(state.feature_vector(), before)
+        self.assertEqual(state.n_bars, len(self.history))
+
+
+class SyncIndicatorStatesTests(unittest.TestCase):
+    def test_sync_applies_bars_stored_after_the_model_was_saved(self):
+        provider = FakeProvider(n_days=250)
+        histories = {symbol: normalize_history(provider.fetch_history(symbol)) for symbol in ['A.NS', 'B.NS']}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PriceStore(root=tmp)
+            recommender = StockRecommender.__new__(StockRecommender)
+            recommender.store = store
+            recommender.symbols = list(histories)
+            # States as saved with the model, 230 bars in; the store has moved on since
+            recommender.indicator_states = {symbol: IndicatorState.from_history(df.iloc[:230])
+                                            for symbol, df in histories.items()}
+            for symbol, df in histories.items():
+                store.append(symbol, df)
+
+            recommender.sync_indicator_states()
+
+        for symbol, df in histories.items():
+            state = recommender.indicator_states[symbol]
+            self.assertEqual(state.last_date, df.index[-1])
+            np.testing.assert_allclose(state.feature_vector(), batch_features(df), rtol=1e-7, atol=1e-9)
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from ..pool import RecommenderPool
+from ..risk_matrix import RiskMatrixCache
+from .fakes import FakeRecommender, FakeRegistry
+
+
+def candidates(expected_returns):
+    return [{'symbol': symbol, 'expected_return': mu, 'market_cap_category': 'large_cap'}
+            for symbol, mu in expected_returns.items()]
+
+
+class CandidateCovarianceTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.recommender = FakeRecommender({s: rng.normal(0, 0.01, 252) for s in ('A', 'B', 'C')})
+        self.registry = FakeRegistry(self.recommender)
+        self.pool = RecommenderPool(registry=self.registry, categories=['large_cap'], cache=RiskMatrixCache())
+
+    def test_covariance_is_computed_once_per_model_version(self):
+        listed = candidates({'A': 0.01, 'B': 0.02, 'C': 0.015})
+        first = self.pool.allocate(listed, rts_score=50)
+        again = self.pool.allocate(listed, rts_score=50)
+        self.assertEqual(self.recommender.reads, 1)
+        self.assertEqual(first, again)
+
+        self.registry.version = 'v2'
+        self.pool.allocate(listed, rts_score=50)
+        self.assertEqual(self.recommender.reads, 2)
+
+    def test_other_candidates_get_their_own_covariance(self):
+        self.pool.allocate(candidates({'A': 0.01, 'B': 0.02}), rts_score=50)
+        self.pool.allocate(candidates({'A': 0.01, 'C': 0.02}), rts_score=50)
+        self.assertEqual(self.recommender.reads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from .. import portfolio
+
+
+class AllocateTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Alike daily risk, next-day expected returns as the models predict them
+        self.returns = rng.normal(0, 0.015, (252, 5))
+        self.mu = np.array([0.0002, 0.0005, 0.001, 0.0015, 0.002])
+
+    def test_higher_risk_tolerance_shifts_weight_to_higher_expected_returns(self):
+        weights = {rts: portfolio.allocate(self.mu, self.returns, rts) for rts in (10, 50, 90)}
+
+        portfolio_returns = [weights[rts] @ self.mu for rts in (10, 50, 90)]
+        self.assertEqual(portfolio_returns, sorted(portfolio_returns))
+        self.assertGreater(portfolio_returns[-1] - portfolio_returns[0], 0.0002)
+        self.assertGreater(weights[90][-1], weights[10][-1])
+        self.assertLess(weights[90][0], weights[10][0])
+        for w in weights.values():
+            self.assertAlmostEqual(w.sum(), 1.0)
+            self.assertLessEqual(w.max(), portfolio.MAX_WEIGHT + 1e-9)
+
+    def test_daily_expected_returns_are_scaled_like_the_covariance(self):
+        covariance = portfolio.return_covariance(self.returns)
+        lam = portfolio.risk_aversion(50)
+
+        monthly = portfolio.mean_variance_weights(self.mu * portfolio.TRADING_DAYS_PER_MONTH, covariance, lam)
+
+        np.testing.assert_allclose(portfolio.allocate(self.mu, self.returns, 50), monthly)
+
+
+class RiskParityTests(unittest.TestCase):
+    def test_every_asset_contributes_the_same_risk(self):
+        rng = np.random.default_rng(1)
+        factors = rng.normal(0, 1, (8, 3))
+        covariance = factors @ factors.T * 1e-3 + np.diag(rng.uniform(1e-4, 1e-2, 8))
+
+        weights = portfolio.risk_parity_weights(covariance)
+
+        contributions = weights * (covariance @ weights)
+        np.testing.assert_allclose(contributions, contributions.mean(), rtol=1e-6)
+        self.assertTrue((weights > 0).all())
+        self.assertAlmostEqual(weights.sum(), 1.0)
+
+    def test_uncorrelated_assets_are_weighted_by_inverse_volatility(self):
+        volatility = np.array([0.1, 0.2, 0.4])
+
+        weights = portfolio.risk_parity_weights(np.diag(volatility ** 2))
+
+        np.testing.assert_allclose(weights, (1 / volatility) / (1 / volatility).sum())
+
+
+class WeightPercentagesTests(unittest.TestCase):
+    def test_percentages_add_up_to_exactly_100(self):
+        rng = np.random.default_rng(2)
+        for n in (1, 3, 7, 30):
+            with self.subTest(n=n):
+                percentages = portfolio.weight_percentages(rng.dirichlet(np.ones(n)))
+
+                self.assertEqual(sum(Decimal(str(p)) for p in percentages), Decimal(100))
+                self.assertTrue(all(Decimal(str(p)).as_tuple().exponent >= -2 for p in percentages))
+
+    def test_rounding_remainder_goes_to_the_largest_fractions(self):
+        self.assertEqual(portfolio.weight_percentages(np.ones(3)), [33.34, 33.33, 33.33])
+        self.assertEqual(portfolio.weight_percentages([0.0, 0.0]), [0.0, 0.0])
+
+
+class CappedSimplexTests(unittest.TestCase):
+    def test_projection_respects_the_cap_and_stays_on_the_simplex(self):
+        rng = np.random.default_rng(3)
+        for trial in range(20):
+            with self.subTest(trial=trial):
+                v = rng.normal(0, 1, 10)
+
+                w = portfolio.project_capped_simplex(v, cap=portfolio.MAX_WEIGHT)
+
+                self.assertAlmostEqual(w.sum(), 1.0)
+                self.assertTrue((w >= 0).all())
+                self.assertTrue((w <= portfolio.MAX_WEIGHT + 1e-12).all())
+                # Optimality: w = clip(v - tau, 0, cap) for a single shift tau
+                free = (w > 1e-12) & (w < portfolio.MAX_WEIGHT - 1e-12)
+                tau = np.mean((v - w)[free]) if free.any() else None
+                if tau is not None:
+                    np.testing.assert_allclose((v - w)[free], tau)
+                    np.testing.assert_allclose(w, np.clip(v - tau, 0, portfolio.MAX_WEIGHT), atol=1e-12)
+
+    def test_a_cap_below_an_equal_split_is_raised_to_it(self):
+        w = portfolio.project_capped_simplex(np.array([3.0, 1.0, 0.0, -1.0]), cap=0.1)
+
+        np.testing.assert_allclose(w, np.full(4, 0.25))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from .. import projection
+from ..pool import RecommenderPool
+from ..risk_matrix import RiskMatrixCache
+from ..store import PriceStore
+from .fakes import FakeRecommender, FakeRegistry
+
+
+class SimulateSipTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.returns = rng.normal(0.0005, 0.012, (504, 3))
+        self.weights = [0.5, 0.3, 0.2]
+
+    def simulate(self, target_amount=150000, **kwargs):
+        return projection.simulate_sip(self.returns, self.weights, 10000, 12, target_amount, paths=2000, **kwargs)
+
+    def test_same_seed_gives_the_same_projection(self):
+        for method in projection.METHODS:
+            with self.subTest(method=method):
+                first, again = self.simulate(seed=7, method=method), self.simulate(seed=7, method=method)
+                self.assertEqual(first.probability, again.probability)
+                np.testing.assert_array_equal(first.bands, again.bands)
+                self.assertNotEqual(self.simulate(seed=8, method=method).expected_value, first.expected_value)
+
+    def test_probability_is_a_share_of_paths(self):
+        self.assertEqual(self.simulate(target_amount=0, seed=1).probability, 1.0)
+        self.assertEqual(self.simulate(target_amount=1e12, seed=1).probability, 0.0)
+        result = self.simulate(target_amount=120000, seed=1)
+        self.assertGreater(result.probability, 0.0)
+        self.assertLess(result.probability, 1.0)
+        # Percentiles and bands are ordered
+        values = list(result.percentiles.values())
+        self.assertEqual(values, sorted(values))
+        self.assertTrue((np.diff(result.bands, axis=1) >= 0).all())
+
+
+class StoredHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = PriceStore(root=self.tmp.name)
+        self.recommender = FakeRecommender({'AAA.NS': np.full(252, 0.001), 'BBB.NS': np.full(252, 0.002)})
+        self.pool = RecommenderPool(registry=FakeRegistry(self.recommender), categories=['large_cap'],
+                                    cache=RiskMatrixCache(), store=self.store)
+        self.recommendations = [{'symbol': 'AAA.NS', 'weight': 60.0, 'market_cap_category': 'large_cap'},
+                                {'symbol': 'BBB.NS', 'weight': 40.0, 'market_cap_category': 'large_cap'}]
+
+    def store_history(self, symbol, dates, daily_return):
+        close = 100 * (1 + daily_return) ** np.arange(len(dates))
+        self.store.append(symbol, pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                                                'Volume': 1000.0}, index=dates))
+
+    def test_projection_window_is_read_from_the_store(self):
+        dates = pd.bdate_range('2020-01-01', periods=projection.HISTORY_WINDOW + 100)
+        self.store_history('AAA.NS', dates, 0.001)
+        # Listed later: NaN before its first bar
+        self.store_history('BBB.NS', dates[300:], 0.002)
+
+        history = self.pool.stored_return_history(self.recommendations, projection.HISTORY_WINDOW)
+
+        self.assertEqual(history.shape, (projection.HISTORY_WINDOW, 2))
+        np.testing.assert_allclose(history[:, 0], 0.001)
+        listed = ~np.isnan(history[:, 1])
+        self.assertEqual(listed.sum(), len(dates) - 300 - 1)
+        np.testing.assert_allclose(history[listed, 1], 0.002)
+        self.assertEqual(self.recommender.reads, 0)
+
+        result = self.pool.project(self.recommendations, 10000, 12, 100000, paths=500, seed=3)
+        self.assertIsNotNone(result)
+
+    def test_models_history_is_used_without_stored_prices(self):
+        history = self.pool.stored_return_history(self.recommendations, 100)
+
+        self.assertEqual(self.recommender.reads, 1)
+        np.testing.assert_allclose(history[:, 1], 0.002)
+
+
+if __name__ == '__main__':
+    unittest.main()
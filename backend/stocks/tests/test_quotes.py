@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+from ..quotes import QuoteService, index_quote
+
+
+class FakeIndexMarket:
+    """`capital_market` stand-in whose `index_data` returns fixed rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def index_data(self, index, period=None):
+        return pd.DataFrame(self.rows)
+
+
+def session(timestamp, close, open_='100.00'):
+    return {'TIMESTAMP': timestamp, 'OPEN_INDEX_VAL': open_, 'HIGH_INDEX_VAL': '110.00', 'LOW_INDEX_VAL': '95.00',
+            'CLOSE_INDEX_VAL': close, 'TRADED_QTY': '1,000', 'TURN_OVER': '2,500.50'}
+
+
+class IndexQuoteTests(unittest.TestCase):
+    def test_change_against_the_previous_session(self):
+        market = FakeIndexMarket([session('18-10-2026', '1,050.00'), session('17-10-2026', '1,000.00')])
+
+        quote = index_quote('NIFTY 50', market=market)
+
+        self.assertEqual(quote['last'], 1050.0)
+        self.assertEqual(quote['previousClose'], 1000.0)
+        self.assertEqual(quote['change'], 50.0)
+        self.assertAlmostEqual(quote['pChange'], 5.0)
+        self.assertEqual(quote['volume'], 1000.0)
+        self.assertEqual(quote['date'], '2026-10-18')
+
+    def test_a_single_session_has_no_change_and_encodes_as_json(self):
+        market = FakeIndexMarket([session('18-10-2026', '1,050.00', open_='-')])
+
+        quote = index_quote('NIFTY 50', market=market)
+
+        self.assertIsNone(quote['previousClose'])
+        self.assertIsNone(quote['change'])
+        self.assertIsNone(quote['pChange'])
+        self.assertIsNone(quote['open'])
+        json.dumps(quote, allow_nan=False)
+
+    def test_undated_rows_raise_a_value_error(self):
+        market = FakeIndexMarket([session('not a date', '1,050.00')])
+
+        with self.assertRaises(ValueError):
+            index_quote('NIFTY 50', market=market)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class QuoteServiceBoundTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.fetched = []
+
+        def fetch(key):
+            self.fetched.append(key)
+            return key.lower()
+
+        self.service = QuoteService(fetch, ttl=10, stale_ttl=10, clock=self.clock, max_keys=3)
+
+    def test_least_recently_used_key_is_evicted(self):
+        for key in ('A', 'B', 'C'):
+            self.service.get(key)
+        self.service.get('A')
+        self.service.get('D')
+
+        self.assertEqual(self.service.stats()['keys'], 3)
+        self.service.get('A')
+        self.service.get('B')
+        self.assertEqual(self.fetched, ['A', 'B', 'C', 'D', 'B'])
+
+    def test_expired_keys_are_evicted_before_live_ones(self):
+        self.service.get('A')
+        self.clock.now = 15
+        self.service.get('B')
+        self.service.get('C')
+        # A is still servable (stale) but becomes expired before D arrives
+        self.clock.now = 25
+        self.service.get('D')
+
+        stats = self.service.stats()
+        self.assertEqual(stats['keys'], 3)
+        self.assertEqual(stats['evictions'], 1)
+        self.service.get('B')
+        self.assertEqual(self.fetched, ['A', 'B', 'C', 'D'])
+
+
+class BlockingFetch:
+    """Upstream stand-in that counts calls and blocks each one until `release` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if not self.release.wait(5):
+            raise TimeoutError("fetch was never released")
+        return f'{key}-{call}'
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+class QuoteServiceFlightTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.fetch = BlockingFetch()
+        self.service = QuoteService(self.fetch, ttl=10, stale_ttl=60, clock=self.clock)
+        self.addCleanup(self.fetch.release.set)
+
+    def test_concurrent_misses_share_one_upstream_call(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.service.get('A'))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: self.service.stats()['coalesced'] == 19)
+        self.assertEqual(self.service.stats()['inflight'], 1)
+
+        self.fetch.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, ['A-1'] * 20)
+        self.assertEqual(self.fetch.calls, 1)
+        self.assertEqual(self.service.stats()['misses'], 20)
+
+    def test_expired_value_is_served_at_once_while_one_refresh_runs(self):
+        self.fetch.release.set()
+        self.assertEqual(self.service.get('A'), 'A-1')
+        self.fetch.release.clear()
+        self.clock.now = 15
+
+        # The refresh is blocked upstream, yet every caller gets the old value immediately
+        served = [self.service.get('A') for _ in range(5)]
+
+        self.assertEqual(served, ['A-1'] * 5)
+        stats = self.service.stats()
+        self.assertEqual((stats['stale_hits'], stats['inflight'], stats['coalesced']), (5, 1, 4))
+        wait_for(lambda: self.fetch.calls == 2)
+
+        self.fetch.release.set()
+        wait_for(lambda: self.service.stats()['inflight'] == 0)
+        self.assertEqual(self.service.get('A'), 'A-2')
+        self.assertEqual(self.service.stats()['hits'], 1)
+        self.assertEqual(self.fetch.calls, 2)
+
+    def test_failed_refresh_keeps_serving_the_stale_value(self):
+        def fetch(key):
+            if self.fetch.calls:
+                raise ConnectionError("upstream down")
+            self.fetch.calls += 1
+            return 'old'
+
+        service = QuoteService(fetch, ttl=10, stale_ttl=60, clock=self.clock)
+        service.get('A')
+        self.clock.now = 15
+
+        self.assertEqual(service.get('A'), 'old')
+        wait_for(lambda: service.stats()['upstream_errors'] == 1)
+        self.assertEqual(service.get('A'), 'old')
+
+
+if __name__ == '__main__':
+    unittest.main()
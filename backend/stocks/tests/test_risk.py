@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from .. import data
+from ..risk import compute_risk_profiles
+from ..risk_matrix import risk_matrix_cache
+from .fakes import FakeSecurityArchive
+
+
+def price_rows(symbol, dates, open_, close):
+    return pd.DataFrame({'Symbol': symbol, 'Date': dates, 'Open Price': open_, 'Close Price': close})
+
+
+class RiskProfileTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.dates = pd.bdate_range('2024-01-01', periods=120)
+        self.market = pd.Series(rng.normal(0.05, 1.0, len(self.dates)), index=self.dates)
+        self.open = rng.uniform(90, 110, len(self.dates))
+
+    def stock(self, symbol, returns, dates):
+        open_ = self.open[:len(dates)]
+        return price_rows(symbol, dates, open_, open_ * (1 + returns / 100))
+
+    def test_beta_uses_only_dates_both_series_traded(self):
+        rng = np.random.default_rng(1)
+        returns = 1.5 * self.market.to_numpy() + rng.normal(0, 0.3, len(self.dates))
+        traded = np.ones(len(self.dates), dtype=bool)
+        traded[::7] = False
+        prices = self.stock('ABC', returns[traded], self.dates[traded])
+
+        profile = compute_risk_profiles(prices, self.market)['ABC']
+
+        stock = pd.Series(returns[traded], index=self.dates[traded])
+        market = self.market[traded]
+        expected = np.cov(stock, market, ddof=1)[0, 1] / market.var(ddof=1)
+        self.assertAlmostEqual(profile.beta, expected, places=6)
+        self.assertEqual(profile.observations, traded.sum())
+
+    def test_market_days_without_a_stock_do_not_shift_its_returns(self):
+        # A stock listed halfway through: its beta is that of its own dates
+        half = len(self.dates) // 2
+        returns = 2.0 * self.market.to_numpy()[half:]
+        prices = self.stock('NEW', returns, self.dates[half:])
+
+        profile = compute_risk_profiles(prices, self.market)['NEW']
+
+        self.assertAlmostEqual(profile.beta, 2.0, places=6)
+
+    def test_metrics_of_each_symbol_are_independent(self):
+        rng = np.random.default_rng(2)
+        a = rng.normal(0, 1, len(self.dates))
+        b = rng.normal(0, 3, len(self.dates))
+        both = pd.concat([self.stock('A', a, self.dates), self.stock('B', b, self.dates)])
+
+        together = compute_risk_profiles(both, self.market)
+        alone = compute_risk_profiles(self.stock('A', a, self.dates), self.market)
+
+        self.assertEqual(together['A'], alone['A'])
+        self.assertGreater(together['B'].volatility, together['A'].volatility)
+
+
+class MarketSensitivityTests(unittest.TestCase):
+    def setUp(self):
+        risk_matrix_cache.clear()
+        self.addCleanup(risk_matrix_cache.clear)
+
+    def test_beta_is_date_aligned_and_cached(self):
+        archive = FakeSecurityArchive()
+        prices = data.get_bulk_price_df(['ABC'], '01-01-2024', '31-05-2024', fetch_report=archive, store=None)
+        stock = prices.set_index('Date')['Return %']
+        rng = np.random.default_rng(3)
+        # The index skips every tenth day, so truncating by length would pair up the wrong dates
+        market = stock.drop(stock.index[::10]) * 0.8 + rng.normal(0, 0.2, len(stock) - len(stock.index[::10]))
+
+        hits = risk_matrix_cache.hits
+        with mock.patch.object(data, 'get_market_returns', return_value=market) as market_returns:
+            beta = data.get_market_sensitivity('ABC', 'NIFTY 50', '01-01-2024', '31-05-2024',
+                                               fetch_report=archive, store=None)
+            again = data.get_market_sensitivity('ABC', 'NIFTY 50', '01-01-2024', '31-05-2024',
+                                                fetch_report=archive, store=None)
+
+        aligned = stock.loc[market.index]
+        expected = np.cov(aligned, market, ddof=1)[0, 1] / market.var(ddof=1)
+        self.assertAlmostEqual(beta, expected, places=6)
+        self.assertEqual(again, beta)
+        self.assertEqual(market_returns.call_count, 1)
+        self.assertEqual(risk_matrix_cache.hits, hits + 1)
@@ -0,0 +1,119 @@
+import unittest
+
+from django.core.signals import request_started
+
+from ..service import COLD, FAILED, NO_MODEL, READY, InferenceService, ServiceNotReady
+
+
+class FakeRegistry:
+    def __init__(self, ready=False):
+        self.ready = ready
+
+    def is_ready(self, category=None):
+        return self.ready
+
+
+class FakePool:
+    """Pool whose warm-up fails `failures` times and then loads every category with a model."""
+
+    def __init__(self, registry, failures=0):
+        self.registry = registry
+        self.failures = failures
+        self.warms = 0
+
+    def warm(self):
+        self.warms += 1
+        if self.failures:
+            self.failures -= 1
+            raise OSError("Simulated load failure")
+        return {'large_cap': self.registry.ready}
+
+
+class FakeTrainingJob:
+    def __init__(self):
+        self.starts = 0
+
+    def start(self):
+        self.starts += 1
+        return True
+
+
+def check(service):
+    """check_ready, waiting for any warm-up it started."""
+    try:
+        service.check_ready()
+    except ServiceNotReady:
+        pass
+    if service._thread is not None:
+        service._thread.join()
+
+
+class InferenceServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = FakeRegistry()
+        self.training_job = FakeTrainingJob()
+
+    def service(self, failures=0):
+        return InferenceService(pool=FakePool(self.registry, failures), training_job=self.training_job)
+
+    def test_failed_warm_up_recovers_once_training_publishes(self):
+        service = self.service(failures=1)
+        check(service)
+        self.assertEqual(service.state, FAILED)
+
+        check(service)
+        self.assertEqual(service.state, FAILED)
+        self.assertEqual(self.training_job.starts, 1)
+
+        self.registry.ready = True
+        check(service)
+        self.assertEqual(service.state, READY)
+        service.check_ready()
+
+    def test_failed_warm_up_is_retried_when_a_model_exists(self):
+        self.registry.ready = True
+        service = self.service(failures=1)
+        check(service)
+        self.assertEqual(service.state, FAILED)
+
+        check(service)
+
+        self.assertEqual(service.state, READY)
+        self.assertEqual(self.training_job.starts, 0)
+
+    def test_no_model_trains_then_warms(self):
+        service = self.service()
+        check(service)
+        self.assertEqual(service.state, NO_MODEL)
+
+        check(service)
+        self.assertEqual(self.training_job.starts, 1)
+
+        self.registry.ready = True
+        check(service)
+        self.assertEqual(service.state, READY)
+
+    def test_not_ready_error_carries_retry_after(self):
+        service = self.service()
+        service.state = NO_MODEL
+        with self.assertRaises(ServiceNotReady) as raised:
+            service.check_ready()
+        self.assertEqual(raised.exception.state, NO_MODEL)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+
+class WarmOnFirstRequestTests(unittest.TestCase):
+    def test_warm_up_starts_with_the_first_request_only(self):
+        pool = FakePool(FakeRegistry(ready=True))
+        service = InferenceService(pool=pool, training_job=None)
+
+        service.warm_on_first_request()
+        self.assertEqual(service.state, COLD)
+        self.assertEqual(pool.warms, 0)
+
+        request_started.send(sender=self.__class__)
+        service._thread.join()
+        request_started.send(sender=self.__class__)
+
+        self.assertEqual(service.state, READY)
+        self.assertEqual(pool.warms, 1)
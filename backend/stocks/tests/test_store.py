@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+
+import pandas as pd
+
+from ..fetcher import HistoryFetcher
+from ..store import PriceStore, normalize_history
+from .fakes import FakeProvider
+
+
+class RecordingProvider(FakeProvider):
+    """`FakeProvider` that records the start of every request."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.starts = []
+
+    def fetch_history(self, symbol, period='1y', start=None):
+        self.starts.append(start)
+        return super().fetch_history(symbol, period, start)
+
+
+class PriceStoreRefreshTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = PriceStore(root=tmp.name)
+        self.provider = RecordingProvider()
+        self.fetcher = HistoryFetcher(self.provider)
+        self.full = normalize_history(self.provider.fetch_history('A.NS'))
+        self.provider.starts.clear()
+
+    def test_refresh_downloads_from_the_last_stored_bar(self):
+        self.store.append('A.NS', self.full.iloc[:-5])
+
+        self.store.refresh(['A.NS'], self.fetcher)
+
+        self.assertEqual(self.provider.starts, [self.full.index[-6]])
+        pd.testing.assert_frame_equal(self.store.read('A.NS'), self.full, check_freq=False)
+
+    def test_history_on_an_old_adjustment_basis_is_downloaded_again(self):
+        # e.g. stored before a 1:2 split that the provider has since adjusted for
+        old_basis = self.full.iloc[:-5].copy()
+        old_basis[['Open', 'High', 'Low', 'Close']] *= 2
+        self.store.append('A.NS', old_basis)
+
+        self.store.refresh(['A.NS'], self.fetcher)
+
+        self.assertEqual(self.provider.starts, [self.full.index[-6], None])
+        pd.testing.assert_frame_equal(self.store.read('A.NS'), self.full, check_freq=False)
+
+
+class CoverageTests(unittest.TestCase):
+    def test_missing_span_holds_every_day_no_download_covered(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PriceStore(root=tmp)
+            store.append('A', None, covered=('2025-03-03', '2025-03-07'))
+            store.append('A', None, covered=('2025-03-08', '2025-03-09'))
+            store.append('A', None, covered=('2025-03-17', '2025-03-21'))
+
+            self.assertEqual(store.coverage('A'), [(pd.Timestamp('2025-03-03'), pd.Timestamp('2025-03-09')),
+                                                   (pd.Timestamp('2025-03-17'), pd.Timestamp('2025-03-21'))])
+            self.assertIsNone(store.missing_span('A', '2025-03-04', '2025-03-09'))
+            self.assertEqual(store.missing_span('A', '2025-03-03', '2025-03-25'),
+                             (pd.Timestamp('2025-03-10'), pd.Timestamp('2025-03-25')))
+            self.assertEqual(store.missing_span('A', '2025-03-01', '2025-03-05'),
+                             (pd.Timestamp('2025-03-01'), pd.Timestamp('2025-03-02')))
+            self.assertTrue(store.read('A').empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from .. import train_model
+from ..fetcher import HistoryFetcher
+from ..registry import ModelRegistry
+from ..store import PriceStore
+from .fakes import FakeProvider, WorkerKiller
+
+STOCKS = {
+    'large_cap': [f'LARGE{i}.NS' for i in range(5)],
+    'mid_cap': [f'MID{i}.NS' for i in range(5)],
+    'small_cap': [f'SMALL{i}.NS' for i in range(5)],
+}
+
+
+class KillingDataManager(train_model.StockDataManager):
+    """Fixed universe whose `doomed` category kills the worker process that trains it."""
+
+    def __init__(self, root, doomed):
+        super().__init__(cache_dir=os.path.join(root, 'cache'), fetcher=HistoryFetcher(FakeProvider()),
+                         store=PriceStore(root=os.path.join(root, 'prices')))
+        self.doomed = doomed
+
+    def fetch_nse_stocks(self):
+        return STOCKS
+
+    def fetch_verified_history(self, symbols, period="1y"):
+        if symbols is STOCKS[self.doomed]:
+            return {symbol: WorkerKiller() for symbol in symbols}
+        return super().fetch_verified_history(symbols, period)
+
+
+class TrainModelsTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.registry = ModelRegistry(root=os.path.join(self.root, 'models'))
+        original_registry = train_model.registry
+        train_model.registry = self.registry
+        self.addCleanup(setattr, train_model, 'registry', original_registry)
+
+    def test_a_dead_worker_only_fails_its_own_category(self):
+        report = train_model.train_models(KillingDataManager(self.root, doomed='mid_cap'), cpu_budget=3)
+
+        self.assertEqual({c: entry['status'] for c, entry in report.items()},
+                         {'large_cap': 'published', 'mid_cap': 'failed', 'small_cap': 'published'})
+        self.assertEqual(report['large_cap']['symbols'], 5)
+        self.assertIsNotNone(self.registry.latest_version('large_cap'))
+        self.assertIsNotNone(self.registry.latest_version('small_cap'))
+        self.assertIsNone(self.registry.latest_version('mid_cap'))
+        versions_dir = os.path.join(self.root, 'models', 'mid_cap', 'versions')
+        self.assertEqual(os.listdir(versions_dir), [])
+
+    def test_staging_is_discarded_when_the_submit_fails(self):
+        def refuse(*args, **kwargs):
+            raise RuntimeError("cannot start a worker")
+
+        original_submit = train_model.ProcessPoolExecutor.submit
+        train_model.ProcessPoolExecutor.submit = refuse
+        self.addCleanup(setattr, train_model.ProcessPoolExecutor, 'submit', original_submit)
+
+        with self.assertRaises(Exception):
+            train_model.train_models(KillingDataManager(self.root, doomed='mid_cap'), cpu_budget=1)
+
+        for category in STOCKS:
+            self.assertEqual(os.listdir(os.path.join(self.root, 'models', category, 'versions')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import json
+import os
+import tempfile
+import unittest
+
+from .. import universe
+from ..symbols import SymbolIndex
+
+
+class TopSymbolsTests(unittest.TestCase):
+    def test_largest_companies_stand_in_without_a_universe_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SymbolIndex(os.path.join(tmp, 'missing.json'))
+
+            top = universe.top_symbols(10, index=index)
+
+        self.assertEqual(top, universe.DEFAULT_TOP_SYMBOLS[:10])
+        self.assertIn('TCS', top)
+        self.assertIn('HDFCBANK', top)
+
+    def test_universe_file_order_is_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'nse_stocks.json')
+            with open(path, 'w') as f:
+                json.dump({'stocks': {'large_cap': ['TCS.NS', 'RELIANCE.NS', 'INFY.NS'], 'mid_cap': []}}, f)
+            index = SymbolIndex(path)
+
+            self.assertEqual(universe.top_symbols(2, index=index), ['TCS', 'RELIANCE'])
+            self.assertEqual(universe.top_symbols(2, 'mid_cap', index=index),
+                             ['INDHOTEL', 'FEDERALBNK'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,27 +1,61 @@
 import logging
-from .ml_model import StockRecommender
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Tuple
+from .backends import backend_for
+from .ml_model import HISTORY_BARS, StockRecommender
+from .registry import registry
+from .fetcher import HistoryFetcher
+from .store import PriceStore, price_store
+from .symbols import CACHE_ROOT
+from .universe import DEFAULT_UNIVERSE, refresh_universe, write_universe
 import schedule
 import time
 import pandas as pd
-import yfinance as yf
 import requests
 from bs4 import BeautifulSoup
 import json
 import os
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Minimum number of daily bars a symbol needs to be used for training
+MIN_HISTORY_ROWS = 21
+
+# Minimum number of stocks needed to train a category
+MIN_TRAINING_STOCKS = 5
+
+# Cores training may use in total; the rest are left to the web workers
+TRAINING_CPU_BUDGET = int(os.getenv('TRAINING_CPU_BUDGET', 0)) or max(1, (os.cpu_count() or 1) - 1)
+
+# Scheduling priority increment of training processes, so requests are served first
+TRAINING_NICE = 10
+
 class StockDataManager:
-    def __init__(self, cache_dir: str = 'cache'):
+    def __init__(self, cache_dir: str = CACHE_ROOT, fetcher: HistoryFetcher = None, store: PriceStore = None):
         self.cache_dir = cache_dir
+        self.fetcher = fetcher or HistoryFetcher()
+        self.store = store or price_store
         os.makedirs(cache_dir, exist_ok=True)
         self.stocks_cache_file = os.path.join(cache_dir, 'nse_stocks.json')
+        self.market_cap_file = os.path.join(cache_dir, 'market_caps.csv')
         
     def fetch_nse_stocks(self) -> dict:
         """Fetch list of NSE stocks with their market cap categories."""
         try:
+            # The full listed universe, classified from the local market-cap file
+            stocks = refresh_universe(self.stocks_cache_file, self.market_cap_file)
+            if stocks:
+                return stocks
+            
             # Try to load from cache first
             if os.path.exists(self.stocks_cache_file):
                 with open(self.stocks_cache_file, 'r') as f:
@@ -30,59 +64,14 @@ class StockDataManager:
                         logger.info("Using cached NSE stocks data")
                         return cached_data['stocks']
             
-            logger.info("Using default stock list for testing...")
+            logger.info(f"No market-cap file at {self.market_cap_file}, using the default stock list...")
+            stocks = DEFAULT_UNIVERSE
             
-            # Default reliable stock list for testing
-            stocks = {
-                'large_cap': [
-                    "RELIANCE.NS",
-                    "INFY.NS",
-                    "ICICIBANK.NS",
-                    "HINDUNILVR.NS",
-                    "SBIN.NS",
-                    "BHARTIARTL.NS",
-                    "ITC.NS",
-                    "KOTAKBANK.NS",
-                    "LT.NS",
-                    "AXISBANK.NS",
-                    "MARUTI.NS",
-                    "HCLTECH.NS",
-                    "ASIANPAINT.NS",
-                    "TATASTEEL.NS",
-                    "WIPRO.NS"
-                ],
-                'mid_cap': [
-                    "INDHOTEL.NS",
-                    "FEDERALBNK.NS",
-                    "SAIL.NS",
-                    "GODREJPROP.NS",
-                    "TATAPOWER.NS",
-                    "APOLLOTYRE.NS",
-                    "CANBK.NS",
-                    "NMDC.NS",
-                    "ESCORTS.NS",
-                    "MINDTREE.NS"
-                ],
-                'small_cap': [
-                    "TRIDENT.NS",
-                    "SUZLON.NS",
-                    "RPOWER.NS",
-                    "IDEA.NS",
-                    "PNB.NS",
-                    "YESBANK.NS",
-                    "IBULHSGFIN.NS",
-                    "DELTACORP.NS",
-                    "GMRINFRA.NS",
-                    "IBREALEST.NS"
-                ]
-            }
-            
-            # Cache the results
-            with open(self.stocks_cache_file, 'w') as f:
-                json.dump({
-                    'timestamp': time.time(),
-                    'stocks': stocks
-                }, f)
+            # Cache the results; replaced in one step so the symbol index never reads a partial file
+            write_universe({
+                'timestamp': time.time(),
+                'stocks': stocks
+            }, self.stocks_cache_file)
             
             return stocks
             
@@ -118,73 +107,233 @@ class StockDataManager:
     
     def verify_stock_data(self, symbols: list) -> list:
         """Verify which stocks have valid data available."""
-        valid_symbols = []
-        for symbol in symbols:
+        data = self.fetcher.fetch_many(symbols, period="1mo", min_rows=MIN_HISTORY_ROWS)
+        for symbol in data:
+            logger.info(f"Verified stock data for {symbol}")
+        return list(data)
+
+    def fetch_verified_history(self, symbols: list, period: str = "1y") -> dict:
+        """Refresh history in the local price store and keep the symbols with enough data.
+        
+        Symbols already stored only download the bars after their last stored date;
+        this replaces a separate verify_stock_data pass followed by a full download.
+        """
+        return self.store.refresh(symbols, self.fetcher, period=period,
+                                  min_rows=MIN_HISTORY_ROWS, tail=HISTORY_BARS)
+
+
+def training_plan(categories: int, cpu_budget: int = TRAINING_CPU_BUDGET) -> Tuple[int, int]:
+    """Worker processes and forest threads per process for training `categories` within `cpu_budget` cores."""
+    processes = max(1, min(categories, cpu_budget))
+    return processes, max(1, cpu_budget // processes)
+
+
+def _train_category(symbols: list, stock_data: dict, staging_dir: str, backend: str, n_jobs: int,
+                    nice: int) -> dict:
+    """Fit one category with a model backend into its staging directory. Runs in a fresh worker process.
+
+    Returns:
+        Symbols trained on, wall and CPU seconds of the fit and peak RSS of the process in MB
+    """
+    if nice:
+        try:
+            os.nice(nice)
+        except (AttributeError, OSError):
+            pass
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    recommender = StockRecommender(model_dir=staging_dir, backend=backend)
+    recommender.train(symbols, force_retrain=True, stock_data=stock_data, n_jobs=n_jobs)
+    return {
+        'symbols': len(recommender.symbols),
+        'train_seconds': time.perf_counter() - wall_start,
+        # process_time covers every thread of the forest in this process
+        'cpu_seconds': time.process_time() - cpu_start,
+        # ru_maxrss is in KB on Linux; the process trains nothing else, so this is the category's peak
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+    }
+
+
+def _finish_categories(running: Dict[Future, Tuple[str, ProcessPoolExecutor]], report: dict, keep: int = 0):
+    """Publish or discard finished categories until at most `keep` are still training.
+
+    Args:
+        running: Future of each training category to its name and executor; finished ones are removed
+        report: `train_models` report, updated for every finished category
+        keep: Categories that may still be training on return
+    """
+    while len(running) > keep:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            category, executor = running.pop(future)
+            executor.shutdown()
+            entry = report[category]
             try:
-                # Remove .NS suffix if present for verification
-                base_symbol = symbol.replace('.NS', '')
-                ticker = yf.Ticker(f"{base_symbol}.NS")
-                hist = ticker.history(period="1mo")
-                if not hist.empty and len(hist) > 20:  # At least 20 days of data
-                    valid_symbols.append(symbol)
-                    logger.info(f"Verified stock data for {symbol}")
+                entry.update(future.result())
+                registry.publish(category, entry['version'])
+                entry['status'] = 'published'
+                logger.info(f"Model training completed for {category}")
             except Exception as e:
-                logger.warning(f"Error verifying {symbol}: {str(e)}")
-        return valid_symbols
+                # Includes a worker process that died, e.g. out of memory
+                registry.discard(category, entry['version'])
+                entry['error'] = str(e) or type(e).__name__
+                logger.error(f"Error training model for {category}: {entry['error']}")
+
+
+def train_models(data_manager: StockDataManager = None, cpu_budget: int = None) -> dict:
+    """Train separate models for different market cap categories.
 
-def train_models():
-    """Train separate models for different market cap categories."""
-    success_count = 0
+    History is fetched per category in this process; each category is then fitted
+    in its own worker process, with its own executor, while the next category
+    downloads. A fresh process per category returns its memory and measures its
+    peak, and a worker that dies (e.g. out of memory) only fails its own
+    category. Worker processes and forest threads share `cpu_budget` cores and
+    run at a lower priority than the web workers. Each category is trained into
+    a staging version of the model registry and published only once its
+    artifacts are fully written; a category that fails is discarded without
+    affecting the others. Each category is fitted with the model backend
+    selected by MODEL_BACKEND_<CATEGORY>, see `stocks.backends.backend_for`.
+
+    Args:
+        data_manager: Source of the stock universe and history, e.g. one backed by
+            a `FakeProvider` in tests. Defaults to yfinance.
+        cpu_budget: Cores training may use, defaults to `TRAINING_CPU_BUDGET`
+
+    Returns:
+        Report per category: status ('published', 'skipped' or 'failed'), version,
+        backend, symbols, fetch_seconds, train_seconds, cpu_seconds, peak_rss_mb and error
+    """
     try:
         logger.info("Starting model training...")
-        data_manager = StockDataManager()
+        data_manager = data_manager or StockDataManager()
         stocks = data_manager.fetch_nse_stocks()
+        processes, n_jobs = training_plan(len(stocks), cpu_budget or TRAINING_CPU_BUDGET)
+        logger.info(f"Training {len(stocks)} categories in {processes} processes x {n_jobs} threads")
         
-        for category, symbols in stocks.items():
-            try:
-                logger.info(f"Training model for {category}...")
-                
-                # Verify stocks with valid data
-                valid_symbols = data_manager.verify_stock_data(symbols)
-                if not valid_symbols:
-                    logger.error(f"No valid stocks found for {category}")
-                    continue
-                
-                # Ensure we have enough stocks for training
-                min_stocks = 5  # Minimum number of stocks needed for training
-                if len(valid_symbols) < min_stocks:
-                    logger.error(f"Insufficient stocks for {category}. Need at least {min_stocks}, got {len(valid_symbols)}")
-                    continue
+        report = {}
+        running = {}
+        try:
+            for category, symbols in stocks.items():
+                entry = report[category] = {'status': 'failed', 'version': None,
+                                            'backend': backend_for(category), 'symbols': 0, 'fetch_seconds': None,
+                                            'train_seconds': None, 'cpu_seconds': None, 'peak_rss_mb': None,
+                                            'error': None}
+                try:
+                    logger.info(f"Fetching history for {category}...")
                     
-                # Train model for this category
-                recommender = StockRecommender(model_dir=f'models/{category}')
-                recommender.train(valid_symbols, force_retrain=True)
-                logger.info(f"Model training completed for {category}")
-                success_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error training model for {category}: {str(e)}")
-                continue
+                    # Fetch history once; symbols without enough data are dropped
+                    start = time.perf_counter()
+                    stock_data = data_manager.fetch_verified_history(symbols)
+                    entry['fetch_seconds'] = time.perf_counter() - start
+                    valid_symbols = list(stock_data)
+                    
+                    # Ensure we have enough stocks for training
+                    if len(valid_symbols) < MIN_TRAINING_STOCKS:
+                        entry['status'] = 'skipped'
+                        entry['error'] = (f"Insufficient stocks for {category}. Need at least {MIN_TRAINING_STOCKS}, "
+                                          f"got {len(valid_symbols)}")
+                        logger.error(entry['error'])
+                        continue
+                    
+                    # Wait for a free process, then train into a fresh registry version
+                    _finish_categories(running, report, keep=processes - 1)
+                    version, staging_dir = registry.create_staging(category)
+                    entry['version'] = version
+                    executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+                    try:
+                        future = executor.submit(_train_category, valid_symbols, stock_data, staging_dir,
+                                                 entry['backend'], n_jobs, TRAINING_NICE)
+                    except Exception:
+                        executor.shutdown(cancel_futures=True)
+                        registry.discard(category, version)
+                        raise
+                    running[future] = (category, executor)
+                    
+                except Exception as e:
+                    entry['error'] = str(e)
+                    logger.error(f"Error training model for {category}: {str(e)}")
+            
+            _finish_categories(running, report)
+        finally:
+            # Only left over when interrupted; don't leave worker processes or staging directories behind
+            for future, (category, executor) in running.items():
+                executor.shutdown(cancel_futures=True)
+                registry.discard(category, report[category]['version'])
+        
+        for category, entry in report.items():
+            logger.info(f"{category}: {entry['status']}, {entry['backend']}, {entry['symbols']} symbols, "
+                        f"fetch {entry['fetch_seconds'] or 0:.1f}s, train {entry['train_seconds'] or 0:.1f}s, "
+                        f"cpu {entry['cpu_seconds'] or 0:.1f}s, peak {entry['peak_rss_mb'] or 0:.0f} MB")
         
+        success_count = sum(entry['status'] == 'published' for entry in report.values())
         if success_count == 0:
             raise Exception("Failed to train any models")
         else:
             logger.info(f"Successfully trained {success_count} out of {len(stocks)} category models")
+        return report
             
     except Exception as e:
         logger.error(f"Error during model training: {str(e)}")
         raise
 
+class TrainingJob:
+    """Runs `train_models` on a background thread, at most one run at a time.
+
+    The web process uses this to (re)build models without blocking requests;
+    new versions become visible to readers through the registry once published.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_started = None
+        self.last_finished = None
+        self.last_error = None
+        self.last_report = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start a training run unless one is already in progress.
+
+        Returns:
+            True if a new run was started, False if one was already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self._run, name='model-training', daemon=True)
+            self.last_started = time.time()
+            self._thread.start()
+            return True
+
+    def _run(self):
+        try:
+            self.last_report = train_models()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Background training failed: {str(e)}")
+        finally:
+            self.last_finished = time.time()
+
+    def status(self) -> dict:
+        return {
+            'running': self.running,
+            'last_started': self.last_started,
+            'last_finished': self.last_finished,
+            'last_error': self.last_error,
+            'last_report': self.last_report
+        }
+
+
+training_job = TrainingJob()
+
 def main():
     """Main function to schedule and run model training."""
     logger.info("Starting stock recommender training scheduler...")
     
-    # Create necessary directories
-    os.makedirs('models', exist_ok=True)
-    os.makedirs('models/large_cap', exist_ok=True)
-    os.makedirs('models/mid_cap', exist_ok=True)
-    os.makedirs('models/small_cap', exist_ok=True)
-    
     # Train immediately on startup
     try:
         train_models()
@@ -0,0 +1,217 @@
+"""Market cap universe of listed NSE equities.
+
+The universe is built from a local market-cap file, e.g. AMFI's half-yearly
+"Average Market Capitalization of listed companies" saved as CSV (or .xlsx)
+into stocks/cache/market_caps.csv. Only a symbol and a market cap column are
+required; headers are matched loosely::
+
+    Symbol,Company Name,Market Cap (Rs Cr)
+    RELIANCE,Reliance Industries Ltd.,"17,40,000"
+
+Companies are ranked by market cap and classified the SEBI/AMFI way: the top
+100 are large cap, 101-250 mid cap and the rest small cap. The result is
+written to nse_stocks.json with per-symbol metadata, which `stocks.symbols`
+serves, and is rebuilt whenever the market-cap file changes.
+"""
+import os
+import re
+import json
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from .store import normalize_symbol
+from .symbols import CACHE_ROOT, SYMBOLS_FILE, SymbolIndex, symbol_index
+
+logger = logging.getLogger(__name__)
+
+MARKET_CAP_FILE = os.path.join(CACHE_ROOT, 'market_caps.csv')
+
+# Rank of the last large cap and of the last mid cap company
+LARGE_CAP_RANKS = 100
+MID_CAP_RANKS = 250
+
+# Seconds before a universe built from an unchanged market-cap file is rebuilt
+UNIVERSE_MAX_AGE = 24 * 60 * 60
+
+# Suffix of the symbols in the universe file (yfinance tickers)
+SYMBOL_SUFFIX = '.NS'
+
+# NSE series of ordinary equity shares
+EQUITY_SERIES = {'EQ', 'BE', 'BZ'}
+
+# Market-cap file header, upper-cased with spaces, underscores and units removed, to its column
+MARKET_CAP_ALIASES: Dict[str, str] = {
+    'SYMBOL': 'Symbol',
+    'NSESYMBOL': 'Symbol',
+    'TICKER': 'Symbol',
+    'NAME': 'Name',
+    'COMPANYNAME': 'Name',
+    'NAMEOFCOMPANY': 'Name',
+    'SERIES': 'Series',
+    'MARKETCAP': 'Market Cap',
+    'MCAP': 'Market Cap',
+    'MARKETCAPITALIZATION': 'Market Cap',
+    'MARKETCAPITALISATION': 'Market Cap',
+    'AVERAGEMARKETCAPITALIZATION': 'Market Cap',
+    'AVERAGEMARKETCAPITALISATION': 'Market Cap',
+    'AVGMARKETCAP': 'Market Cap',
+}
+
+# Universe used until a market-cap file is provided
+DEFAULT_UNIVERSE = {
+    'large_cap': [
+        "RELIANCE.NS", "INFY.NS", "ICICIBANK.NS", "HINDUNILVR.NS", "SBIN.NS",
+        "BHARTIARTL.NS", "ITC.NS", "KOTAKBANK.NS", "LT.NS", "AXISBANK.NS",
+        "MARUTI.NS", "HCLTECH.NS", "ASIANPAINT.NS", "TATASTEEL.NS", "WIPRO.NS"
+    ],
+    'mid_cap': [
+        "INDHOTEL.NS", "FEDERALBNK.NS", "SAIL.NS", "GODREJPROP.NS", "TATAPOWER.NS",
+        "APOLLOTYRE.NS", "CANBK.NS", "NMDC.NS", "ESCORTS.NS", "MINDTREE.NS"
+    ],
+    'small_cap': [
+        "TRIDENT.NS", "SUZLON.NS", "RPOWER.NS", "IDEA.NS", "PNB.NS",
+        "YESBANK.NS", "IBULHSGFIN.NS", "DELTACORP.NS", "GMRINFRA.NS", "IBREALEST.NS"
+    ]
+}
+
+
+# Largest companies by market cap, used for the top symbols until a market-cap file is provided
+DEFAULT_TOP_SYMBOLS = [
+    'RELIANCE', 'TCS', 'HDFCBANK', 'INFY', 'ICICIBANK',
+    'HINDUNILVR', 'SBIN', 'BHARTIARTL', 'ITC', 'KOTAKBANK',
+    'LT', 'HCLTECH', 'ASIANPAINT', 'AXISBANK', 'MARUTI',
+    'ULTRACEMCO', 'TITAN', 'BAJFINANCE', 'NESTLEIND', 'TATASTEEL',
+]
+
+
+def market_cap_column(header: str) -> str:
+    """Name of a market-cap file column; unknown headers are only stripped."""
+    key = re.sub(r'\(.*?\)|[\s_.]', '', str(header)).upper()
+    return MARKET_CAP_ALIASES.get(key, str(header).strip())
+
+
+def read_market_caps(path: str = MARKET_CAP_FILE) -> pd.DataFrame:
+    """Read a market-cap file into 'Symbol', 'Name' and float 'Market Cap' columns.
+
+    Rows without a symbol or a positive market cap and non-equity series are
+    dropped; a symbol listed twice keeps its largest market cap.
+    """
+    if path.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str, skipinitialspace=True)
+    df = df.rename(columns=market_cap_column)
+    if 'Symbol' not in df.columns or 'Market Cap' not in df.columns:
+        raise ValueError(f"{path} needs a symbol and a market cap column, got {list(df.columns)}")
+    if 'Name' not in df.columns:
+        df['Name'] = None
+    if 'Series' in df.columns:
+        df = df[df['Series'].fillna('EQ').str.strip().str.upper().isin(EQUITY_SERIES)]
+
+    df = df.assign(
+        Symbol=df['Symbol'].fillna('').map(normalize_symbol),
+        **{'Market Cap': pd.to_numeric(df['Market Cap'].str.replace(',', '', regex=False).str.strip(),
+                                       errors='coerce')}
+    )
+    df = df[(df['Symbol'] != '') & (df['Market Cap'] > 0)]
+    df = df.sort_values('Market Cap', ascending=False, kind='stable').drop_duplicates('Symbol')
+    return df[['Symbol', 'Name', 'Market Cap']].reset_index(drop=True)
+
+
+def classify(market_caps: pd.DataFrame, large_cap_ranks: int = LARGE_CAP_RANKS,
+             mid_cap_ranks: int = MID_CAP_RANKS) -> Dict:
+    """Universe file payload of a `read_market_caps` frame, every category ordered by market cap.
+
+    Returns:
+        Dict with 'timestamp', 'stocks' (category to symbols) and 'metadata' (symbol to
+        name, market cap and overall rank)
+    """
+    ranked = market_caps.sort_values('Market Cap', ascending=False, kind='stable').reset_index(drop=True)
+    stocks = {'large_cap': [], 'mid_cap': [], 'small_cap': []}
+    metadata = {}
+    for rank, (symbol, name, market_cap) in enumerate(ranked[['Symbol', 'Name', 'Market Cap']].itertuples(index=False),
+                                                      start=1):
+        category = 'large_cap' if rank <= large_cap_ranks else 'mid_cap' if rank <= mid_cap_ranks else 'small_cap'
+        ticker = symbol + SYMBOL_SUFFIX
+        stocks[category].append(ticker)
+        metadata[ticker] = {'name': name if isinstance(name, str) else None, 'market_cap': float(market_cap),
+                            'market_cap_rank': rank}
+    return {'timestamp': time.time(), 'stocks': stocks, 'metadata': metadata}
+
+
+def listed_symbols() -> Optional[Set[str]]:
+    """Symbols currently listed on NSE from nselib's equity list, None if it cannot be fetched."""
+    try:
+        from nselib import capital_market
+
+        df = capital_market.equity_list()
+        return set(df['SYMBOL'].map(normalize_symbol))
+    except Exception as e:
+        logger.warning(f"Could not fetch the NSE equity list: {str(e)}")
+        return None
+
+
+def build_universe(market_cap_file: str = MARKET_CAP_FILE, listed: Optional[Iterable[str]] = None) -> Dict:
+    """Classify the market-cap file, keeping only `listed` symbols when given."""
+    market_caps = read_market_caps(market_cap_file)
+    if listed is not None:
+        listed = {normalize_symbol(symbol) for symbol in listed}
+        market_caps = market_caps[market_caps['Symbol'].isin(listed)]
+    return classify(market_caps)
+
+
+def write_universe(payload: Dict, path: str = SYMBOLS_FILE):
+    """Write a universe file in one step, so `SymbolIndex` never reads a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def refresh_universe(path: str = SYMBOLS_FILE, market_cap_file: str = MARKET_CAP_FILE,
+                     max_age: float = UNIVERSE_MAX_AGE, listed: Optional[Iterable[str]] = None,
+                     fetch_listed: bool = True) -> Optional[Dict[str, List[str]]]:
+    """Categories of the universe, rebuilt when the market-cap file changed or the universe is old.
+
+    Args:
+        path: Universe file to maintain
+        market_cap_file: Local market-cap file it is built from
+        max_age: Seconds after which an unchanged universe is rebuilt (to drop delisted symbols)
+        listed: Currently listed symbols; fetched from nselib when omitted and `fetch_listed`
+        fetch_listed: Whether to fetch the listed symbols
+
+    Returns:
+        Category to symbols, or None without a market-cap file
+    """
+    if not os.path.exists(market_cap_file):
+        return None
+    if os.path.exists(path):
+        built_at = os.path.getmtime(path)
+        if built_at >= os.path.getmtime(market_cap_file) and time.time() - built_at < max_age:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('metadata'):
+                return data['stocks']
+
+    if listed is None and fetch_listed:
+        listed = listed_symbols()
+    payload = build_universe(market_cap_file, listed)
+    write_universe(payload, path)
+    logger.info("Built universe: " + ", ".join(f"{c}: {len(s)}" for c, s in payload['stocks'].items()))
+    return payload['stocks']
+
+
+def top_symbols(n: int, category: str = 'large_cap', index: SymbolIndex = symbol_index) -> List[str]:
+    """NSE symbols (without suffix) of the `n` first stocks of a category, largest market cap first.
+
+    Without a universe file the large caps come from `DEFAULT_TOP_SYMBOLS`, which
+    unlike `DEFAULT_UNIVERSE` is ordered by market cap.
+    """
+    symbols = index.universe().get(category)
+    if not symbols:
+        symbols = DEFAULT_TOP_SYMBOLS if category == 'large_cap' else DEFAULT_UNIVERSE[category]
+    return [normalize_symbol(symbol) for symbol in symbols[:n]]
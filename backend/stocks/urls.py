@@ -15,9 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path
-from .views import get_top_10_stocks
+from .views import get_top_10_stocks, get_stream_metrics, get_stock_details, get_market_overview, \
+    StockRecommendationView
 
 urlpatterns = [
     path("api/top10/", get_top_10_stocks, name="get_top_10_stocks"),
+    path("api/recommendations/", StockRecommendationView.as_view(), name="stock_recommendations"),
+    path("api/stocks/<str:symbol>/", get_stock_details, name="stock_details"),
+    path("api/market/overview/", get_market_overview, name="market_overview"),
+    path("api/metrics/stream/", get_stream_metrics, name="stream_metrics"),
 ]
 
@@ -1,46 +1,45 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from nselib import capital_market
 from rest_framework.views import APIView
 from rest_framework import status
-from .ml_model import StockRecommender
+from django.core.cache import cache
+from .service import ServiceNotReady, inference_service
+from .feed import market_feed
+from .metrics import metrics
+from .quotes import MARKET_INDEX, SECTOR_INDICES, quote_service
 import json
 from datetime import datetime, timedelta
-from . import data
+from . import data, universe
 
-# Expanded list of NSE stocks to consider
-NSE_SYMBOLS = [
-    # Large Cap
-    'RELIANCE', 'TCS', 'HDFCBANK', 'INFY', 'ICICIBANK',
-    'HINDUNILVR', 'SBIN', 'BHARTIARTL', 'ITC', 'KOTAKBANK',
-    'LT', 'HCLTECH', 'ASIANPAINT', 'AXISBANK', 'MARUTI',
-    'ULTRACEMCO', 'TITAN', 'BAJFINANCE', 'NESTLEIND', 'TATASTEEL',
-    
-    # Mid Cap
-    'ADANIENT', 'ADANIPORTS', 'ADANIPOWER', 'BAJAJFINSV', 'BAJAJHLDNG',
-    'BAJAJ-AUTO', 'BANKBARODA', 'BERGEPAINT', 'BPCL', 'BRITANNIA',
-    'CADILAHC', 'CIPLA', 'COALINDIA', 'COLPAL', 'CONCOR',
-    'CUMMINSIND', 'DLF', 'DABUR', 'DIVISLAB', 'DRREDDY',
-    
-    # Small Cap
-    'AARTIDRUGS', 'AARTIIND', 'AARVEEDEN', 'ABBOTINDIA', 'ABFRL',
-    'ACC', 'ADANIGREEN', 'ADANITRANS', 'ADVENZYMES', 'AFFLE',
-    'AGARIND', 'AGCNET', 'AGSTRA', 'AHLUCONT', 'AIAENG'
-]
+# Seconds a computed top-10 response is served from the cache
+TOP_10_CACHE_TTL = 60
+TOP_10_CACHE_KEY = 'stocks:top10'
+
+# Calendar days of prices fetched for the top 10, so the previous session is included after weekends and holidays
+TOP_10_HISTORY_DAYS = 7
 
 @api_view(["GET"])
 def get_top_10_stocks(request):
+    stock_data = cache.get(TOP_10_CACHE_KEY)
+    if stock_data is not None:
+        return Response({"data": stock_data})
+
     try:
-        TOP_10_COMPANIES = NSE_SYMBOLS[:10]
+        # Ten largest companies of the universe by market cap
+        TOP_10_COMPANIES = universe.top_symbols(10)
         stock_data = {}
 
-        from_date = (datetime.today() - timedelta(days=1)).strftime("%d-%m-%Y")
+        from_date = (datetime.today() - timedelta(days=TOP_10_HISTORY_DAYS)).strftime("%d-%m-%Y")
         to_date = datetime.today().strftime("%d-%m-%Y")
 
+        # One concurrent fetch for all ten symbols instead of ten sequential downloads
+        prices = data.get_bulk_price_df(TOP_10_COMPANIES, from_date, to_date)
+        by_symbol = dict(tuple(prices.groupby("Symbol", sort=False)))
+
         for symbol in TOP_10_COMPANIES:
-            df = data.get_stock_return_df(symbol, from_date, to_date)
+            df = by_symbol.get(symbol)
 
-            if df.empty:
+            if df is None or df.empty:
                 print(f"⚠️ No data for {symbol}")
                 stock_data[symbol] = {
                     "symbol": symbol,
@@ -66,18 +65,18 @@ def get_top_10_stocks(request):
                 "returnPercent": latest.get("Return %", 0)
             }
 
+        # Zeros for every symbol mean the fetch failed; try again on the next request
+        if by_symbol:
+            cache.set(TOP_10_CACHE_KEY, stock_data, TOP_10_CACHE_TTL)
         return Response({"data": stock_data})
     except Exception as e:
         print("❌ Exception:", e)
         return Response({"error": str(e)}, status=500)
     
 class StockRecommendationView(APIView):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.recommender = StockRecommender()
-        # Train the model on initialization
-        self.recommender.train(NSE_SYMBOLS)
-    
+    # Shared, pre-warmed models; models are trained in the background, never per request
+    service = inference_service
+
     def post(self, request):
         try:
             # Get parameters from request
@@ -101,15 +100,20 @@ class StockRecommendationView(APIView):
                 )
             
             # Get recommendations
-            recommendations = self.recommender.get_recommendations(
+            recommendations = self.service.recommend(
                 rts_score=rts_score,
                 target_amount=target_amount,
                 monthly_investment=monthly_investment,
                 investment_duration=investment_duration
             )
             
+            # Chance of reaching the target with this portfolio, from resampled history
+            projection = self.service.project(recommendations, monthly_investment, investment_duration,
+                                              target_amount)
+            
             return Response({
                 'recommendations': recommendations,
+                'projection': projection,
                 'parameters': {
                     'rts_score': rts_score,
                     'target_amount': target_amount,
@@ -118,6 +122,16 @@ class StockRecommendationView(APIView):
                 }
             })
             
+        except ServiceNotReady as e:
+            return Response(
+                {
+                    'error': 'Recommendation models are not ready yet',
+                    'status': self.service.status(),
+                    'retry_after': e.retry_after
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(e.retry_after)}
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -127,7 +141,8 @@ class StockRecommendationView(APIView):
 @api_view(["GET"])
 def get_stock_details(request, symbol):
     try:
-        data = capital_market.index_data(symbol)
+        # Cached for QUOTE_TTL seconds; concurrent requests for a symbol share one upstream call
+        data = quote_service.get(symbol)
         return Response({
             "symbol": symbol,
             "lastPrice": data.get("last", 0),
@@ -146,21 +161,30 @@ def get_stock_details(request, symbol):
 @api_view(["GET"])
 def get_market_overview(request):
     try:
-        # Get NIFTY 50 data
-        nifty_data = capital_market.index_data("NIFTY 50")
-        
-        # Get sector indices
-        sector_indices = {
-            "NIFTY BANK": capital_market.index_data("NIFTY BANK"),
-            "NIFTY IT": capital_market.index_data("NIFTY IT"),
-            "NIFTY AUTO": capital_market.index_data("NIFTY AUTO"),
-            "NIFTY PHARMA": capital_market.index_data("NIFTY PHARMA"),
-            "NIFTY FMCG": capital_market.index_data("NIFTY FMCG")
-        }
+        # NIFTY 50 and the sector indices are fetched concurrently and cached per index
+        quotes = quote_service.get_many([MARKET_INDEX] + SECTOR_INDICES, return_exceptions=True)
+        if isinstance(quotes[MARKET_INDEX], Exception):
+            raise quotes[MARKET_INDEX]
         
         return Response({
-            "nifty_50": nifty_data,
-            "sector_indices": sector_indices
+            "nifty_50": quotes[MARKET_INDEX],
+            "sector_indices": {
+                index: None if isinstance(quotes[index], Exception) else quotes[index]
+                for index in SECTOR_INDICES
+            }
         })
     except Exception as e:
         return Response({"error": str(e)}, status=500)
+
+@api_view(["GET"])
+def get_stream_metrics(request):
+    # Counters and gauges of the /ws/data/ stream; growing gauges after clients leave mean a leak
+    return Response({
+        **metrics.snapshot(),
+        "feed": {
+            "running": market_feed.running,
+            "producer": market_feed.is_producer,
+            "symbols": market_feed.symbols,
+            "polls": market_feed.ticks
+        }
+    })